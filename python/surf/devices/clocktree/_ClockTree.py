@@ -0,0 +1,175 @@
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# Dependency ordered clock tree bring-up: each clock device is loaded with its
+# configuration file (LoadCsvFile, LoadCodeLoaderHexFile or Init) once all the
+# devices it depends on are loaded and report lock. Independent chains (e.g.
+# the Si5345 -> LMK04828 -> LMX2594 chain of every card) run concurrently on
+# a thread pool. The report gives the load/lock time of each device and the
+# critical path of the bring-up.
+#
+#    tree = surf.devices.clocktree.ClockTree()
+#    for i, card in enumerate(root.Card):
+#        tree.add(f'Si5345[{i}]',  card.Si5345,  'si5345.csv')
+#        tree.add(f'Lmk[{i}]',     card.Lmk,     'lmk.txt', after=[f'Si5345[{i}]'])
+#        tree.add(f'Lmx2594[{i}]', card.Lmx2594, 'lmx.txt', after=[f'Lmk[{i}]'])
+#    tree.run()
+#    print(tree.report())
+#-----------------------------------------------------------------------------
+
+import surf.misc
+import click
+import concurrent.futures
+import threading
+import time
+
+def clockLoad(dev, config=None):
+    # Returns the callable that loads config into a known clock device
+    if config is None:
+        return dev.Init
+    for cmd in ['LoadCsvFile', 'LoadCodeLoaderHexFile', 'LoadTxtFile']:
+        if hasattr(dev, cmd):
+            return lambda: getattr(dev, cmd)(config)
+    raise ValueError(f'ClockTree: no configuration file loader in {dev.path}')
+
+def readLocked(var, value):
+    # Returns the callable reading a lock status variable (True when var == value). The link
+    # variables decoding a DataBlock shadow (Si5345 pages, Lmx2594) read their DataBlock first.
+    def locked():
+        for dep in var.dependencies:
+            dep.get(read=True)
+        return var.get() == value
+    return locked
+
+def clockLocked(dev):
+    # Returns the callable reading the lock indicator of a known clock device (None if unknown)
+    if hasattr(dev, 'LOL_INT'):
+        # Si5324/Si5326: PLL loss of lock status
+        return readLocked(dev.LOL_INT, 0)
+    if hasattr(dev, 'Page0') and hasattr(dev.Page0, 'LOL'):
+        # Si5345/Si5345Lite/Si5394Lite: DSPLL out of lock status
+        return readLocked(dev.Page0.LOL, 0)
+    if hasattr(dev, 'RB_PLL2_LD'):
+        # LMK048xx: PLL2 digital lock detect
+        return readLocked(dev.RB_PLL2_LD, 1)
+    if hasattr(dev, 'rb_LD_VTUNE'):
+        # LMX2594/LMX2615: Vtune lock detect = 2 (locked)
+        return readLocked(dev.rb_LD_VTUNE, 2)
+    return None
+
+class ClockTree():
+
+    def __init__(self, maxWorkers=8, lockTimeout=5.0):
+        self.maxWorkers  = maxWorkers
+        self.lockTimeout = lockTimeout
+        self.nodes       = {}
+        self.results     = {}
+        self.total       = 0.0
+        self._lock       = threading.Lock()
+
+    def add(self, name, dev=None, config=None, after=(), load=None, locked=None, lockTimeout=None):
+        """
+        Add a clock device to the tree. The device is loaded with config
+        (or Init() without config) once all the devices named in after are
+        locked. load/locked override the loader and lock indicator of dev.
+        """
+        if name in self.nodes:
+            raise ValueError(f'ClockTree: {name} already added')
+        if (dev is None) and (load is None):
+            raise ValueError(f'ClockTree: {name} needs a device or a load function')
+        self.nodes[name] = {
+            'load'        : load if load is not None else clockLoad(dev, config),
+            'locked'      : locked if locked is not None else (clockLocked(dev) if dev is not None else None),
+            'after'       : list(after),
+            'lockTimeout' : lockTimeout if lockTimeout is not None else self.lockTimeout,
+        }
+        return self
+
+    def order(self):
+        """Return the device names in a dependency order (checks the graph)"""
+        ret   = []
+        state = {}
+        def visit(name, path):
+            if name not in self.nodes:
+                raise ValueError(f'ClockTree: {path[-1]} depends on unknown device {name}')
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f'ClockTree: dependency cycle {" -> ".join(path + [name])}')
+            state[name] = 'visiting'
+            for dep in self.nodes[name]['after']:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            ret.append(name)
+        for name in self.nodes:
+            visit(name, [])
+        return ret
+
+    def _bringUp(self, name, start):
+        node = self.nodes[name]
+        t0   = time.perf_counter()
+        node['load']()
+        t1   = time.perf_counter()
+        if node['locked'] is not None:
+            surf.misc.waitFor(node['locked'], timeout=node['lockTimeout'], period=0.001, maxPeriod=0.1, name=f'ClockTree.{name}')
+        t2   = time.perf_counter()
+        with self._lock:
+            self.results[name] = {'start': t0-start, 'load': t1-t0, 'lock': t2-t1, 'end': t2-start}
+
+    def run(self):
+        """Bring up the whole tree, raises the first error once the running loads are done"""
+        order        = self.order()
+        self.results = {}
+        start        = time.perf_counter()
+        pending      = list(order)
+        running      = {}
+        error        = None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.maxWorkers) as pool:
+            while pending or running:
+                # Start the devices whose dependencies are all locked
+                if error is None:
+                    for name in [n for n in pending if all(d in self.results for d in self.nodes[n]['after'])]:
+                        pending.remove(name)
+                        running[pool.submit(self._bringUp, name, start)] = name
+                if not running:
+                    break
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None and error is None:
+                        click.secho(f'ClockTree: {name} failed: {future.exception()}', fg='red')
+                        error = future.exception()
+
+        self.total = time.perf_counter() - start
+        if error is not None:
+            raise error
+        return self.results
+
+    def criticalPath(self):
+        """Return ([names], time) of the dependency chain that ended last"""
+        if not self.results:
+            return [], 0.0
+        name = max(self.results, key=lambda n: self.results[n]['end'])
+        path = [name]
+        while self.nodes[name]['after']:
+            name = max(self.nodes[name]['after'], key=lambda n: self.results[n]['end'])
+            path.insert(0, name)
+        return path, self.results[path[-1]]['end']
+
+    def report(self):
+        lines = ['{:<24} {:>10} {:>10} {:>10} {:>10}'.format('Device', 'Start (s)', 'Load (s)', 'Lock (s)', 'End (s)')]
+        for name in self.order():
+            if name in self.results:
+                r = self.results[name]
+                lines.append('{:<24} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(name[-24:], r['start'], r['load'], r['lock'], r['end']))
+        path, t = self.criticalPath()
+        lines.append(f'Critical path: {" -> ".join(path)} ({t:.3f} s)')
+        lines.append(f'Total: {self.total:.3f} s')
+        return '\n'.join(lines)
@@ -14,14 +14,13 @@
 #-----------------------------------------------------------------------------
 
 import surf.devices.micron
-import click
 import time
-import datetime
 
 class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
     def __init__(self,
                  description = "Container for Cypress S25FL PROM device",
                  addrMode    = True, # False = 24-bit Address mode, True = 32-bit Address Mode
+                 sectorSize  = None, # None = read from the ID-CFI (S25FL-S family), else the uniform sector size in bytes
                  hidden      = True,
                  **kwargs):
 
@@ -35,54 +34,52 @@ class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
         self.FLAG_STATUS_REG = (0x05 << 16)
         self.FLAG_STATUS_RDY = (0x01)
         self.BRAC_CMD        = (0xB9 << 16)
-
-    def _LoadMcsFile(self,arg):
-
-        click.secho(('LoadMcsFile: %s' % arg), fg='green')
-        self._progDone = False
-
-        # Start time measurement for profiling
-        start = time.time()
-
-        # Reset the SPI interface
-        self.resetFlash()
-
+        self.BULK_ERASE_CMD  = (0x60 << 16)
+
+        # The sector size depends on the part (e.g. S25FL512S = 256kB)
+        self.SECTOR_SIZE = sectorSize
+
+        # ID-CFI family ID (byte 05h) and sector architecture (byte 04h) of the S25FL-S family
+        self.FL_S_FAMILY_ID   = 0x80
+        self.SECTOR_ARCH_SIZE = {
+            0x00 : 0x40000, # Uniform 256kB sectors
+            0x01 : 0x10000, # 4kB parameter sectors + uniform 64kB sectors
+        }
+
+    def eraseGeometry(self):
+        # The 4kB sectors only exist in the parameter sector region, so the
+        # erase planner only uses sector and bulk erase. With an unknown sector
+        # size, erasing every 64kB (the smallest uniform sector) before writing
+        # is still safe.
+        geometry = [('sector', self.getSectorSize() or 0x10000, self.SECTOR_ERASE_TIME)]
+        if self.EraseBulkEn.get():
+            size = self.getDeviceSize()
+            if size > 0:
+                geometry.append(('bulk', size, self.BULK_ERASE_TIME))
+        return geometry
+
+    def _printStatus(self):
         # Print the status registers
         print("CypressS25Fl Manufacturer ID Code  = {}".format(hex(self.getManufacturerId())))
         print("CypressS25Fl Manufacturer Type     = {}".format(hex(self.getManufacturerType())))
         print("CypressS25Fl Manufacturer Capacity = {}".format(hex(self.getManufacturerCapacity())))
         print("CypressS25Fl Status Register       = {}".format(hex(self.getPromStatusReg())))
 
-        # Open the MCS file
-        self._mcs.open(arg)
-
-        # Erase the PROM
-        self.eraseProm()
-
-        # Write to the PROM
-        self.writeProm()
-
-        # Verify the PROM
-        self.verifyProm()
+    def getSectorSize(self):
+        if self.SECTOR_SIZE is not None:
+            return self.SECTOR_SIZE
+        # S25FL-S: uniform sector size of the ID-CFI sector architecture (None = unknown)
+        if self.getFamilyId() != self.FL_S_FAMILY_ID:
+            return None
+        return self.SECTOR_ARCH_SIZE.get(self.getSectorArchitecture())
 
-        # End time measurement for profiling
-        end = time.time()
-        elapsed = end - start
-        click.secho('LoadMcsFile() took %s to program the PROM' % datetime.timedelta(seconds=int(elapsed)), fg='green')
+    def getSectorArchitecture(self):
+        self.setCmd(self.READ_MASK|self.DEV_ID_RD_CMD|0x5)
+        return (self.getCmdReg()&0xFF)
 
-        # Add a power cycle reminder
-        self._progDone = True
-        click.secho(
-            "\n\n\
-            ***************************************************\n\
-            ***************************************************\n\
-            The MCS data has been written into the PROM.       \n\
-            To reprogram the FPGA with the new PROM data,      \n\
-            a IPROG CMD or power cycle is be required.\n\
-            ***************************************************\n\
-            ***************************************************\n\n"
-            , bg='green',
-        )
+    def getFamilyId(self):
+        self.setCmd(self.READ_MASK|self.DEV_ID_RD_CMD|0x6)
+        return (self.getCmdReg()&0xFF)
 
     def resetFlash(self):
         # Send the "Mode Bit Reset" command
@@ -100,10 +97,14 @@ class CypressS25Fl(surf.devices.micron.AxiMicronN25Q):
             self.setCmd(self.WRITE_MASK|self.BRAC_CMD)
 
     def waitForFlashReady(self):
-        while True:
-            # Get the status register
-            self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
-            status = (self.getCmdReg()&0xFF)
-            # Check if not busy
-            if ( (status & self.FLAG_STATUS_RDY) == 0 ): # active Low READY
-                break
+        with self._profile.phase('poll'):
+            while True:
+                # Get the status register
+                self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
+                status = (self.getCmdReg()&0xFF)
+                # Check if not busy
+                if self._isFlashReady(status):
+                    break
+
+    def _isFlashReady(self, status):
+        return ( (status & self.FLAG_STATUS_RDY) == 0 ) # active Low READY
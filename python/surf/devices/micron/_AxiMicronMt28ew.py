@@ -17,24 +17,41 @@ import pyrogue   as pr
 import surf.misc
 import click
 import time
-import datetime
-import math
+import os
+import numpy as np
 
-class AxiMicronMt28ew(pr.Device):
+class AxiMicronMt28ew(surf.misc.PromBase):
     def __init__(self,
                  description = "AXI-Lite Micron MT28EW (or Cypress S29G) PROM",
                  tryCount    = 5,
+                 blockMap    = None, # [(number of blocks, block size in bytes), ...], None = read the CFI table
+                 mcsCache    = False, # Cache the parsed .MCS images on disk (surf.misc.McsCache)
+                 journal     = True, # Journal the LoadMcsFile progress for ResumeMcsFile (surf.misc.McsJournal)
                  hidden      = True,
                  **kwargs):
 
         super().__init__(
             description = description,
             hidden      = hidden,
+            tryCount    = tryCount,
+            mcsCache    = mcsCache,
+            journal     = journal,
+            bitSwap     = True,
             **kwargs)
 
-        self._mcs = surf.misc.McsReader()
-        self._progDone = False
-        self._tryCount = tryCount
+        # 256 x 16-bit read bursts
+        self.PAGE_SIZE = 512
+        self.WORD_SIZE = 2
+
+        # Erase block map: [(number of blocks, block size in bytes), ...]
+        # None = read it from the CFI table, falling back to the uniform
+        # 64-kword/block when the CFI table is not valid
+        self._blockMap = blockMap
+        self.DEFAULT_BLOCK_MAP = [(1 << 13, 0x20000)]
+
+        # Erase status polling backoff (in seconds)
+        self.POLL_MIN_PERIOD = 0.001
+        self.POLL_MAX_PERIOD = 0.05
 
         ##############################
         # Setup variables
@@ -120,77 +137,57 @@ class AxiMicronMt28ew(pr.Device):
             verify       = False,
         ))
 
-        self.add(pr.LocalCommand(
-            name        = 'LoadMcsFile',
-            function    = self._LoadMcsFile,
-            description = 'Load the .MCS into PROM',
-            value       = '',
-        ))
-
-    def _LoadMcsFile(self,arg):
-        click.secho(('%s.LoadMcsFile: %s' % (self.path,arg) ), fg='green')
-        self._progDone = False
-
-        # Start time measurement for profiling
-        start = time.time()
-
-        # Open the MCS file
-        self._mcs.open(arg)
-
-        # Erase the PROM
-        self.eraseProm()
-
-        # Write to the PROM
-        self.bufferedWriteProm()
-
-        # Verify the PROM
-        self.bufferedVerifyProm()
-
-        # End time measurement for profiling
-        end = time.time()
-        elapsed = end - start
-        click.secho('LoadMcsFile() took %s to program the PROM' % datetime.timedelta(seconds=int(elapsed)), fg='green')
-
-        # Add a power cycle reminder
-        self._progDone = True
-        click.secho(
-            "\n\n\
-            ***************************************************\n\
-            ***************************************************\n\
-            The MCS data has been written into the PROM.       \n\
-            To reprogram the FPGA with the new PROM data,      \n\
-            a IPROG CMD or power cycle is be required.\n\
-            ***************************************************\n\
-            ***************************************************\n\n"
-            , bg='green',
-        )
-
     # Reset Command
     def _resetCmd(self):
         self._writeToFlash(0x555,0xAA)
         self._writeToFlash(0x2AA,0x55)
         self._writeToFlash(0x555,0xF0)
 
+    def _writeImage(self, start=None):
+        self.bufferedWriteProm(start)
+
+    def _verifyImage(self, start=None):
+        self.bufferedVerifyProm(start)
+
+    def _prepareRead(self):
+        # Reset the PROM
+        self._resetCmd()
+        # Set the block transfer size
+        self.TranSize.set(0xFF)
+
+    def _readBlock(self, addr):
+        return self._readBurst(addr).astype('<u2').view(np.uint8)
+
     def eraseProm(self):
         # Reset the PROM
         self._resetCmd()
-        # Set the starting address index
-        address    = self._mcs.startAddr >> 1
-        # Uniform block size of 64-kword/block
-        ERASE_SIZE = 0x10000
+        # Only erase the real blocks that cover the image
+        blocks = list(surf.misc.blocksInRange(self.blockMap(), self._mcs.startAddr, self._mcs.endAddr+1))
+        click.secho(f'eraseProm(): {len(blocks)} blocks', fg='green')
         # Setup the status bar
-        with click.progressbar(
-            iterable = range(math.ceil(self._mcs.size/ERASE_SIZE)),
+        with surf.misc.progressbar(
+            iterable = blocks,
             label    = click.style('Erasing PROM:  ', fg='green'),
         ) as bar:
-            for i in bar:
-                # Execute the erase command
-                self._eraseCmd(address)
-                # Increment by one block
-                address += ERASE_SIZE
-        # Check the corner case
-        if ( address< (self._mcs.endAddr>>1) ):
-            self._eraseCmd(address)
+            for address, size in bar:
+                # Skip the blocks that were erased before an interruption
+                if self._journal.isErased(address, address+size):
+                    continue
+                # Execute the erase command (16-bit word addressing at the PROM)
+                self._eraseCmd(address>>1)
+                self._journal.erased(address, address+size)
+
+    def blockMap(self):
+        if self._blockMap is None:
+            # CFI query: 16-bit word addressing, one byte per word
+            self._writeToFlash(0x55, 0x98)
+            self._blockMap = surf.misc.cfiBlockMap(self._readFromFlash)
+            # Back to read array mode
+            self._resetCmd()
+            if self._blockMap is None:
+                click.secho('blockMap(): no valid CFI table, using the default block map', fg='yellow')
+                self._blockMap = self.DEFAULT_BLOCK_MAP
+        return self._blockMap
 
     # Erase Command
     def _eraseCmd(self, address):
@@ -200,82 +197,55 @@ class AxiMicronMt28ew(pr.Device):
         self._writeToFlash(0x555,0xAA)
         self._writeToFlash(0x2AA,0x55)
         self._writeToFlash(address,0x30)
-        self.waitForFlashReady()
+        # Back off the status polling (block erase takes ~1 second)
+        self.waitForFlashReady(backoff=True)
 
-    def bufferedWriteProm(self):
+    def bufferedWriteProm(self, start=None):
+        stop = self._mcs.endAddr+1
         # Reset the PROM
         self._resetCmd()
-        # Create a burst data array
-        dataArray = self.BurstData.get(read=False)
 
         # Set the block transfer size
         self.TranSize.set(0xFF)
 
         # Setup the status bar
-        with click.progressbar(
-            length   = self._mcs.size,
+        with surf.misc.progressbar(
+            length   = stop - (start or self._mcs.startAddr),
             label    = click.style('Writing PROM:  ', fg='green'),
         ) as bar:
-            for i in range(self._mcs.size):
-                if ( (i&0x1) == 0):
-                    # Check for first byte of burst transfer
-                    if ( (i&0x1FF) == 0):
-                        # Throttle down printf rate
-                        bar.update(0x1FF)
-                        # Get the start bursting address
-                        addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                        # Reset the counter
-                        cnt = 0
-                    # Get the data from MCS file
-                    dataArray[cnt] = int(self._mcs.entry[i][1]) & 0xFF
-                else:
-                    # Get the data from MCS file
-                    dataArray[cnt] |= (int(self._mcs.entry[i][1])   << 8)
-                    cnt += 1
-                    # Check for the last byte
-                    if ( cnt == 256 ):
-
-                        # Write burst data
-                        self.BurstData.set(dataArray)
-                        # Start a burst transfer
-                        self.BurstTran.set(0x7FFFFFFF&addr)
-
-            # Check for leftover data
-            if (cnt != 256):
-                # Fill the rest of the data array with ones
-                for i in range(cnt, 256):
-                    dataArray[i] = 0xFFFF
-
-                # Write burst data
-                self.BurstData.set(dataArray)
-                # Start a burst transfer
-                self.BurstTran.set(0x7FFFFFFF&addr)
-
-            # Close the status bar
-            bar.update(self._mcs.size)
+            # Loop through the 256 x 16-bit bursts (from the optional resume address)
+            blank = 0
+            for addr, page in self._journal.pages(self._mcs.pages(512, start), self._journal.written):
+                if not self._writeBurst(addr, page):
+                    blank += 1
+                bar.update(512)
+        click.secho(f'bufferedWriteProm(): skipped {blank} blank (0xFF) bursts', fg='green')
+        self._journal.written(stop, force=True)
 
     def writeProm(self):
         # Reset the PROM
         self._resetCmd()
         # Setup the status bar
-        with click.progressbar(
+        with surf.misc.progressbar(
             length   = self._mcs.size,
             label    = click.style('Writing PROM:  ', fg='green'),
         ) as bar:
             for i in range(self._mcs.size):
                 if ( (i&0x1) == 0):
                     # Get the data and address from MCS file
-                    addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                    data = int(self._mcs.entry[i][1]) & 0xFF
+                    addr = (self._mcs.startAddr+i)>>1 # 16-bit word addressing at the PROM
+                    data = int(self._mcs.data[i]) & 0xFF
                 else:
                     # Get the data for MCS file
-                    data |= (int(self._mcs.entry[i][1])  << 8)
+                    data |= (int(self._mcs.data[i])  << 8)
 
-                    self._writeToFlash(0x555,0xAA)
-                    self._writeToFlash(0x2AA,0x55)
-                    self._writeToFlash(0x555,0xA0)
-                    self._writeToFlash(addr,data)
-                    self.waitForFlashReady()
+                    # Skip blank words, the block has already been erased to 0xFFFF
+                    if data != 0xFFFF:
+                        self._writeToFlash(0x555,0xAA)
+                        self._writeToFlash(0x2AA,0x55)
+                        self._writeToFlash(0x555,0xA0)
+                        self._writeToFlash(addr,data)
+                        self.waitForFlashReady()
 
                 # Check for burst transfer
                 if ( (i&0x1FF) == 0):
@@ -285,7 +255,8 @@ class AxiMicronMt28ew(pr.Device):
             # Close the status bar
             bar.update(self._mcs.size)
 
-    def bufferedVerifyProm(self):
+    def bufferedVerifyProm(self, start=None):
+        stop = self._mcs.endAddr+1
         # Reset the PROM
         self._resetCmd()
 
@@ -295,56 +266,32 @@ class AxiMicronMt28ew(pr.Device):
         self.TranSize.set(0xFF)
 
         # Setup the status bar
-        with click.progressbar(
-            length  = self._mcs.size,
+        with surf.misc.progressbar(
+            length  = stop - (start or self._mcs.startAddr),
             label   = click.style('Verifying PROM:', fg='green'),
         ) as bar:
-            for i in range(self._mcs.size):
-
-                if ( (i&0x1) == 0):
-                    # Get the data and address from MCS file
-                    addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                    data = int(self._mcs.entry[i][1]) & 0xFF
-
-                    # Check for burst transfer
-                    if ( (i&0x1FF) == 0):
-                        # Throttle down printf rate
-                        bar.update(0x1FF)
-
-                        # Start a burst transfer
-                        self.BurstTran.set(0x80000000|addr)
-
-                        # Get the data
-                        dataArray = self.BurstData.get()
-
-                else:
-                    # Get the data for MCS file
-                    data |= (int(self._mcs.entry[i][1])  << 8)
-                    # Get the prom data from data array
-                    prom = dataArray[(i&0x1FF)>>1]
-                    # Compare PROM to file
-                    if (data != prom):
-                        click.secho(("\nAddr = 0x%x: MCS = 0x%x != PROM = 0x%x" % (addr,data,prom)), fg='red')
-                        raise surf.misc.McsException('bufferedVerifyProm() Failed\n\n')
-            # Close the status bar
-            bar.update(self._mcs.size)
+            # Loop through the 256 x 16-bit bursts (from the optional resume address)
+            for addr, page in self._journal.pages(self._mcs.pages(512, start), self._journal.verified):
+                self._verifyBurst(addr, page, min(512, stop-addr))
+                bar.update(512)
+        self._journal.verified(stop, force=True)
 
     def verifyProm(self):
         # Reset the PROM
         self._resetCmd()
         # Setup the status bar
-        with click.progressbar(
+        with surf.misc.progressbar(
             length  = self._mcs.size,
             label   = click.style('Verifying PROM:', fg='green'),
         ) as bar:
             for i in range(self._mcs.size):
                 if ( (i&0x1) == 0):
                     # Get the data and address from MCS file
-                    addr = int(self._mcs.entry[i][0])>>1 # 16-bit word addressing at the PROM
-                    data = int(self._mcs.entry[i][1]) & 0xFF
+                    addr = (self._mcs.startAddr+i)>>1 # 16-bit word addressing at the PROM
+                    data = int(self._mcs.data[i]) & 0xFF
                 else:
                     # Get the data for MCS file
-                    data |= (int(self._mcs.entry[i][1])  << 8)
+                    data |= (int(self._mcs.data[i])  << 8)
                     # Get the prom data from data array
                     prom = self._readFromFlash(addr)
                     # Compare PROM to file
@@ -360,23 +307,100 @@ class AxiMicronMt28ew(pr.Device):
             # Close the status bar
             bar.update(self._mcs.size)
 
+    def _writeBurst(self, addr, page):
+        # Skip blank bursts, the block has already been erased to 0xFFFF
+        if page.min() == 0xFF:
+            return False
+        with self._profile.roundTrip(nbytes=1028, count=2):
+            # Write burst data (little-endian 16-bit words)
+            self.BurstData.set(page.view('<u2').astype(np.uint32))
+            # Start a burst transfer (16-bit word addressing at the PROM)
+            self.BurstTran.set(0x7FFFFFFF&(addr>>1))
+        return True
+
+    def _readBurst(self, addr):
+        with self._profile.roundTrip(nbytes=1028, count=2):
+            # Start a burst transfer (16-bit word addressing at the PROM)
+            self.BurstTran.set(0x80000000|(addr>>1))
+            # Get the data
+            return np.asarray(self.BurstData.get(), dtype=np.uint32)
+
+    def _verifyBurst(self, addr, page, size=512):
+        prom = self._readBurst(addr)
+        # Blank bursts only need an erased-state check
+        if page.min() == 0xFF:
+            if prom.min() == 0xFFFF:
+                return
+        # Compare PROM to file (only the first size bytes, not the 0xFF padding past the end of the image)
+        data = page.view('<u2')
+        diff = np.flatnonzero(page[:size] != prom.astype('<u2').view(np.uint8)[:size])
+        if len(diff) > 0:
+            i = diff[0]>>1
+            click.secho(("\nAddr = 0x%x: MCS = 0x%x != PROM = 0x%x" % ((addr>>1)+i,data[i],prom[i])), fg='red')
+            raise surf.misc.McsException('bufferedVerifyProm() Failed\n\n')
+
+    def streamWriteProm(self, filename):
+        # Reset the PROM
+        self._resetCmd()
+        blockMap  = self.blockMap()
+        lastBlock = -1
+        # Set the block transfer size
+        self.TranSize.set(0xFF)
+        # Setup the status bar
+        with surf.misc.progressbar(
+            length   = os.path.getsize(filename),
+            label    = click.style('Writing PROM:  ', fg='green'),
+        ) as bar:
+            # Loop through the 256 x 16-bit bursts as they are decoded
+            for addr, page in self._mcs.stream(filename, 512, bar, baseAddr=self.ImageBaseAddr.get(), bitSwap=self.ImageBitSwap.get()):
+                # Erase each block the first time that the burst reaches it
+                for block, size in surf.misc.blocksInRange(blockMap, addr, addr+512):
+                    if block > lastBlock:
+                        # 16-bit word addressing at the PROM
+                        self._eraseCmd(block>>1)
+                        lastBlock = block
+                self._writeBurst(addr, page)
+
+    def streamVerifyProm(self, filename):
+        # Reset the PROM
+        self._resetCmd()
+        # Set the data bus
+        self.DataWrBus.set(0xFFFFFFFF)
+        # Set the block transfer size
+        self.TranSize.set(0xFF)
+        # Setup the status bar
+        with surf.misc.progressbar(
+            length  = os.path.getsize(filename),
+            label   = click.style('Verifying PROM:', fg='green'),
+        ) as bar:
+            # Loop through the 256 x 16-bit bursts as they are decoded
+            for addr, page in self._mcs.stream(filename, 512, bar, baseAddr=self.ImageBaseAddr.get(), bitSwap=self.ImageBitSwap.get()):
+                self._verifyBurst(addr, page, min(512, self._mcs.endAddr+1-addr))
+
     # Generic FLASH write Command
     def _writeToFlash(self, addr, data):
-        # Set the data bus
-        self.DataWrBus.set(data)
-        # Set the address bus and initiate the transfer
-        self.AddrBus.set(addr&0x7FFFFFFF)
+        with self._profile.roundTrip(nbytes=8, count=2):
+            # Set the data bus
+            self.DataWrBus.set(data)
+            # Set the address bus and initiate the transfer
+            self.AddrBus.set(addr&0x7FFFFFFF)
 
     # Generic FLASH read Command
     def _readFromFlash(self, addr):
-        # Set the address
-        self.AddrBus.set(addr|0x80000000)
-        # Get the read data
-        return self.DataRdBus.get()&0xFFFF
-
-    def waitForFlashReady(self):
-        while True:
-            self._writeToFlash(0x555,0x70)
-            status = self._readFromFlash(0x555)
-            if ( (status&0x80) != 0 ):
-                break
+        with self._profile.roundTrip(nbytes=8, count=2):
+            # Set the address
+            self.AddrBus.set(addr|0x80000000)
+            # Get the read data
+            return self.DataRdBus.get()&0xFFFF
+
+    def waitForFlashReady(self, backoff=False):
+        with self._profile.phase('poll'):
+            delay = self.POLL_MIN_PERIOD
+            while True:
+                self._writeToFlash(0x555,0x70)
+                status = self._readFromFlash(0x555)
+                if ( (status&0x80) != 0 ):
+                    break
+                if backoff:
+                    time.sleep(delay)
+                    delay = min(2*delay, self.POLL_MAX_PERIOD)
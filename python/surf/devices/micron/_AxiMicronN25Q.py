@@ -17,26 +17,28 @@ import pyrogue   as pr
 import surf.misc
 import click
 import time
-import datetime
-import math
+import os
+import numpy as np
 
-class AxiMicronN25Q(pr.Device):
+class AxiMicronN25Q(surf.misc.PromBase):
     def __init__(self,
             description = "AXI-Lite Micron N25Q and Micron MT25Q PROM",
             addrMode    = True, # False = 24-bit Address mode, True = 32-bit Address Mode
             tryCount    = 5,
+            mcsCache    = False, # Cache the parsed .MCS images on disk (surf.misc.McsCache)
+            journal     = True, # Journal the LoadMcsFile progress for ResumeMcsFile (surf.misc.McsJournal)
             hidden      = True,
             **kwargs):
 
         super().__init__(
             description = description,
             hidden      = hidden,
+            tryCount    = tryCount,
+            mcsCache    = mcsCache,
+            journal     = journal,
             **kwargs)
 
-        self._mcs      = surf.misc.McsReader()
         self._addrMode = addrMode
-        self._progDone = False
-        self._tryCount = tryCount
 
         ##############################
         # Setup variables
@@ -128,6 +130,35 @@ class AxiMicronN25Q(pr.Device):
         self.ERASE_3BYTE_CMD  = (0xD8 << 16)
         self.ERASE_4BYTE_CMD  = self.ERASE_3BYTE_CMD
 
+        self.SUBSECTOR_3BYTE_CMD = (0x20 << 16)
+        self.SUBSECTOR_4BYTE_CMD = self.SUBSECTOR_3BYTE_CMD
+
+        self.BULK_ERASE_CMD = (0xC7 << 16)
+        self.DIE_ERASE_CMD  = (0xC4 << 16)
+
+        # Typical erase times (in seconds) used by the erase planner
+        self.SUBSECTOR_ERASE_TIME = 0.25
+        self.SECTOR_ERASE_TIME    = 0.7
+        self.DIE_ERASE_TIME       = 240.0
+        self.BULK_ERASE_TIME      = 240.0
+
+        # Size of the sector erased by ERASE_3BYTE_CMD/ERASE_4BYTE_CMD (None = unknown)
+        self.SECTOR_SIZE = 0x10000
+
+        # Devices larger than one die (e.g. MT25Q 1Gb/2Gb) only support die erase
+        self.DIE_SIZE = (1 << 26)
+
+        # JEDEC memory capacity code to size in bytes
+        self.CAPACITY_SIZE = {
+            0x16 : (1 << 22), # 32 Mb
+            0x17 : (1 << 23), # 64 Mb
+            0x18 : (1 << 24), # 128 Mb
+            0x19 : (1 << 25), # 256 Mb
+            0x20 : (1 << 26), # 512 Mb
+            0x21 : (1 << 27), # 1 Gb
+            0x22 : (1 << 28), # 2 Gb
+        }
+
         self.WRITE_3BYTE_CMD  = (0x02 << 16)
         self.WRITE_4BYTE_CMD  = self.WRITE_3BYTE_CMD
 
@@ -162,24 +193,23 @@ class AxiMicronN25Q(pr.Device):
         self.VERIFY_MASK = 0x40000000
 
         self.add(pr.LocalCommand(
-            name        = 'LoadMcsFile',
-            function    = self._LoadMcsFile,
-            description = 'Load the .MCS into PROM',
+            name        = 'DiffLoadMcsFile',
+            function    = lambda arg: self._LoadMcsFile(arg, diff=True),
+            description = 'Load the .MCS into PROM, only erasing and writing the sectors that differ from the PROM',
             value       = '',
         ))
 
-    def _LoadMcsFile(self,arg):
-        # arg = value
-
-        click.secho(('%s.LoadMcsFile: %s' % (self.path,arg) ), fg='green')
-        self._progDone = False
-
-        # Start time measurement for profiling
-        start = time.time()
+        self.add(pr.LocalVariable(
+            name        = 'EraseBulkEn',
+            description = 'Allow the erase planner to use bulk/die erase (also erases the data outside of the .MCS image)',
+            value       = False,
+        ))
 
+    def _initFlash(self):
         # Reset the SPI interface
         self.resetFlash()
 
+    def _printStatus(self):
         # Print the status registers
         print("PROM Manufacturer ID Code  = {}".format(hex(self.getManufacturerId())))
         print("PROM Manufacturer Type     = {}".format(hex(self.getManufacturerType())))
@@ -187,155 +217,287 @@ class AxiMicronN25Q(pr.Device):
         print("PROM Status Register       = {}".format(hex(self.getPromStatusReg())))
         print("PROM Volatile Config Reg   = {}".format(hex(self.getPromConfigReg())))
 
-        # Open the MCS file
-        self._mcs.open(arg)
-
-        # Erase the PROM
-        self.eraseProm()
-
-        # Write to the PROM
-        self.writeProm()
-
-        # Verify the PROM
-        self.verifyProm()
-
-        # End time measurement for profiling
-        end = time.time()
-        elapsed = end - start
-        click.secho('LoadMcsFile() took %s to program the PROM' % datetime.timedelta(seconds=int(elapsed)), fg='green')
-
-        # Add a power cycle reminder
-        self._progDone = True
-        click.secho(
-            "\n\n\
-            ***************************************************\n\
-            ***************************************************\n\
-            The MCS data has been written into the PROM.       \n\
-            To reprogram the FPGA with the new PROM data,      \n\
-            a IPROG CMD or power cycle is be required.\n\
-            ***************************************************\n\
-            ***************************************************\n\n"
-            , bg='green',
-        )
+    def _resumeBoundary(self):
+        # Resume from the start of the sectors holding the journal watermarks
+        return self._sectorSize('ResumeMcsFile')
+
+    def _prepareRead(self):
+        # Reset the SPI interface
+        self.resetFlash()
+        self.waitForFlashReady()
+
+    def _readBlock(self, addr):
+        return self._readPage(addr)
 
     def eraseProm(self):
-        # Set the starting address index
-        address    = self._mcs.startAddr
-        # 64kB per sector
-        ERASE_SIZE = 0x10000
+        # Pick the cheapest mix of erase commands that covers the (not yet erased) image
+        geometry      = self.eraseGeometry()
+        sizes         = {name: size for name, size, seconds in geometry}
+        plan, seconds = surf.misc.planErase(self._journal.remaining(self._mcs.startAddr, self._mcs.endAddr+1), geometry)
+        click.secho(f'eraseProm(): {surf.misc.describePlan(plan, seconds)}', fg='green')
         # Setup the status bar
-        with click.progressbar(
-            iterable = range(math.ceil(self._mcs.size/ERASE_SIZE)),
+        with surf.misc.progressbar(
+            iterable = plan,
             label    = click.style('Erasing PROM:  ', fg='green'),
         ) as bar:
-            for i in bar:
+            for name, address in bar:
                 # Execute the erase command
-                self.eraseCmd(address)
-                # Increment by one block
-                address += ERASE_SIZE
-        # Check the corner case
-        if ( address<=self._mcs.endAddr ):
-            self.eraseCmd(address)
-
-    def writeProm(self):
-        # Initialize the variables
-        wordCnt = 0
-        byteCnt = 0
-        # Create a burst data array
-        dataArray = self.getDataReg(read=False)
+                if name == 'subsector':
+                    self.subsectorEraseCmd(address)
+                elif name == 'sector':
+                    self.eraseCmd(address)
+                elif name == 'die':
+                    self.dieEraseCmd(address)
+                else:
+                    self.bulkEraseCmd()
+                self._journal.erased(address, address+sizes[name])
+
+    def eraseGeometry(self):
+        # (name, size in bytes, typical erase time) from the smallest to the largest
+        geometry = [
+            ('subsector', 0x1000,  self.SUBSECTOR_ERASE_TIME),
+            ('sector',    self.getSectorSize(), self.SECTOR_ERASE_TIME),
+        ]
+        # Bulk/die erase also wipes whatever is outside of the image
+        if self.EraseBulkEn.get():
+            size = self.getDeviceSize()
+            if size > self.DIE_SIZE:
+                geometry.append(('die', self.DIE_SIZE, self.DIE_ERASE_TIME))
+            elif size > 0:
+                geometry.append(('bulk', size, self.BULK_ERASE_TIME))
+        return geometry
+
+    def getDeviceSize(self):
+        # 0 = unknown capacity code
+        return self.CAPACITY_SIZE.get(self.getManufacturerCapacity(), 0)
+
+    def getSectorSize(self):
+        # None = unknown sector size
+        return self.SECTOR_SIZE
+
+    def _sectorSize(self, name):
+        # The sector size is required to erase the PROM one sector at a time
+        size = self.getSectorSize()
+        if size is None:
+            click.secho(f'{name}(): unknown PROM sector size', fg='red')
+            raise surf.misc.McsException(f'{name}() Failed\n\n')
+        return size
+
+    def writeProm(self, start=None):
+        # Optional resume address
+        pages = self._mcs.pages(256, start)
+        stop  = self._mcs.endAddr+1
+        # Start time measurement for the throughput report
+        t0 = time.time()
         # Setup the status bar
-        with click.progressbar(
-            length   = self._mcs.size,
+        with surf.misc.progressbar(
+            length   = stop - (start or self._mcs.startAddr),
             label    = click.style('Writing PROM:  ', fg='green'),
         ) as bar:
-            for i in range(self._mcs.size):
-                # Check for first byte of burst transfer
-                if ( (i&0xFFF) == 0):
-                    # Throttle down printf rate
-                    bar.update(0xFFF)
-                # Get the start bursting address
-                if ( (byteCnt==0) and (wordCnt==0) ):
-                    addr = int(self._mcs.entry[i][0])
-                # Pack the bytes into a 32-bit word
-                if ( byteCnt==0 ):
-                    wrd = (int(self._mcs.entry[i][1]) & 0xFF) << (8*(3-byteCnt))
-                else:
-                    wrd |= (int(self._mcs.entry[i][1]) & 0xFF) << (8*(3-byteCnt))
-                # Increment the counter
-                byteCnt += 1
-                # Check the byte counter
-                if ( byteCnt==4 ):
-                    byteCnt = 0
-                    dataArray[wordCnt] = wrd
-                    wordCnt += 1
-                    if ( wordCnt==64 ):
-                        wordCnt = 0
-                        self.setDataReg(dataArray)
-                        self.writeCmd(addr)
-            # Close the status bar
-            bar.update(self._mcs.size)
-
-        # Check for leftover data
-        if ( (wordCnt != 0) or (byteCnt != 0) ):
-            while (wordCnt != 64):
-                # Pack the bytes into a 32-bit word
-                if ( byteCnt==0 ):
-                    wrd = (0xFF) << (8*(3-byteCnt))
-                else:
-                    wrd |= (0xFF) << (8*(3-byteCnt))
-                # Increment the counter
-                byteCnt += 1
-                # Check the byte counter
-                if ( byteCnt==4 ):
-                    byteCnt = 0
-                    dataArray[wordCnt] = wrd
-                    wordCnt += 1
-                    if ( wordCnt==64 ):
-                        self.setDataReg(dataArray)
-                        self.writeCmd(addr)
+            # Loop through the 256 byte pages (last page padded with 0xFF)
+            written, blank = self._writePages(self._journal.pages(pages, self._journal.written), bar)
+        self._journal.written(stop, force=True)
+        elapsed = max(time.time() - t0, 1e-6)
+        click.secho(f'writeProm(): skipped {blank} blank (0xFF) pages', fg='green')
+        click.secho(f'writeProm(): {written} pages at {written*256/elapsed/1e3:.1f} kB/s', fg='green')
+
+    def verifyProm(self, start=None):
+        stop = self._mcs.endAddr+1
+        # Wait for last transaction to finish
+        self.waitForFlashReady()
+        # Setup the status bar
+        with surf.misc.progressbar(
+            length  = stop - (start or self._mcs.startAddr),
+            label   = click.style('Verifying PROM:', fg='green'),
+        ) as bar:
+            # Loop through the 256 byte pages (optional resume address)
+            for addr, page in self._journal.pages(self._mcs.pages(256, start), self._journal.verified):
+                # Only compare the bytes that are in the MCS file
+                self._verifyPage(addr, page, min(256, stop-addr))
+                bar.update(256)
+        self._journal.verified(stop, force=True)
+
+    def diffProm(self):
+        # Sectors are compared, erased and rewritten as a whole
+        ERASE_SIZE = self._sectorSize('diffProm')
+
+        # Sectors can only be compared page by page if the pages are sector aligned
+        if (self._mcs.startAddr % 256) != 0:
+            click.secho('diffProm(): image is not page aligned, programming the whole image', fg='yellow')
+            self.eraseProm()
+            self.writeProm()
+            self.verifyProm()
+            return
+
+        # Wait for last transaction to finish
+        self.waitForFlashReady()
+
+        # Read back each sector and stop at the first page that differs
+        sectors = range(self._mcs.startAddr//ERASE_SIZE, self._mcs.endAddr//ERASE_SIZE+1)
+        dirty   = []
+        with surf.misc.progressbar(
+            iterable = sectors,
+            label    = click.style('Comparing PROM:', fg='green'),
+        ) as bar:
+            for sector in bar:
+                for addr, page in self._mcs.pages(256, sector*ERASE_SIZE, (sector+1)*ERASE_SIZE):
+                    size = min(256, self._mcs.endAddr+1-addr)
+                    if not np.array_equal(page[:size], self._readPage(addr)[:size]):
+                        dirty.append(sector)
                         break
 
-    def verifyProm(self):
+        click.secho(f'diffProm(): {len(sectors)-len(dirty)} of {len(sectors)} sectors unchanged (skipped)', fg='green')
+
+        # Erase and write the sectors that differ
+        with surf.misc.progressbar(
+            iterable = dirty,
+            label    = click.style('Writing PROM:  ', fg='green'),
+        ) as bar:
+            for sector in bar:
+                self.eraseCmd(sector*ERASE_SIZE)
+                self._writePages(self._mcs.pages(256, sector*ERASE_SIZE, (sector+1)*ERASE_SIZE))
+
         # Wait for last transaction to finish
         self.waitForFlashReady()
-        # Initialize the variables
-        wordCnt = 0
-        byteCnt = 0
+
+        # Verify the sectors that were written
+        with surf.misc.progressbar(
+            iterable = dirty,
+            label    = click.style('Verifying PROM:', fg='green'),
+        ) as bar:
+            for sector in bar:
+                for addr, page in self._mcs.pages(256, sector*ERASE_SIZE, (sector+1)*ERASE_SIZE):
+                    self._verifyPage(addr, page, min(256, self._mcs.endAddr+1-addr))
+
+    def _writePages(self, pages, bar=None):
+        ##################################################################
+        # Pipelined page programming:
+        #   1) Post the next page into DataReg/AddrReg while the flash is
+        #      still busy programming the previous page. The status reads
+        #      only use the RAM above 0x100 in the firmware, so the page
+        #      buffer (RAM 0x000:0x0FF) is free once the previous program
+        #      command has been shifted out.
+        #   2) Poll the status register with the command write and the
+        #      readback in flight together (one round trip wait per poll)
+        #   3) Post the write enable and program commands
+        # The transactions are only checked when the next step depends on
+        # them, so the link latency overlaps with the flash busy time.
+        ##################################################################
+        written = 0
+        blank   = 0
+        for addr, page in pages:
+            # Skip blank pages, the sector has already been erased to 0xFF
+            if page.min() == 0xFF:
+                blank += 1
+            else:
+                # Stage the next page while the previous one is programming
+                self._postVar(self.DataReg, page.view('>u4').astype(np.uint32))
+                self._postVar(self.AddrReg, addr)
+                # Wait for the previous program command to complete
+                self._pollFlashReady()
+                # Make sure the staged page has landed before programming it
+                self.checkBlocks(recurse=False, variable=self.DataReg)
+                self.checkBlocks(recurse=False, variable=self.AddrReg)
+                # Post the write enable and program commands
+                self._postVar(self.CmdReg, self.WRITE_MASK|self.WRITE_ENABLE_CMD)
+                if (self._addrMode):
+                    self._postVar(self.CmdReg, self.WRITE_MASK|self.WRITE_4BYTE_CMD|0x104)
+                else:
+                    self._postVar(self.CmdReg, self.WRITE_MASK|self.WRITE_3BYTE_CMD|0x103)
+                written += 1
+            if bar is not None:
+                bar.update(256)
+        # Wait for the last program command to be accepted
+        self.checkBlocks(recurse=False, variable=self.CmdReg)
+        return written, blank
+
+    def _postVar(self, var, value):
+        # A shadow value must not change while its own transaction is in flight
+        self.checkBlocks(recurse=False, variable=var)
+        var.set(value, write=False)
+        # Start the write transaction without waiting for the response
+        self.writeBlocks(force=True, recurse=False, variable=var)
+        self._profile.transaction(4*np.size(value))
+
+    def _pollFlashReady(self):
+        with self._profile.phase('poll'):
+            while True:
+                # Post the status read command and the readback together
+                self._postVar(self.CmdReg, self.READ_MASK|self.FLAG_STATUS_REG|0x1)
+                with self._profile.roundTrip():
+                    self.readBlocks(recurse=False, variable=self.CmdReg)
+                    self.checkBlocks(recurse=False, variable=self.CmdReg)
+                # Check if not busy
+                if self._isFlashReady(self.CmdReg.value()&0xFF):
+                    break
+
+    def _writePage(self, addr, page):
+        # Skip blank pages, the sector has already been erased to 0xFF
+        if page.min() == 0xFF:
+            return False
+        # Pack the 256 bytes into 64 big-endian 32-bit words
+        self.setDataReg(page.view('>u4').astype(np.uint32))
+        self.writeCmd(addr)
+        return True
+
+    def _readWords(self, addr):
+        # Post the address and read command, then the data buffer readback.
+        # The firmware holds off the buffer access until the SPI read is done,
+        # so the whole burst costs a single round trip wait.
+        self._postVar(self.AddrReg, addr)
+        if (self._addrMode):
+            self._postVar(self.CmdReg, self.READ_MASK|self.READ_4BYTE_CMD|0x104)
+        else:
+            self._postVar(self.CmdReg, self.READ_MASK|self.READ_3BYTE_CMD|0x103)
+        with self._profile.roundTrip(nbytes=256):
+            self.readBlocks(recurse=False, variable=self.DataReg)
+            self.checkBlocks(recurse=False, variable=self.DataReg)
+        return np.asarray(self.getDataReg(read=False), dtype=np.uint32)
+
+    def _readPage(self, addr):
+        # Unpack the 64 big-endian 32-bit words into bytes
+        return self._readWords(addr).astype('>u4').view(np.uint8)
+
+    def _verifyPage(self, addr, page, size=256):
+        words = self._readWords(addr)
+        # Blank pages only need an erased-state check of the readback words
+        if (page.min() == 0xFF) and (words.min() == 0xFFFFFFFF):
+            return
+        prom = words.astype('>u4').view(np.uint8)
+        # Compare PROM to file
+        diff = np.flatnonzero(page[:size] != prom[:size])
+        if len(diff) > 0:
+            i = diff[0]
+            click.secho(("\nAddr = 0x%x: MCS = 0x%x != PROM = 0x%x" % (addr+i,page[i],prom[i])), fg='red')
+            raise surf.misc.McsException('verifyProm() Failed\n\n')
+
+    def streamWriteProm(self, filename):
+        ERASE_SIZE = self._sectorSize('streamWriteProm')
+        lastSector = -1
         # Setup the status bar
-        with click.progressbar(
-            length  = self._mcs.size,
+        with surf.misc.progressbar(
+            length   = os.path.getsize(filename),
+            label    = click.style('Writing PROM:  ', fg='green'),
+        ) as bar:
+            # Loop through the 256 byte pages as they are decoded
+            for addr, page in self._mcs.stream(filename, 256, bar, baseAddr=self.ImageBaseAddr.get(), bitSwap=self.ImageBitSwap.get()):
+                # Erase each sector the first time that the page reaches it
+                for sector in range(max(addr//ERASE_SIZE, lastSector+1), (addr+255)//ERASE_SIZE+1):
+                    self.eraseCmd(sector*ERASE_SIZE)
+                    lastSector = sector
+                self._writePage(addr, page)
+
+    def streamVerifyProm(self, filename):
+        # Wait for last transaction to finish
+        self.waitForFlashReady()
+        # Setup the status bar
+        with surf.misc.progressbar(
+            length  = os.path.getsize(filename),
             label   = click.style('Verifying PROM:', fg='green'),
         ) as bar:
-            for i in range(self._mcs.size):
-                # Check for first byte of burst transfer
-                if ( (i&0xFFF) == 0):
-                    # Throttle down printf rate
-                    bar.update(0xFFF)
-                # Get the start bursting address
-                if ( (byteCnt==0) and (wordCnt==0) ):
-                    # Start address of a burst transfer
-                    self.readCmd(int(self._mcs.entry[i][0]))
-                    # Get the data
-                    dataArray = self.getDataReg()
-                # Get the data/addr for MCS file
-                data = int(self._mcs.entry[i][1])
-                addr = int(self._mcs.entry[i][0])
-                # Get the prom data from data array
-                prom = ((dataArray[wordCnt] >> 8*(3-byteCnt)) & 0xFF)
-                # Compare PROM to file
-                if (data != prom):
-                    click.secho(("\nAddr = 0x%x: MCS = 0x%x != PROM = 0x%x" % (addr,data,prom)), fg='red')
-                    raise surf.misc.McsException('verifyProm() Failed\n\n')
-                # Increment the counter
-                byteCnt += 1
-                # Check the byte counter
-                if ( byteCnt==4 ):
-                    byteCnt = 0
-                    wordCnt += 1
-                    if ( wordCnt==64 ):
-                        wordCnt = 0
-            # Close the status bar
-            bar.update(self._mcs.size)
+            # Loop through the 256 byte pages as they are decoded
+            for addr, page in self._mcs.stream(filename, 256, bar, baseAddr=self.ImageBaseAddr.get(), bitSwap=self.ImageBitSwap.get()):
+                self._verifyPage(addr, page, min(256, self._mcs.endAddr+1-addr))
 
     def eraseCmd(self, address):
         self.setAddrReg(address)
@@ -344,6 +506,23 @@ class AxiMicronN25Q(pr.Device):
         else:
             self.setCmd(self.WRITE_MASK|self.ERASE_3BYTE_CMD|0x3)
 
+    def subsectorEraseCmd(self, address):
+        self.setAddrReg(address)
+        if (self._addrMode):
+            self.setCmd(self.WRITE_MASK|self.SUBSECTOR_4BYTE_CMD|0x4)
+        else:
+            self.setCmd(self.WRITE_MASK|self.SUBSECTOR_3BYTE_CMD|0x3)
+
+    def dieEraseCmd(self, address):
+        self.setAddrReg(address)
+        if (self._addrMode):
+            self.setCmd(self.WRITE_MASK|self.DIE_ERASE_CMD|0x4)
+        else:
+            self.setCmd(self.WRITE_MASK|self.DIE_ERASE_CMD|0x3)
+
+    def bulkEraseCmd(self):
+        self.setCmd(self.WRITE_MASK|self.BULK_ERASE_CMD)
+
     def writeCmd(self, address):
         self.setAddrReg(address)
         if (self._addrMode):
@@ -418,13 +597,17 @@ class AxiMicronN25Q(pr.Device):
             self.setCmdReg(value)
 
     def waitForFlashReady(self):
-        while True:
-            # Get the status register
-            self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
-            status = (self.getCmdReg()&0xFF)
-            # Check if not busy
-            if ( (status & self.FLAG_STATUS_RDY) != 0 ):
-                break
+        with self._profile.phase('poll'):
+            while True:
+                # Get the status register
+                self.setCmdReg(self.READ_MASK|self.FLAG_STATUS_REG|0x1)
+                status = (self.getCmdReg()&0xFF)
+                # Check if not busy
+                if self._isFlashReady(status):
+                    break
+
+    def _isFlashReady(self, status):
+        return ( (status & self.FLAG_STATUS_RDY) != 0 )
 
     #########################################
     # Command wrappers
@@ -436,16 +619,24 @@ class AxiMicronN25Q(pr.Device):
             self.ModeReg.set(value=0x0)
 
     def setAddrReg(self,value):
-        self.AddrReg.set(value=value)
+        with self._profile.roundTrip():
+            self.AddrReg.set(value=value)
 
     def setCmdReg(self,value):
-        self.CmdReg.set(value=value)
+        with self._profile.roundTrip():
+            self.CmdReg.set(value=value)
 
     def getCmdReg(self):
-        return self.CmdReg.get()
+        with self._profile.roundTrip():
+            return self.CmdReg.get()
 
     def setDataReg(self,values):
-        self.DataReg.set(values)
+        with self._profile.roundTrip(nbytes=256):
+            self.DataReg.set(values)
 
     def getDataReg(self,read=True):
-        return self.DataReg.get(read=read)
+        # read=False returns the shadow value without a transaction
+        if not read:
+            return self.DataReg.get(read=False)
+        with self._profile.roundTrip(nbytes=256):
+            return self.DataReg.get()
@@ -0,0 +1,624 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM memory slave emulators
+#-----------------------------------------------------------------------------
+# Description:
+# Local rogue memory slaves that emulate the AXI-Lite register interface of
+# the AxiMicronN25Q, AxiMicronP30 and AxiMicronMt28ew firmware modules
+# together with the FLASH device behind them. They are used to benchmark and
+# regression test the PROM drivers without hardware:
+#
+#    emu  = surf.devices.micron.AxiMicronN25QEmulator(latency=100e-6)
+#    prom = surf.devices.micron.AxiMicronN25Q(memBase=emu)
+#
+# The FLASH busy times default to typical datasheet values and can be scaled
+# with timeScale. Every transaction is delayed by latency seconds on a worker
+# thread, so posted transactions overlap like they do on a real link. Each
+# emulator implements the _writeReg(addr, value)/_readReg(addr) register map.
+#-----------------------------------------------------------------------------
+# This file is part of the 'SLAC Firmware Standard Library'. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the 'SLAC Firmware Standard Library', including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import rogue.interfaces.memory as rim
+import numpy as np
+import threading
+import queue
+import time
+
+class _PromEmulator(rim.Slave):
+
+    def __init__(self, latency=0.0, timeScale=1.0, addrMask=0xFFF):
+        super().__init__(4, 4096)
+        self._latency    = latency
+        self._timeScale  = timeScale
+        self._addrMask   = addrMask
+        self._busyUntil  = 0.0 # FLASH device busy
+        self._stallUntil = 0.0 # AXI-Lite bus stalled by the firmware engine
+        self._queue      = queue.Queue()
+        self.resetCounters()
+
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def resetCounters(self):
+        self.counters = {
+            'read'        : 0, # Read/verify transactions
+            'write'       : 0, # Write/post transactions
+            'readBytes'   : 0,
+            'writeBytes'  : 0,
+            'flashCmds'   : 0, # Commands executed by the FLASH device
+            'ignoredCmds' : 0, # Commands sent while the FLASH was busy
+        }
+
+    def _doTransaction(self, transaction):
+        self._queue.put((time.monotonic()+self._latency, transaction))
+
+    def _stop(self):
+        self._queue.put((0, None))
+        self._thread.join()
+
+    def _worker(self):
+        while True:
+            deadline, transaction = self._queue.get()
+            if transaction is None:
+                return
+
+            # Injected link latency
+            self._sleepUntil(deadline)
+
+            # The AXI-Lite bus stalls while the firmware engine is busy
+            self._sleepUntil(self._stallUntil)
+
+            with transaction.lock():
+                addr = transaction.address() & self._addrMask
+                size = transaction.size()
+                try:
+                    if (transaction.type() == rim.Write) or (transaction.type() == rim.Post):
+                        data = bytearray(size)
+                        transaction.getData(data, 0)
+                        self.counters['write']      += 1
+                        self.counters['writeBytes'] += size
+                        self._write(addr, np.frombuffer(data, dtype='<u4').astype(np.uint32))
+                    else:
+                        self.counters['read']      += 1
+                        self.counters['readBytes'] += size
+                        data = self._read(addr, size//4)
+                        transaction.setData(bytearray(np.asarray(data, dtype='<u4').tobytes()), 0)
+                except Exception as e:
+                    transaction.error(f'{self.__class__.__name__}: {e}')
+                else:
+                    transaction.done()
+
+    @staticmethod
+    def _sleepUntil(deadline):
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _busy(self):
+        return time.monotonic() < self._busyUntil
+
+    def _setBusy(self, seconds):
+        self._busyUntil = time.monotonic() + seconds*self._timeScale
+
+    def _write(self, addr, words):
+        for i, value in enumerate(words):
+            self._writeReg(addr+4*i, int(value))
+
+    def _read(self, addr, count):
+        return [self._readReg(addr+4*i) for i in range(count)]
+
+class AxiMicronN25QEmulator(_PromEmulator):
+    """Emulates AxiMicronN25QReg.vhd with a Micron N25Q/MT25Q (or Cypress S25FL) SPI FLASH"""
+
+    def __init__(self,
+            size            = (1<<26),            # 512 Mb
+            jedecId         = (0x20, 0xBA, 0x20), # Manufacturer ID, type and capacity
+            tPageProgram    = 0.5e-3,
+            tSubsectorErase = 0.25,
+            tSectorErase    = 0.7,
+            tBulkErase      = 240.0,
+            dieSize         = (1<<26),
+            **kwargs):
+        super().__init__(**kwargs)
+        self.mem             = np.full(size, 0xFF, dtype=np.uint8)
+        self.jedecId         = jedecId
+        self.tPageProgram    = tPageProgram
+        self.tSubsectorErase = tSubsectorErase
+        self.tSectorErase    = tSectorErase
+        self.tBulkErase      = tBulkErase
+        self.dieSize         = dieSize
+
+        # Firmware registers and the 512 byte SPI buffer
+        self._ram    = np.zeros(512, dtype=np.uint8)
+        self._test   = 0
+        self._mode   = 0
+        self._addr   = 0
+        self._status = 0
+
+        # FLASH device state
+        self._wel    = False
+        self._addr4  = False
+        self._config = 0xFFFF
+
+    def image(self):
+        """Return the FLASH contents as bytes"""
+        return self.mem
+
+    def _write(self, addr, words):
+        # The data buffer is stored big-endian byte order per 32-bit word
+        if addr >= 0x200:
+            offset = addr - 0x200
+            self._ram[offset:offset+4*len(words)] = words.astype('>u4').view(np.uint8)
+        else:
+            super()._write(addr, words)
+
+    def _read(self, addr, count):
+        if addr >= 0x200:
+            offset = addr - 0x200
+            return self._ram[offset:offset+4*count].view('>u4').astype(np.uint32)
+        return super()._read(addr, count)
+
+    def _writeReg(self, addr, value):
+        if addr == 0x00:
+            self._test = value
+        elif addr == 0x04:
+            self._mode = value & 0x1
+        elif addr == 0x08:
+            self._addr = value
+        elif addr == 0x0C:
+            self._spiCmd(value)
+        else:
+            raise ValueError(f'Invalid write address 0x{addr:x}')
+
+    def _readReg(self, addr):
+        if addr == 0x00:
+            return self._test
+        elif addr == 0x04:
+            return self._mode
+        elif addr == 0x08:
+            return self._addr
+        elif addr == 0x0C:
+            return self._status
+        raise ValueError(f'Invalid read address 0x{addr:x}')
+
+    def _spiCmd(self, value):
+        rnw  = (value >> 31) & 0x1
+        cmd  = (value >> 16) & 0xFF
+        size = value & 0x1FF
+
+        # The address register is shifted out right after the command byte,
+        # followed by the data buffer starting at RAM[0]
+        addrBytes = list(self._addr.to_bytes(4, 'big')) if self._mode else list(self._addr.to_bytes(4, 'big')[1:])
+        mosi = np.array(addrBytes + list(self._ram[:max(0, size-len(addrBytes))]), dtype=np.uint8)[:size]
+        miso = self._flashCmd(cmd, mosi)
+
+        # The last received byte is latched in the status register
+        if size > 0:
+            self._status = int(miso[-1])
+            # Read commands store the received bytes (data lands at RAM[0])
+            if rnw == 0:
+                preset = 0x1FB if self._mode else 0x1FC
+                self._ram[(preset+1+np.arange(size)) % 512] = miso
+
+    def _flashCmd(self, cmd, mosi):
+        size = len(mosi)
+        miso = np.full(size, 0xFF, dtype=np.uint8)
+
+        # Only the status registers can be read while the FLASH is busy
+        busy = self._busy()
+        if busy and cmd not in (0x05, 0x70):
+            self.counters['ignoredCmds'] += 1
+            return miso
+        self.counters['flashCmds'] += 1
+
+        # 4-byte opcodes always use a 32-bit address
+        addrLen = 4 if (self._addr4 or cmd in (0x12, 0x13, 0x21, 0xDC)) else 3
+        addr    = int.from_bytes(bytes(mosi[:addrLen]), 'big') % len(self.mem)
+
+        if cmd == 0x06:   # Write enable
+            self._wel = True
+        elif cmd == 0x04: # Write disable
+            self._wel = False
+        elif cmd == 0x05: # Status register: WIP = bit0, WEL = bit1
+            miso[:] = (int(self._wel) << 1) | int(busy)
+        elif cmd == 0x70: # Flag status register: ready = bit7
+            miso[:] = (0x00 if busy else 0x80) | int(self._addr4)
+        elif cmd == 0x9F: # Device ID
+            for i in range(min(size, len(self.jedecId))):
+                miso[i] = self.jedecId[i]
+        elif cmd in (0x85, 0xB5): # Read configuration
+            miso[:] = self._config & 0xFF
+        elif cmd in (0x01, 0x81, 0xB1): # Write status/configuration
+            if size > 0:
+                self._config = int.from_bytes(bytes(mosi[:2]), 'big')
+            self._wel = False
+        elif cmd == 0xB7: # Enter 4-byte address mode
+            self._addr4 = True
+        elif cmd == 0xE9: # Exit 4-byte address mode
+            self._addr4 = False
+        elif cmd in (0x66, 0x99, 0xF0, 0xFF): # Reset
+            self._wel = False
+        elif cmd in (0x03, 0x13): # Read
+            n = size - addrLen
+            if n > 0:
+                miso[addrLen:] = self.mem[(addr + np.arange(n)) % len(self.mem)]
+        elif cmd in (0x02, 0x12): # Page program (wraps within the 256 byte page)
+            if self._wel:
+                data = mosi[addrLen:]
+                idx  = (addr & ~0xFF) + (((addr & 0xFF) + np.arange(len(data))) & 0xFF)
+                self.mem[idx] &= data
+                self._setBusy(self.tPageProgram)
+            self._wel = False
+        elif cmd in (0x20, 0x21): # 4kB subsector erase
+            self._erase(addr, 0x1000, self.tSubsectorErase)
+        elif cmd in (0xD8, 0xDC): # 64kB sector erase
+            self._erase(addr, 0x10000, self.tSectorErase)
+        elif cmd == 0xC4: # Die erase
+            self._erase(addr, min(self.dieSize, len(self.mem)), self.tBulkErase)
+        elif cmd in (0xC7, 0x60): # Bulk erase
+            self._erase(0, len(self.mem), self.tBulkErase)
+        return miso
+
+    def _erase(self, addr, size, seconds):
+        if self._wel:
+            start = addr - (addr % size)
+            self.mem[start:start+size] = 0xFF
+            self._setBusy(seconds)
+        self._wel = False
+
+class _ParallelPromEmulator(_PromEmulator):
+    """Common register interface of AxiMicronP30Reg.vhd and AxiMicronMt28ewReg.vhd"""
+
+    def __init__(self, size, blockSize, tWordProgram, tBlockErase, **kwargs):
+        super().__init__(**kwargs)
+        self.mem          = np.full(size//2, 0xFFFF, dtype=np.uint16)
+        self.blockSize    = blockSize # 16-bit words
+        self.tWordProgram = tWordProgram
+        self.tBlockErase  = tBlockErase
+
+        # Firmware registers and the 256 x 16-bit burst buffer
+        self._ram      = np.zeros(256, dtype=np.uint16)
+        self._test     = 0
+        self._wrCmd    = 0
+        self._wrData   = 0
+        self._rnw      = 0
+        self._addr     = 0
+        self._dataReg  = 0
+        self._xferSize = 0
+
+    def image(self):
+        """Return the FLASH contents as little-endian bytes"""
+        return self.mem.astype('<u2').view(np.uint8)
+
+    def _write(self, addr, words):
+        if addr >= 0x400:
+            offset = (addr - 0x400) >> 2
+            self._ram[offset:offset+len(words)] = words & 0xFFFF
+        else:
+            super()._write(addr, words)
+
+    def _read(self, addr, count):
+        if addr >= 0x400:
+            offset = (addr - 0x400) >> 2
+            return self._ram[offset:offset+count].astype(np.uint32)
+        return super()._read(addr, count)
+
+    def _readReg(self, addr):
+        if addr == 0x00:
+            return (self._wrCmd << 16) | self._wrData
+        elif addr in (0x04, 0x84):
+            return (self._rnw << 31) | self._addr
+        elif addr == 0x08:
+            return self._dataReg
+        elif addr == 0x0C:
+            return self._test
+        elif addr == 0x10:
+            return 0x0
+        elif addr == 0x80:
+            return self._xferSize
+        raise ValueError(f'Invalid read address 0x{addr:x}')
+
+    def _writeReg(self, addr, value):
+        if addr == 0x00:
+            self._wrCmd  = (value >> 16) & 0xFFFF
+            self._wrData = value & 0xFFFF
+        elif addr == 0x04:
+            self._rnw  = (value >> 31) & 0x1
+            self._addr = value & 0x7FFFFFFF
+            self._busCycle()
+        elif addr == 0x0C:
+            self._test = value
+        elif addr == 0x80:
+            self._xferSize = value & 0xFF
+        elif addr == 0x84:
+            self._rnw  = (value >> 31) & 0x1
+            self._addr = value & 0x7FFFFFFF
+            if self._rnw:
+                self._burstRead()
+            else:
+                # The firmware polls the FLASH internally, so the bus stalls
+                # until the whole burst is programmed
+                elapsed = self._burstWrite()
+                self._busyUntil  = 0.0
+                self._stallUntil = time.monotonic() + elapsed*self._timeScale
+        else:
+            raise ValueError(f'Invalid write address 0x{addr:x}')
+
+    def _blockRange(self, addr):
+        start = addr - (addr % self.blockSize)
+        return start, start+self.blockSize
+
+    def cfiRegions(self):
+        """Erase block regions: [(number of blocks, block size in bytes), ...]"""
+        return [(len(self.mem)//self.blockSize, 2*self.blockSize)]
+
+    def _cfiRead(self, addr):
+        # Query string, device size (2^n bytes) and erase block regions
+        table = {0x10: ord('Q'), 0x11: ord('R'), 0x12: ord('Y'), 0x27: (2*len(self.mem)).bit_length()-1}
+        regions = self.cfiRegions()
+        table[0x2C] = len(regions)
+        for i, (count, size) in enumerate(regions):
+            for j, b in enumerate([(count-1) & 0xFF, (count-1) >> 8, (size//256) & 0xFF, (size//256) >> 8]):
+                table[0x2D+4*i+j] = b
+        return table.get(addr & 0xFF, 0x0000)
+
+    def _program(self, addr, data):
+        self.mem[addr % len(self.mem)] &= data
+        self._setBusy(self.tWordProgram)
+
+    def _eraseBlock(self, addr):
+        start, stop = self._blockRange(addr % len(self.mem))
+        self.mem[start:stop] = 0xFFFF
+        self._setBusy(self.tBlockErase)
+
+class AxiMicronP30Emulator(_ParallelPromEmulator):
+    """Emulates AxiMicronP30Reg.vhd with a Micron P30 (Intel command set) parallel FLASH"""
+
+    def __init__(self,
+            size          = (1<<25), # 256 Mb
+            paramBlocks   = 4,       # 16 kword parameter blocks at the bottom of the array
+            paramSize     = 0x4000,
+            blockSize     = 0x10000,
+            tWordProgram  = 150e-6,
+            tParamErase   = 0.4,
+            tBlockErase   = 0.8,
+            **kwargs):
+        super().__init__(size=size, blockSize=blockSize, tWordProgram=tWordProgram, tBlockErase=tBlockErase, **kwargs)
+        self.paramBlocks = paramBlocks
+        self.paramSize   = paramSize
+        self.tParamErase = tParamErase
+
+        # FLASH device state: blocks are locked at power up
+        self._locked     = set(self._blockRange(a)[0] for a in range(0, len(self.mem), self.paramSize))
+        self._readMode   = 'array'
+        self._pending    = None
+        self._flashStat  = 0x00
+
+    def _blockRange(self, addr):
+        paramEnd = self.paramBlocks*self.paramSize
+        if addr < paramEnd:
+            start = addr - (addr % self.paramSize)
+            return start, start+self.paramSize
+        start = paramEnd + ((addr-paramEnd) - ((addr-paramEnd) % self.blockSize))
+        return start, start+self.blockSize
+
+    def cfiRegions(self):
+        paramEnd = self.paramBlocks*self.paramSize
+        return [(self.paramBlocks, 2*self.paramSize), ((len(self.mem)-paramEnd)//self.blockSize, 2*self.blockSize)]
+
+    def _busCycle(self):
+        # Command cycle followed by a data write or read cycle
+        self._busWrite(self._addr, self._wrCmd)
+        if self._rnw:
+            self._dataReg = self._busRead(self._addr)
+        else:
+            self._busWrite(self._addr, self._wrData)
+
+    def _burstRead(self):
+        for i in range(self._xferSize+1):
+            self._busWrite(self._addr+i, 0xFF)
+            self._ram[i] = self._busRead(self._addr+i)
+
+    def _burstWrite(self):
+        elapsed = 0.0
+        for i in range(self._xferSize+1):
+            addr = self._addr+i
+            while True:
+                self._busWrite(addr, 0x60)
+                self._busWrite(addr, 0xD0)
+                self._busWrite(addr, 0x50)
+                self._busWrite(addr, 0x50)
+                self._busWrite(addr, 0x40)
+                self._busWrite(addr, int(self._ram[i]))
+                # Account for the FLASH busy time instead of polling it
+                elapsed += self.tWordProgram
+                self._busyUntil = 0.0
+                self._busWrite(addr, 0x70)
+                if (self._busRead(addr) & 0x10) == 0:
+                    break
+            self._busWrite(addr, 0x60)
+            self._busWrite(addr, 0x01)
+        return elapsed
+
+    def _busWrite(self, addr, data):
+        addr %= len(self.mem)
+        # Only the read status command is accepted while the FLASH is busy
+        if self._busy() and self._pending is None:
+            if (data & 0xFF) == 0x70:
+                self._readMode = 'status'
+            else:
+                self.counters['ignoredCmds'] += 1
+            return
+
+        pending, self._pending = self._pending, None
+        if pending == 'program':
+            self.counters['flashCmds'] += 1
+            self._readMode = 'status'
+            if self._blockRange(addr)[0] in self._locked:
+                self._flashStat |= 0x12
+            else:
+                self._program(addr, data)
+        elif pending == 'erase':
+            self.counters['flashCmds'] += 1
+            self._readMode = 'status'
+            if (data & 0xFF) != 0xD0:
+                self._flashStat |= 0x30 # Command sequence error
+            elif self._blockRange(addr)[0] in self._locked:
+                self._flashStat |= 0x22
+            else:
+                start, stop = self._blockRange(addr)
+                self.mem[start:stop] = 0xFFFF
+                self._setBusy(self.tParamErase if (stop-start) == self.paramSize else self.tBlockErase)
+        elif pending == 'lock':
+            self.counters['flashCmds'] += 1
+            if (data & 0xFF) == 0xD0:
+                self._locked.discard(self._blockRange(addr)[0])
+            elif (data & 0xFF) in (0x01, 0x2F):
+                self._locked.add(self._blockRange(addr)[0])
+            elif (data & 0xFF) == 0x03:
+                pass # Read configuration register setup (address = configuration)
+            else:
+                self._flashStat |= 0x30
+        else:
+            cmd = data & 0xFF
+            if cmd == 0xFF:
+                self._readMode = 'array'
+            elif cmd == 0x70:
+                self._readMode = 'status'
+            elif cmd == 0x90:
+                self._readMode = 'id'
+            elif cmd == 0x98:
+                self._readMode = 'cfi'
+            elif cmd == 0x50:
+                self._flashStat = 0x00
+            elif cmd in (0x40, 0x10):
+                self._pending = 'program'
+            elif cmd == 0x20:
+                self._pending = 'erase'
+            elif cmd == 0x60:
+                self._pending = 'lock'
+
+    def _busRead(self, addr):
+        addr %= len(self.mem)
+        if self._readMode == 'status':
+            return (0x00 if self._busy() else 0x80) | self._flashStat
+        elif self._readMode == 'id':
+            offset = addr - self._blockRange(addr)[0]
+            if offset == 0:
+                return 0x0089 # Manufacturer code
+            elif offset == 1:
+                return 0x8919 # Device code
+            elif offset == 2:
+                return int(self._blockRange(addr)[0] in self._locked)
+            return 0x0000
+        elif self._readMode == 'cfi':
+            return self._cfiRead(addr)
+        return int(self.mem[addr])
+
+class AxiMicronMt28ewEmulator(_ParallelPromEmulator):
+    """Emulates AxiMicronMt28ewReg.vhd with a Micron MT28EW (AMD command set) parallel FLASH"""
+
+    def __init__(self,
+            size          = (1<<25), # 256 Mb
+            blockSize     = 0x10000, # Uniform 64 kword blocks
+            tWordProgram  = 25e-6,
+            tBlockErase   = 0.5,
+            tChipErase    = 80.0,
+            **kwargs):
+        super().__init__(size=size, blockSize=blockSize, tWordProgram=tWordProgram, tBlockErase=tBlockErase, **kwargs)
+        self.tChipErase = tChipErase
+
+        # FLASH device state
+        self._cycle    = 0
+        self._pending  = None
+        self._readMode = 'array'
+
+    def _busCycle(self):
+        # Single bus cycle
+        if self._rnw:
+            self._dataReg = self._busRead(self._addr)
+        else:
+            self._busWrite(self._addr, self._wrData)
+
+    def _burstRead(self):
+        for i in range(self._xferSize+1):
+            self._ram[i] = self._busRead(self._addr+i)
+
+    def _burstWrite(self):
+        elapsed = 0.0
+        for i in range(self._xferSize+1):
+            self._busWrite(0x555, 0xAA)
+            self._busWrite(0x2AA, 0x55)
+            self._busWrite(0x555, 0xA0)
+            self._busWrite(self._addr+i, int(self._ram[i]))
+            # Account for the FLASH busy time instead of polling it
+            elapsed += self.tWordProgram
+            self._busyUntil = 0.0
+            self._busWrite(0x555, 0x70)
+            self._busRead(0x555)
+        return elapsed
+
+    def _busWrite(self, addr, data):
+        addr  %= len(self.mem)
+        unlock = addr & 0x7FF
+        data  &= 0xFFFF
+
+        # Only the read status command is accepted while the FLASH is busy
+        if self._busy():
+            if (unlock == 0x555) and (data & 0xFF) == 0x70:
+                self._readMode = 'status'
+            else:
+                self.counters['ignoredCmds'] += 1
+            return
+
+        cycle, self._cycle = self._cycle, 0
+        if self._pending == 'program':
+            self._pending = None
+            self.counters['flashCmds'] += 1
+            self._program(addr, data)
+            return
+
+        cmd = data & 0xFF
+        if cmd == 0xF0:
+            self._readMode = 'array'
+            self._pending  = None
+        elif cycle in (0, 3) and unlock == 0x555 and cmd == 0xAA:
+            self._cycle = cycle+1
+        elif cycle in (1, 4) and unlock == 0x2AA and cmd == 0x55:
+            self._cycle = cycle+1
+        elif cycle == 2 and unlock == 0x555:
+            if cmd == 0xA0:
+                self._pending = 'program'
+            elif cmd == 0x80:
+                self._cycle = 3
+            elif cmd == 0x90:
+                self._readMode = 'id'
+        elif cycle == 5:
+            self.counters['flashCmds'] += 1
+            if cmd == 0x30:
+                self._eraseBlock(addr)
+            elif unlock == 0x555 and cmd == 0x10:
+                self.mem[:] = 0xFFFF
+                self._setBusy(self.tChipErase)
+        elif cycle == 0 and unlock == 0x555 and cmd == 0x70:
+            self._readMode = 'status'
+        elif cycle == 0 and (addr & 0xFF) == 0x55 and cmd == 0x98:
+            self._readMode = 'cfi'
+
+    def _busRead(self, addr):
+        addr %= len(self.mem)
+        if self._readMode == 'status':
+            # The status register is only returned by the first read
+            self._readMode = 'array'
+            return 0x00 if self._busy() else 0x80
+        elif self._readMode == 'id':
+            return (0x0089, 0x227E)[addr & 0x1] if (addr & 0xFF) < 2 else 0x0000
+        elif self._readMode == 'cfi':
+            return self._cfiRead(addr)
+        return int(self.mem[addr])
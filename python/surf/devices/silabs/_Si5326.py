@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.devices.silabs as silabs
 import click
 import fnmatch
 
@@ -44,39 +45,36 @@ class Si5326(pr.Device):
         ##############################
         # Commands
         ##############################
-        @self.command(value='',description="Load the .txt from DSPLLsim",)
+        @self.command(value='',description="Load the .txt from DSPLLsim (path or compiled silabs.Si532xConfig)",)
         def LoadTxtFile(arg):
-            # Check if non-empty argument
-            if (arg != ""):
-                path = arg
-            else:
-                # Use the variable path instead
-                path = self.TxtFilePath.get()
+            # Check for an already compiled .txt (silabs.Si532xConfig)
+            if isinstance(arg, silabs.Si532xConfig):
+                click.secho( f'{self.path}.LoadTxtFile(): {arg.source}', fg='green')
+                config = arg
 
-            # Check for .txt file
-            if fnmatch.fnmatch(path, '*.txt'):
-                click.secho( f'{self.path}.LoadTxtFile(): {path}', fg='green')
             else:
-                click.secho( f'{self.path}.LoadTxtFile(): {path} is not .txt', fg='red')
-                return
-
-            # Open the .txt file
-            fh = open(path,'r')
-            all_lines = fh.readlines()
-            fh.close()
-
-            # Process the read file
-            for line in all_lines:
-                if line.find('#') < 0:
-                    addr,data = line.replace('h','').replace(',','').split()
-                    self._setValue(
-                        offset = int(addr)<<2,
-                        data   = int(data,16),
-                    )
-
-            # Update local RemoteVariables and verify conflagration
-            self.readBlocks(recurse=True)
-            self.checkBlocks(recurse=True)
+                # Check if non-empty argument
+                if (arg != ""):
+                    path = arg
+                else:
+                    # Use the variable path instead
+                    path = self.TxtFilePath.get()
+
+                # Check for .txt file
+                if fnmatch.fnmatch(path, '*.txt'):
+                    click.secho( f'{self.path}.LoadTxtFile(): {path}', fg='green')
+                else:
+                    click.secho( f'{self.path}.LoadTxtFile(): {path} is not .txt', fg='red')
+                    return
+
+                # Open the .txt file (only parsed the first time)
+                config = silabs.Si532xConfig.fromTxtFile(path)
+
+            # Write the registers in file order with one transaction per run of contiguous addresses
+            config.write(self)
+
+            # Update local RemoteVariables and verify conflagration (only the written registers)
+            config.verify(self, name=f'{self.path}.LoadTxtFile')
 
         ###########################
         #      Register[0]
@@ -0,0 +1,124 @@
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# Compiled DSPLLsim .txt register map of the Si5324/Si5326. The registers are
+# kept in file order (ICAL in register 136 is the last write of the file) and
+# grouped into runs of contiguous addresses, each run being written (or read
+# back) with a single transaction instead of one bulk DataBlock access per
+# register. Compiled files are memoized by the file hash so that loading the
+# same profile into many devices only parses it once:
+#
+#    config = silabs.Si532xConfig.fromTxtFile('profile.txt')
+#    for dev in devices:
+#        dev.LoadTxtFile(config)
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+import hashlib
+import threading
+
+def readTxtLines(lines):
+    # Returns the [(register address, value)] of the lines of a DSPLLsim .txt register map (file order)
+    regs = []
+    for line in lines:
+        if (line.find('#') < 0) and line.strip():
+            addr,data = line.replace('h','').replace(',','').split()
+            regs.append((int(addr), int(data,16)))
+    return regs
+
+def readTxtFile(path):
+    # Returns the [(register address, value)] of a DSPLLsim .txt register map (file order)
+    with open(path,'r') as fh:
+        return readTxtLines(fh)
+
+class Si532xConfig():
+
+    # {file hash: Si532xConfig} of the compiled .txt files
+    _cache = {}
+    _lock  = threading.Lock()
+
+    # Self-clearing fields of register 136, not checked by verify()
+    selfClearing = ['RST_REG', 'ICAL']
+
+    def __init__(self, regs, source=''):
+        self.source = source
+        self.regs   = list(regs)
+        self.runs   = []
+        # Runs of contiguous addresses, in file order
+        for addr, value in self.regs:
+            if self.runs and (self.runs[-1][0]+len(self.runs[-1][1]) == addr):
+                self.runs[-1][1].append(value)
+            else:
+                self.runs.append((addr, [value]))
+        # Register image and mask of the addresses in the .txt
+        self.image = np.zeros(0x100, dtype=np.uint32)
+        self.mask  = np.zeros(0x100, dtype=bool)
+        for addr, value in self.regs:
+            self.image[addr] = value
+            self.mask[addr]  = True
+
+    def __len__(self):
+        return len(self.regs)
+
+    @classmethod
+    def fromTxtFile(cls, path):
+        # Compile a DSPLLsim .txt once per file contents
+        with open(path, 'rb') as f:
+            data = f.read()
+        key = hashlib.sha256(data).hexdigest()
+        with cls._lock:
+            config = cls._cache.get(key)
+        if config is None:
+            # Parse the bytes that were hashed
+            config = cls(readTxtLines(data.decode().splitlines()), source=path)
+            with cls._lock:
+                cls._cache[key] = config
+        return config
+
+    def write(self, dev):
+        # Write the registers into dev.DataBlock in file order, one transaction per run
+        for index, values in self.runs:
+            # Keep the local copies of the registers up to date
+            for i, value in enumerate(values):
+                dev.DataBlock.set(value=value, index=index+i, write=False)
+            dev._rawWrite(offset=index<<2, data=values)
+        return len(self.runs)
+
+    def ignoredBits(self, dev):
+        # {register address: bit mask} of the fields that do not read back the written value:
+        # status (mode='RO'), sticky flag (*_FLG, cleared by writing 0) and self-clearing fields
+        ignored = {}
+        for var in dev.variables.values():
+            if (var.name != 'DataBlock') and hasattr(var, 'offset') and \
+               ((var.mode == 'RO') or var.name.endswith('_FLG') or (var.name in self.selfClearing)):
+                bitSize   = var.bitSize if isinstance(var.bitSize, list) else [var.bitSize]
+                bitOffset = var.bitOffset if isinstance(var.bitOffset, list) else [var.bitOffset]
+                for size, offset in zip(bitSize, bitOffset):
+                    ignored[var.offset>>2] = ignored.get(var.offset>>2, 0) | (((1<<size)-1)<<offset)
+        return ignored
+
+    def verify(self, dev, name='LoadTxtFile'):
+        # Read back only the written registers, one transaction per run
+        ignored  = self.ignoredBits(dev)
+        mismatch = []
+        for index, values in self.runs:
+            readback = dev._rawRead(offset=index<<2, numWords=len(values))
+            if len(values) == 1:
+                readback = [readback]
+            for i, data in enumerate(readback):
+                # Update the local copies of the registers
+                dev.DataBlock.set(value=data, index=index+i, write=False)
+                mask = 0xFF & ~ignored.get(index+i, 0)
+                if ((data ^ int(self.image[index+i])) & mask) != 0:
+                    mismatch.append((index+i, int(self.image[index+i]), data))
+        if mismatch:
+            addr, value, data = mismatch[0]
+            click.secho(f'{name}(): {len(mismatch)} registers read back different (first: {addr} = 0x{data:02X}, expected 0x{value:02X})', fg='red')
+        return mismatch
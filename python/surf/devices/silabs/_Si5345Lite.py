@@ -10,7 +10,6 @@
 
 import pyrogue as pr
 import surf.devices.silabs as silabs
-import csv
 import click
 import fnmatch
 
@@ -33,50 +32,13 @@ class Si5345Lite(pr.Device):
         ##############################
         # Commands
         ##############################
-        @self.command(value='',description="Load the .CSV from CBPro.",)
+        @self.command(value='',description="Load the .CSV from CBPro (path or compiled silabs.Si53xxConfig).",)
         def LoadCsvFile(arg):
-            # Check if non-empty argument
-            if (arg != ""):
-                path = arg
-            else:
-                # Use the variable path instead
-                path = self.CsvFilePath.get()
+            self._LoadCsvFile(arg)
 
-            # Check for .csv file
-            if fnmatch.fnmatch(path, '*.csv'):
-                click.secho( f'{self.path}.LoadCsvFile(): {path}', fg='green')
-            else:
-                click.secho( f'{self.path}.LoadCsvFile(): {path} is not .csv', fg='red')
-                return
-
-            # Power down during the configuration load
-            self.Page0.PDN.set(0x1)
-
-            # Open the .CSV file
-            with open(path) as csvfile:
-                reader = csv.reader(csvfile, delimiter=',', quoting=csv.QUOTE_NONE)
-                # Loop through the rows in the CSV file
-                for row in reader:
-                    if (row[0]!='Address'):
-                        self._setValue(
-                            offset = (int(row[0],16)<<2),
-                            data   = int(row[1],16),
-                        )
-
-            # Update local RemoteVariables and verify conflagration
-            self.readBlocks(recurse=True)
-            self.checkBlocks(recurse=True)
-
-            # Execute the Page5.BW_UPDATE_PLL command
-            self.Page5.BW_UPDATE_PLL.set(0x1)
-            self.Page5.BW_UPDATE_PLL.set(0x0)
-
-            # Power Up after the configuration load
-            self.Page0.PDN.set(0x0)
-
-            # Clear the internal error flags
-            self.Page0.ClearIntErrFlag.set(0x1)
-            self.Page0.ClearIntErrFlag.set(0x0)
+        @self.command(value='',description="Load the .CSV from CBPro, only writing the registers that differ from the device (no-op if none differ).",)
+        def DiffLoadCsvFile(arg):
+            self._LoadCsvFile(arg, diff=True)
 
         ##############################
         # Pages
@@ -108,6 +70,59 @@ class Si5345Lite(pr.Device):
             linkedGet    = lambda: (False if self.Page0.LOL.value() else True)
         ))
 
+    def _LoadCsvFile(self, arg, diff=False):
+        # Check for an already compiled .CSV (silabs.Si53xxConfig)
+        if isinstance(arg, silabs.Si53xxConfig):
+            click.secho( f'{self.path}.LoadCsvFile(): {arg.source}', fg='green')
+            regs = arg
+
+        else:
+            # Check if non-empty argument
+            if (arg != ""):
+                path = arg
+            else:
+                # Use the variable path instead
+                path = self.CsvFilePath.get()
+
+            # Check for .csv file
+            if fnmatch.fnmatch(path, '*.csv'):
+                click.secho( f'{self.path}.LoadCsvFile(): {path}', fg='green')
+            else:
+                click.secho( f'{self.path}.LoadCsvFile(): {path} is not .csv', fg='red')
+                return
+
+            # Open the .CSV file (only parsed the first time)
+            regs = silabs.Si53xxConfig.fromCsvFile(path)
+
+        # Check for differential loading
+        if diff:
+            # Only write the registers that differ from the device
+            regs = silabs.diffRegisters(self._pages, regs)
+            if not regs:
+                click.secho( f'{self.path}.LoadCsvFile(): device already configured, nothing to write', fg='green')
+                return
+            click.secho( f'{self.path}.LoadCsvFile(): {len(regs)} registers differ', fg='green')
+
+        # Power down during the configuration load
+        self.Page0.PDN.set(0x1)
+
+        # Write the registers with one transaction per run of contiguous addresses
+        silabs.writeRegisters(self._pages, regs)
+
+        # Update local RemoteVariables and verify conflagration (only the written registers)
+        silabs.verifyRegisters(self._pages, regs, name=f'{self.path}.LoadCsvFile')
+
+        # Execute the Page5.BW_UPDATE_PLL command
+        self.Page5.BW_UPDATE_PLL.set(0x1)
+        self.Page5.BW_UPDATE_PLL.set(0x0)
+
+        # Power Up after the configuration load
+        self.Page0.PDN.set(0x0)
+
+        # Clear the internal error flags
+        self.Page0.ClearIntErrFlag.set(0x1)
+        self.Page0.ClearIntErrFlag.set(0x0)
+
     def _setValue(self,offset,data):
         # Note: index is byte index (not word index)
         self._pages[offset // 0x400].DataBlock.set(value=data,index=(offset%0x400)>>2)
@@ -21,6 +21,10 @@ class Si5345PageBase(pr.Device):
 
         super().__init__(name=name, description=description, **kwargs)
 
+        # {register index: bit mask} of the fields that do not read back the
+        # written value (WO commands and RO status), see MyLinkVariable()
+        self.ignoredBits = {}
+
         self.add(pr.RemoteVariable(
             name         = "DataBlock",
             description  = "",
@@ -41,6 +45,9 @@ class Si5345PageBase(pr.Device):
 
     def MyLinkVariable(self, name, description, offset, bitSize, mode, bitOffset=0, pollInterval=0, value=None, hidden=False):
 
+        if mode != 'RW':
+            self.ignoredBits[offset//4] = self.ignoredBits.get(offset//4, 0) | (((2**bitSize)-1)<<bitOffset)
+
         self.add(pr.LinkVariable(
             name         = name,
             description  = description,
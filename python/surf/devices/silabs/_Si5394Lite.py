@@ -10,7 +10,6 @@
 
 import pyrogue as pr
 import surf.devices.silabs as silabs
-import csv
 import click
 import fnmatch
 import time
@@ -34,59 +33,13 @@ class Si5394Lite(pr.Device):
         ##############################
         # Commands
         ##############################
-        @self.command(value='',description="Load the .CSV from CBPro.",)
+        @self.command(value='',description="Load the .CSV from CBPro (path or compiled silabs.Si53xxConfig).",)
         def LoadCsvFile(arg):
-            # Check if non-empty argument
-            if (arg != ""):
-                path = arg
-            else:
-                # Use the variable path instead
-                path = self.CsvFilePath.get()
+            self._LoadCsvFile(arg)
 
-            # Check for .csv file
-            if fnmatch.fnmatch(path, '*.csv'):
-                click.secho( f'{self.path}.LoadCsvFile(): {path}', fg='green')
-            else:
-                click.secho( f'{self.path}.LoadCsvFile(): {path} is not .csv', fg='red')
-                return
-
-            # write in the preamble:
-            # Write 0x0B24 = 0xC0
-            # Write 0x0B25 = 0x00
-            # Write 0x0540 = 0x01
-            self._setValue(offset=0x0B24<<2,data=0xC0)
-            self._setValue(offset=0x0B25<<2,data=0x00)
-            self._setValue(offset=0x0540<<2,data=0x01)
-
-            # Wait 300 ms for Grade A/B/C/D/J/K/L/M, Wait 625ms for Grade P/E
-            time.sleep(1.0)
-
-            # Open the .CSV file
-            with open(path) as csvfile:
-                reader = csv.reader(csvfile, delimiter=',', quoting=csv.QUOTE_NONE)
-                # Loop through the rows in the CSV file
-                for row in reader:
-                    if (row[0]!='Address'):
-                        self._setValue(
-                            offset = (int(row[0],16)<<2),
-                            data   = int(row[1],16),
-                        )
-
-            # Update local RemoteVariables and verify conflagration
-            self.readBlocks(recurse=True)
-            self.checkBlocks(recurse=True)
-
-            # write in the post-amble:
-            # Write 0x0514 = 0x01
-            # Write 0x001C = 0x01
-            # Write 0x0540 = 0x00
-            # Write 0x0B24 = 0xC3
-            # Write 0x0B25 = 0x02
-            self._setValue(offset=0x0514<<2,data=0x01)
-            self._setValue(offset=0x001C<<2,data=0x01)
-            self._setValue(offset=0x0540<<2,data=0x00)
-            self._setValue(offset=0x0B24<<2,data=0xC3)
-            self._setValue(offset=0x0B25<<2,data=0x02)
+        @self.command(value='',description="Load the .CSV from CBPro, only writing the registers that differ from the device (no-op if none differ).",)
+        def DiffLoadCsvFile(arg):
+            self._LoadCsvFile(arg, diff=True)
 
         ##############################
         # Pages
@@ -111,6 +64,9 @@ class Si5394Lite(pr.Device):
         for k,v in self._pages.items():
             self.add(v)
 
+        # BW_UPDATE_PLL (0x0514) is self-clearing but has no Page5 variable here
+        self._pages[5].ignoredBits[0x14] = 0x01
+
         self.add(pr.LinkVariable(
             name         = 'Locked',
             description  = 'Inverse of LOL',
@@ -119,6 +75,68 @@ class Si5394Lite(pr.Device):
             linkedGet    = lambda: (False if self.Page0.LOL.value() else True)
         ))
 
+    def _LoadCsvFile(self, arg, diff=False):
+        # Check for an already compiled .CSV (silabs.Si53xxConfig)
+        if isinstance(arg, silabs.Si53xxConfig):
+            click.secho( f'{self.path}.LoadCsvFile(): {arg.source}', fg='green')
+            regs = arg
+
+        else:
+            # Check if non-empty argument
+            if (arg != ""):
+                path = arg
+            else:
+                # Use the variable path instead
+                path = self.CsvFilePath.get()
+
+            # Check for .csv file
+            if fnmatch.fnmatch(path, '*.csv'):
+                click.secho( f'{self.path}.LoadCsvFile(): {path}', fg='green')
+            else:
+                click.secho( f'{self.path}.LoadCsvFile(): {path} is not .csv', fg='red')
+                return
+
+            # Open the .CSV file (only parsed the first time)
+            regs = silabs.Si53xxConfig.fromCsvFile(path)
+
+        # Check for differential loading
+        if diff:
+            # Only write the registers that differ from the device
+            regs = silabs.diffRegisters(self._pages, regs)
+            if not regs:
+                click.secho( f'{self.path}.LoadCsvFile(): device already configured, nothing to write', fg='green')
+                return
+            click.secho( f'{self.path}.LoadCsvFile(): {len(regs)} registers differ', fg='green')
+
+        # write in the preamble:
+        # Write 0x0B24 = 0xC0
+        # Write 0x0B25 = 0x00
+        # Write 0x0540 = 0x01
+        self._setValue(offset=0x0B24<<2,data=0xC0)
+        self._setValue(offset=0x0B25<<2,data=0x00)
+        self._setValue(offset=0x0540<<2,data=0x01)
+
+        # Wait 300 ms for Grade A/B/C/D/J/K/L/M, Wait 625ms for Grade P/E
+        time.sleep(1.0)
+
+        # Write the registers with one transaction per run of contiguous addresses
+        silabs.writeRegisters(self._pages, regs)
+
+        # Update local RemoteVariables and verify conflagration (only the written registers)
+        silabs.verifyRegisters(self._pages, regs, name=f'{self.path}.LoadCsvFile')
+
+        # write in the post-amble:
+        # Write 0x0514 = 0x01
+        # Write 0x001C = 0x01
+        # Write 0x0540 = 0x00
+        # Write 0x0B24 = 0xC3
+        # Write 0x0B25 = 0x02
+        self._setValue(offset=0x0514<<2,data=0x01)
+        self._setValue(offset=0x001C<<2,data=0x01)
+        self._setValue(offset=0x0540<<2,data=0x00)
+        self._setValue(offset=0x0B24<<2,data=0xC3)
+        self._setValue(offset=0x0B25<<2,data=0x02)
+
     def _setValue(self,offset,data):
         # Note: index is byte index (not word index)
         self._pages[offset // 0x400].DataBlock.set(value=data,index=(offset%0x400)>>2)
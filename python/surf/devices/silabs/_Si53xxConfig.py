@@ -0,0 +1,187 @@
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# Batched register loading for the Si5345/Si5394 pages (Si5345PageBase):
+# the registers are staged locally, grouped per page into runs of contiguous
+# addresses and each run is written (or read back) with a single transaction
+# instead of one transaction per register.
+#
+# The registers are kept in file order: a CBPro .CSV writes some addresses
+# more than once (e.g. 0x0B24/0x0B25 in the preamble and the postamble) and
+# relies on the order of the writes, so the runs are only built from the
+# entries that are adjacent in the file.
+#
+# The WO command bits (e.g. SOFT_RST_ALL in 0x001C and BW_UPDATE_PLL in 0x0514
+# of the postamble) and the RO status bits never read back the written value:
+# diffRegisters() and verifyRegisters() mask the ignoredBits of the pages. A
+# diff only keeps the registers that differ, but always between the CBPro
+# preamble and postamble.
+#
+# Si53xxConfig is a compiled .CSV (per-page register image, mask of the
+# written addresses and the precomputed runs), memoized by the file hash so
+# that loading the same .CSV into many devices only parses it once:
+#
+#    config = silabs.Si53xxConfig.fromCsvFile('config.csv')
+#    for dev in devices:
+#        dev.LoadCsvFile(config)
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import csv
+import click
+import hashlib
+import threading
+
+# CBPro preamble and postamble registers, written before and after the register map
+PREAMBLE  = [0x0B24, 0x0B25, 0x0540]
+POSTAMBLE = [0x0514, 0x001C, 0x0540, 0x0B24, 0x0B25]
+
+def readCsvLines(lines):
+    # Returns the [(register address, value)] of the lines of a ClockBuilder Pro .CSV register map (file order)
+    regs = []
+    reader = csv.reader(lines, delimiter=',', quoting=csv.QUOTE_NONE)
+    # Loop through the rows in the CSV file
+    for row in reader:
+        if row and (row[0]!='Address'):
+            regs.append((int(row[0],16), int(row[1],16)))
+    return regs
+
+def readCsvFile(path):
+    # Returns the [(register address, value)] of a ClockBuilder Pro .CSV register map (file order)
+    with open(path) as csvfile:
+        return readCsvLines(csvfile)
+
+class Si53xxConfig():
+
+    # {file hash: Si53xxConfig} of the compiled .CSV files
+    _cache = {}
+    _lock  = threading.Lock()
+
+    def __init__(self, regs, source=''):
+        self.source = source
+        self.regs   = _regsOf(regs)
+        self.runs   = list(registerRuns(self.regs))
+        # Per-page register image (last value written) and mask of the addresses in the .CSV
+        numPages    = (max(addr for addr, value in self.regs) >> 8) + 1 if self.regs else 0
+        self.image  = np.zeros((numPages, 0x100), dtype=np.uint32)
+        self.mask   = np.zeros((numPages, 0x100), dtype=bool)
+        for addr, value in self.regs:
+            self.image[addr >> 8, addr & 0xFF] = value
+            self.mask[addr >> 8, addr & 0xFF]  = True
+
+    def __len__(self):
+        return len(self.regs)
+
+    @property
+    def pages(self):
+        # Pages with at least one register to write
+        return [int(p) for p in np.flatnonzero(self.mask.any(axis=1))]
+
+    @classmethod
+    def fromCsvFile(cls, path):
+        # Compile a ClockBuilder Pro .CSV once per file contents
+        with open(path, 'rb') as f:
+            data = f.read()
+        key = hashlib.sha256(data).hexdigest()
+        with cls._lock:
+            config = cls._cache.get(key)
+        if config is None:
+            # Parse the bytes that were hashed
+            config = cls(readCsvLines(data.decode().splitlines()), source=path)
+            with cls._lock:
+                cls._cache[key] = config
+        return config
+
+def _regsOf(regs):
+    # [(register address, value)] of a Si53xxConfig, a list or a {register address: value}
+    if isinstance(regs, Si53xxConfig):
+        return regs.regs
+    return list(regs.items()) if isinstance(regs, dict) else list(regs)
+
+def _runsOf(regs):
+    return regs.runs if isinstance(regs, Si53xxConfig) else list(registerRuns(regs))
+
+def _lastValues(regs):
+    # {register address: last value written}
+    return dict(_regsOf(regs))
+
+def registerRuns(regs):
+    # Yields (page, first index, [values]) for each run of contiguous register
+    # addresses that are adjacent in regs (the write order is preserved)
+    run = None
+    for addr, value in _regsOf(regs):
+        page, index = addr >> 8, addr & 0xFF
+        if (run is not None) and (run[0] == page) and (run[1]+len(run[2]) == index):
+            run[2].append(value)
+        else:
+            if run is not None:
+                yield run
+            run = (page, index, [value])
+    if run is not None:
+        yield run
+
+def writeRegisters(pages, regs):
+    # Write the [(register address, value)] registers (or a Si53xxConfig) into the pages in order, one transaction per run
+    runs = _runsOf(regs)
+    for page, index, values in runs:
+        # Keep the local copies of the registers up to date
+        for i, value in enumerate(values):
+            pages[page].DataBlock.set(value=value, index=index+i, write=False)
+        pages[page]._rawWrite(offset=index<<2, data=values)
+    return len(runs)
+
+def readRegisters(pages, regs):
+    # Returns {register address: device value} of the registers in regs, one transaction
+    # per run of contiguous addresses (each address only read once)
+    ret = {}
+    for page, index, values in registerRuns(sorted(_lastValues(regs).items())):
+        readback = pages[page]._rawRead(offset=index<<2, numWords=len(values))
+        if len(values) == 1:
+            readback = [readback]
+        for i, data in enumerate(readback):
+            # Update the local copies of the registers
+            pages[page].DataBlock.set(value=data, index=index+i, write=False)
+            ret[(page<<8)|(index+i)] = data
+    return ret
+
+def splitAmble(regs):
+    # Returns the (preamble, register map, postamble) [(register address, value)] of regs
+    regs = _regsOf(regs)
+    i, j = 0, len(regs)
+    while (i < j) and (regs[i][0] in PREAMBLE):
+        i += 1
+    while (j > i) and (regs[j-1][0] in POSTAMBLE):
+        j -= 1
+    return regs[:i], regs[i:j], regs[j:]
+
+def _differs(pages, addr, value, data):
+    # Compare a readback, ignoring the bits that do not read back the written value
+    mask = 0xFF & ~getattr(pages[addr >> 8], 'ignoredBits', {}).get(addr & 0xFF, 0)
+    return ((data ^ value) & mask) != 0
+
+def diffRegisters(pages, regs):
+    # Returns the [(register address, value)] of regs (file order) of the addresses
+    # whose last value differs from the device, between the preamble and the
+    # postamble of regs ([] if no address differs)
+    readback = readRegisters(pages, regs)
+    dirty    = {addr for addr, value in _lastValues(regs).items() if _differs(pages, addr, value, readback[addr])}
+    if not dirty:
+        return []
+    preamble, body, postamble = splitAmble(regs)
+    return preamble + [(addr, value) for addr, value in body if addr in dirty] + postamble
+
+def verifyRegisters(pages, regs, name='LoadCsvFile'):
+    # Read back only the written registers, one transaction per run.
+    # Mismatches are only reported (not raised).
+    readback = readRegisters(pages, regs)
+    mismatch = [(addr, value, readback[addr]) for addr, value in _lastValues(regs).items() if _differs(pages, addr, value, readback[addr])]
+    if mismatch:
+        addr, value, data = mismatch[0]
+        click.secho(f'{name}(): {len(mismatch)} registers read back different (first: 0x{addr:04X} = 0x{data:02X}, expected 0x{value:02X})', fg='yellow')
+    return mismatch
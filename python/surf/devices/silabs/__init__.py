@@ -7,10 +7,13 @@
 ## may be copied, modified, propagated, or distributed except according to
 ## the terms contained in the LICENSE.txt file.
 ##############################################################################
+from surf.devices.silabs._Si532xConfig import *
 from surf.devices.silabs._Si5324      import *
 
 from surf.devices.silabs._Si5326      import *
 
+from surf.devices.silabs._Si53xxConfig import *
+
 from surf.devices.silabs._Si5345Pages import *
 from surf.devices.silabs._Si5345Lite  import *
 from surf.devices.silabs._Si5345      import *
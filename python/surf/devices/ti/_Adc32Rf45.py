@@ -663,7 +663,7 @@ class Adc32Rf45(pr.Device):
         @self.command(description  = "Digital Reset")
         def DigRst():
             # Wait for 50 ms for the device to estimate the interleaving errors
-            time.sleep(0.250) # TODO: Optimize this timeout
+            time.sleep(0.050)
             self.CH[0].JesdDigital.set(value=0x00,index=0x000) # clear reset
             self.CH[1].JesdDigital.set(value=0x00,index=0x000) # clear reset
             self.CH[0].JesdDigital.set(value=0x01,index=0x000) # CHA digital reset
@@ -672,7 +672,7 @@ class Adc32Rf45(pr.Device):
             self.CH[1].JesdDigital.set(value=0x00,index=0x000) # clear reset
 
             # Wait for 50 ms for the device to estimate the interleaving errors
-            time.sleep(0.250) # TODO: Optimize this timeout
+            time.sleep(0.050)
             self.CH[0].MainDigital.set(value=0x00,index=0x000) # clear reset
             self.CH[1].MainDigital.set(value=0x00,index=0x000) # clear reset
             self.CH[0].MainDigital.set(value=0x01,index=0x000) # CHA digital reset
@@ -0,0 +1,63 @@
+#-----------------------------------------------------------------------------
+# This file is part of the 'SLAC Firmware Standard Library'. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the 'SLAC Firmware Standard Library', including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+# Bulk programming of the TICS Pro CodeLoader .HEX exports (Lmx2594, Lmx2615):
+# the whole register map is staged into the DataBlock shadow, then every
+# register is posted with its own single register write, in REVERSE order from
+# the highest register to the lowest as recommended by the datasheets. The
+# writes are started without waiting for their responses and only checked once
+# at the end, so the load costs a single round trip instead of one blocking
+# write per register. The register that has to be written last (R0, which
+# starts the VCO calibration) is written on its own once all the other
+# registers are done.
+#-----------------------------------------------------------------------------
+
+def readCodeLoaderHexFile(path):
+    # Returns the [(register address, value)] of a CodeLoader .HEX export (file order)
+    regs = []
+    with open(path, 'r') as ifd:
+        for line in ifd:
+            s = str.split(line)
+            if len(s) < 2:
+                continue
+            addr = int(s[0][1:], 0)
+            # "R0 0x0000XXXX" or "R0 0x00 0x0000XXXX"
+            data = int("0x" + s[-1][-4:], 0)
+            regs.append((addr, data))
+    return regs
+
+def codeLoaderOrder(regs, last=0):
+    # Returns the [(register address, value)] in write order: from the highest register
+    # to the lowest and the last register at the end (a duplicate address keeps its last value)
+    values = dict(regs)
+    order  = [(addr, values[addr]) for addr in sorted(values, reverse=True) if addr != last]
+    if last in values:
+        order.append((last, values[last]))
+    return order
+
+def writeCodeLoaderRegisters(dev, regs, last=0):
+    # Write the [(register address, value)] into dev.DataBlock in codeLoaderOrder(): the
+    # writes are posted and only waited for once, before the last register is written.
+    # Returns the number of round trips waited for.
+    order = codeLoaderOrder(regs, last)
+    # Keep the local copies of the registers up to date
+    for addr, data in order:
+        dev.DataBlock.set(value=data, index=addr, write=False)
+    posted = [(addr, data) for addr, data in order if addr != last]
+    # Start the write transactions without waiting for the responses
+    for addr, data in posted:
+        dev._rawTxnChunker(offset=addr<<2, data=[data])
+    dev._waitTransaction(0)
+    if dev._getError():
+        raise IOError(f'{dev.path}: LoadCodeLoaderHexFile write failed: {dev._getError()}')
+    count = 1 if posted else 0
+    if len(posted) < len(order):
+        dev._rawWrite(offset=last<<2, data=[order[-1][1]])
+        count += 1
+    return count
@@ -16,6 +16,7 @@ class Lmk048Base(pr.Device):
 
         self.sysrefMode      = 2 # 2 pulse sysref mode, 3 continuous sysref mode
         self.allowHexFileRst = allowHexFileRst
+        self._hexFileTable   = None
 
         ##############################
         # Variables
@@ -1138,44 +1139,7 @@ class Lmk048Base(pr.Device):
         ##############################
         @self.command(description='Load the CodeLoader .HEX file',value='',)
         def LoadCodeLoaderHexFile(arg):
-            with open(arg, 'r') as ifd:
-                for i, line in enumerate(ifd):
-                    s = str.split(line)
-                    addr = int(s[0][1:], 0)
-                    if len(s) == 3:
-                        data = int("0x" + s[2][-2:], 0)
-                    else:
-                        data = int("0x" + s[1][-2:], 0)
-                    if addr == 0:
-                        if self.allowHexFileRst:
-                            self.LmkReg_0x0000.set(data)
-                    elif addr == 3:
-                        v = getattr(self, 'ID_DEVICE_TYPE')
-                        if (v.get() != data):
-                            print(f'ID_DEVICE_TYPE mismatch: {v.get()} != {data}')
-                    elif addr == 4:
-                        v = getattr(self, 'ID_PROD_LOWER')
-                        if (v.get() != data):
-                            print(f'ID_PROD_LOWER mismatch: {v.get()} != {data}')
-                    elif addr == 5:
-                        v = getattr(self, 'ID_PROD_UPPER')
-                        if (v.get() != data):
-                            print(f'ID_PROD_UPPER mismatch: {v.get()} != {data}')
-                    elif addr == 6:
-                        v = getattr(self, 'ID_MASKREV')
-                        if (v.get() != data):
-                            print(f'ID_MASKREV mismatch: {v.get()} != {data}')
-                    elif addr == 12:
-                        v = getattr(self, 'ID_VNDR_UPPER')
-                        if (v.get() != data):
-                            print(f'ID_VNDR_UPPER mismatch: {v.get()} != {data}')
-                    elif addr == 13:
-                        v = getattr(self, 'ID_VNDR_LOWER')
-                        if (v.get() != data):
-                            print(f'ID_VNDR_LOWER mismatch: {v.get()} != {data}')
-                    else:
-                        v = getattr(self, 'LmkReg_0x%04X'%addr)
-                        v.set(data)
+            self._LoadCodeLoaderHexFile(arg)
 
         @self.command(description='Powerdown the sysref lines',)
         def PwrDwnSysRef():
@@ -1214,6 +1178,62 @@ class Lmk048Base(pr.Device):
             self.LmkReg_0x0143.set(0x01)
             self.LmkReg_0x0144.set(0xFF)
 
+    def hexFileTable(self):
+        # Address -> (variable, ID register) dispatch table of the CodeLoader .HEX file,
+        # built once (after the sub-class has added its registers)
+        if self._hexFileTable is None:
+            table = {}
+            for name, v in self.variables.items():
+                if name.startswith('LmkReg_0x'):
+                    table[int(name[9:], 16)] = (v, False)
+            for name in ['ID_DEVICE_TYPE', 'ID_PROD_UPPER', 'ID_PROD_LOWER', 'ID_MASKREV', 'ID_VNDR_UPPER', 'ID_VNDR_LOWER']:
+                v = self.variables[name]
+                table[v.offset >> 2] = (v, True)
+            self._hexFileTable = table
+        return self._hexFileTable
+
+    def _LoadCodeLoaderHexFile(self, arg):
+        table  = self.hexFileTable()
+        writes = []
+        ids    = []
+
+        # Parse the whole file before touching the device
+        with open(arg, 'r') as ifd:
+            for i, line in enumerate(ifd):
+                s = str.split(line)
+                if len(s) == 0:
+                    continue
+                addr = int(s[0][1:], 0)
+                if len(s) == 3:
+                    data = int("0x" + s[2][-2:], 0)
+                else:
+                    data = int("0x" + s[1][-2:], 0)
+                if addr not in table:
+                    raise ValueError(f'Invalid CodeLoader address 0x{addr:x} (line {i+1})')
+                v, isId = table[addr]
+                if isId:
+                    ids.append((v, data))
+                elif (addr != 0) or self.allowHexFileRst:
+                    writes.append((v, data))
+
+        # Check the ID registers with one batched read
+        for v, data in ids:
+            self.readBlocks(recurse=False, variable=v)
+        self.checkBlocks(recurse=False)
+        for v, data in ids:
+            if (v.value() != data):
+                print(f'{v.name} mismatch: {v.value()} != {data}')
+
+        # Stage and post the writes in the file (TI programming) order, only
+        # waiting for the completion once at the end. A register written twice
+        # (e.g. R0 reset then R0) waits for its previous write before the
+        # shadow value changes.
+        for v, data in writes:
+            self.checkBlocks(recurse=False, variable=v)
+            v.set(data, write=False)
+            self.writeBlocks(force=True, recurse=False, variable=v)
+        self.checkBlocks(recurse=False)
+
     def simpleView(self, simpleViewList):
         # Hide all the variable
         self.hideVariables(hidden=True)
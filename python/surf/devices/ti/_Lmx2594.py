@@ -9,6 +9,8 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.devices.ti as ti
+import surf.misc
 import time
 
 class Lmx2594(pr.Device):
@@ -224,6 +226,13 @@ class Lmx2594(pr.Device):
             mode        = 'RO',
         )
 
+        self.add(pr.LocalVariable(
+            name         = 'BulkLoadEn',
+            description  = 'LoadCodeLoaderHexFile: post the register writes (highest to lowest) and wait once before writing R0, instead of waiting for every register write',
+            mode         = 'RW',
+            value        = True,
+        ))
+
         @self.command(description='Load the CodeLoader .HEX file',value='',)
         def LoadCodeLoaderHexFile(arg):
 
@@ -242,18 +251,27 @@ class Lmx2594(pr.Device):
             self.DataBlock.set(value=0x2410, index=0, write=True)
 
             # 4. Program registers as shown in the register map in REVERSE order from highest to lowest.
-            with open(arg, 'r') as ifd:
-                # Note: HEX file dumped in REVERSE order
-                for i, line in enumerate(ifd):
-                    s = str.split(line)
-                    addr = int(s[0][1:], 0)
-                    data = int("0x" + s[1][-4:], 0)
+            # Note: HEX file dumped in REVERSE order
+            regs = ti.readCodeLoaderHexFile(arg)
+            addr, data = regs[-1]
+            if self.BulkLoadEn.value():
+                # Whole register map staged, then posted from the highest to the lowest register (R0 last)
+                ti.writeCodeLoaderRegisters(self, regs, last=addr)
+            else:
+                for addr, data in regs:
                     # print( f'addr={addr}, data={hex(data)}' )
                     self.DataBlock.set(value=data, index=addr, write=True)
 
-            # 5. Wait 10 ms.
+            # 5. Wait at least 10 ms (100 ms for margin).
             time.sleep(0.1)
 
             # 6. Program register R0 one additional time with FCAL_EN = 1 to ensure that the VCO calibration runs from a stable state.
             self.DataBlock.set(value=data&0xFFFB, index=addr, write=True)
-            time.sleep(0.1)
+
+            # 7. Wait for the VCO calibration to lock (rb_LD_VTUNE = 2, MUXOUT_LD_SEL=readback after step 6)
+            surf.misc.waitFor(
+                lambda: ((self._rawRead(offset=(110 << 2)) >> 9) & 0x3) == 2,
+                timeout = 1.0,
+                name    = f'{self.path}.LoadCodeLoaderHexFile',
+                fatal   = False,
+            )
@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.devices.ti as ti
 
 class Lmx2615(pr.Device):
     def __init__(self, **kwargs):
@@ -743,16 +744,23 @@ class Lmx2615(pr.Device):
             self.RESET.set(0x1)
             self.RESET.set(0x0)
 
+        self.add(pr.LocalVariable(
+            name         = 'BulkLoadEn',
+            description  = 'LoadCodeLoaderHexFile: post the register writes (highest to lowest) and wait once before writing R0, instead of waiting for every register write',
+            mode         = 'RW',
+            value        = True,
+        ))
+
         @self.command(description='Load the CodeLoader Hex Export file',value='',)
         def LoadCodeLoaderHexFile(arg):
-            with open(arg, 'r') as ifd:
-                for i, line in enumerate(ifd):
-                    s = str.split(line)
-                    addr = int(s[0][1:], 0)
-                    if len(s) == 3:
-                        data = int("0x" + s[2][-4:], 0)
-                    else:
-                        data = int("0x" + s[1][-4:], 0)
+            # Note: HEX file dumped in REVERSE order (R0 last)
+            regs = ti.readCodeLoaderHexFile(arg)
+            if self.BulkLoadEn.value():
+                # Whole register map staged, then posted from the highest to the lowest register (R0 last)
+                count = ti.writeCodeLoaderRegisters(self, regs, last=regs[-1][0])
+                print(f'writing {len(regs)} registers with {count} round trips')
+            else:
+                for addr, data in regs:
                     print(f'writing {addr:#04x}: {data:#06x}')
                     self.DataBlock.set(value=data, index=addr, write=True)
 
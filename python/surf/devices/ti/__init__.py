@@ -14,6 +14,7 @@ from surf.devices.ti._Ads42Lbx9         import *
 from surf.devices.ti._Ads54J60          import *
 from surf.devices.ti._Ads54J60Channel   import *
 from surf.devices.ti._AxiCdcm6208       import *
+from surf.devices.ti._CodeLoader        import *
 from surf.devices.ti._Dac38J84          import *
 from surf.devices.ti._Ds32Ev400         import *
 from surf.devices.ti._Lmk048Base        import *
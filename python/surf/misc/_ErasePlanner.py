@@ -0,0 +1,111 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue FLASH erase planner
+#-----------------------------------------------------------------------------
+# Description:
+# Picks the cheapest mix of erase commands (e.g. 4kB subsector, 64kB sector
+# and bulk/die erase) that covers an image footprint. The geometry is a list
+# of (name, size, seconds) erase levels from the smallest to the largest,
+# where each size is a multiple of the previous one:
+#
+#    geometry = [('subsector', 0x1000, 0.25), ('sector', 0x10000, 0.7)]
+#    plan, seconds = planErase([(startAddr, endAddr+1)], geometry)
+#
+# Each block of a level is either erased with one command or split into the
+# blocks of the level below it, whichever has the lower estimated time.
+#
+# cfiBlockMap() and blocksInRange() handle the non-uniform block maps
+# (CFI erase block regions) of the parallel FLASH devices.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import click
+import collections
+
+from surf.misc._McsReader import McsException
+
+def planErase(ranges, geometry):
+    """Return ([(name, addr), ...], estimated seconds) covering the [start, stop) ranges"""
+    ranges = sorted((start, stop) for start, stop in ranges if stop > start)
+
+    def touched(lo, hi):
+        return any((start < hi) and (stop > lo) for start, stop in ranges)
+
+    def plan(level, addr):
+        name, size, seconds = geometry[level]
+        if level == 0:
+            return [(name, addr)], seconds
+        # Cost of erasing the blocks of the level below that hold image data
+        childSize = geometry[level-1][1]
+        subPlan   = []
+        subTime   = 0.0
+        for child in range(addr, addr+size, childSize):
+            if touched(child, child+childSize):
+                p, t     = plan(level-1, child)
+                subPlan += p
+                subTime += t
+        if seconds < subTime:
+            return [(name, addr)], seconds
+        return subPlan, subTime
+
+    ret   = []
+    total = 0.0
+    if ranges:
+        top  = len(geometry)-1
+        size = geometry[top][1]
+        addr = ranges[0][0] - (ranges[0][0] % size)
+        while addr < ranges[-1][1]:
+            if touched(addr, addr+size):
+                p, t   = plan(top, addr)
+                ret   += p
+                total += t
+            addr += size
+    return ret, total
+
+def describePlan(plan, seconds):
+    """One line summary of a planErase() result"""
+    counts = collections.Counter(name for name, addr in plan)
+    ops    = ', '.join(f'{n} x {name}' for name, n in counts.items())
+    return f'{ops or "nothing to erase"} (estimated {seconds:.1f} s)'
+
+def cfiBlockMap(read):
+    """
+    Decode the CFI erase block regions with read(offset) returning the query
+    data at that offset (query mode already entered by read). Returns a list
+    of (number of blocks, block size in bytes) or None without a CFI table.
+    """
+    if [read(0x10) & 0xFF, read(0x11) & 0xFF, read(0x12) & 0xFF] != [ord('Q'), ord('R'), ord('Y')]:
+        return None
+    regions = []
+    for i in range(read(0x2C) & 0xFF):
+        q = [read(0x2D+4*i+j) & 0xFF for j in range(4)]
+        count = (q[0] | (q[1] << 8)) + 1
+        size  = (q[2] | (q[3] << 8)) * 256
+        regions.append((count, size if size > 0 else 128))
+    return regions if regions else None
+
+def blocksInRange(blockMap, start, stop):
+    """
+    Yield the (addr, size) of the blocks of a [(count, size), ...] map that
+    overlap [start, stop). Raises McsException if the range goes past the
+    end of the map.
+    """
+    base = 0
+    for count, size in blockMap:
+        end = base + count*size
+        lo  = max(start, base)
+        hi  = min(stop, end)
+        if lo < hi:
+            for i in range((lo-base)//size, (hi-1-base)//size+1):
+                yield base+i*size, size
+        base = end
+    # Never silently skip the addresses that no block covers
+    if stop > max(start, base):
+        click.secho(f'blocksInRange(): 0x{max(start, base):x}-0x{stop-1:x} is past the end of the block map (0x{base:x} bytes)', fg='red')
+        raise McsException('blocksInRange() Failed\n\n')
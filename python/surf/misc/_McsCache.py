@@ -0,0 +1,115 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue MCS image cache
+#-----------------------------------------------------------------------------
+# Description:
+# Content-addressed on-disk cache of parsed .MCS images. Each entry is a raw
+# binary image (memory-mapped on load) plus a small JSON metadata file, keyed
+# by the SHA-256 of the source file. Entries are evicted least-recently-used
+# first once the cache grows beyond maxSize bytes (256 MB by default). The
+# PROM devices only use it when created with mcsCache=True.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import hashlib
+import json
+import os
+import glob
+
+# Bump when the parsed image format changes to invalidate old entries
+MCS_CACHE_VERSION = 1
+
+class McsCache():
+
+    def __init__(self, path=None, maxSize=(256<<20)):
+        # Default location can be overridden with the SURF_MCS_CACHE environment variable
+        if path is None:
+            path = os.environ.get('SURF_MCS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'surf', 'mcs'))
+        self.path    = path
+        self.maxSize = maxSize
+
+    @staticmethod
+    def fileHash(filename):
+        h = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for buf in iter(lambda: f.read(1<<20), b''):
+                h.update(buf)
+        return h.hexdigest()
+
+    def key(self, fileHash, options=''):
+        # fileHash: fileHash() of the source file
+        # options:  suffix for the load options that change the parsed image
+        return f'{fileHash}{options}-v{MCS_CACHE_VERSION}'
+
+    def load(self, key):
+        """Return (metadata, image) for a cached key or None on a miss"""
+        metaFile = os.path.join(self.path, f'{key}.json')
+        binFile  = os.path.join(self.path, f'{key}.bin')
+        try:
+            with open(metaFile) as f:
+                meta = json.load(f)
+            if meta['size'] > 0:
+                data = np.memmap(binFile, dtype=np.uint8, mode='r', shape=(meta['size'],))
+            else:
+                data = np.empty(0, dtype=np.uint8)
+            # Mark as most recently used
+            os.utime(metaFile)
+        except (OSError, ValueError, KeyError):
+            return None
+        return meta, data
+
+    def store(self, key, data, **meta):
+        os.makedirs(self.path, exist_ok=True)
+        metaFile = os.path.join(self.path, f'{key}.json')
+        binFile  = os.path.join(self.path, f'{key}.bin')
+        tmp      = f'.{os.getpid()}.tmp'
+
+        # Write the image before the metadata so a visible .json is always complete
+        np.asarray(data, dtype=np.uint8).tofile(binFile+tmp)
+        os.replace(binFile+tmp, binFile)
+        meta['size'] = len(data)
+        with open(metaFile+tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(metaFile+tmp, metaFile)
+
+        self.evict()
+
+    def entries(self):
+        """Return a list of (mtime, size, key) sorted from least to most recently used"""
+        ret = []
+        for metaFile in glob.glob(os.path.join(self.path, '*.json')):
+            key = os.path.basename(metaFile)[:-5]
+            try:
+                size = os.path.getsize(os.path.join(self.path, f'{key}.bin'))
+                ret.append((os.path.getmtime(metaFile), size, key))
+            except OSError:
+                pass
+        return sorted(ret)
+
+    def remove(self, key):
+        for ext in ('.json', '.bin'):
+            try:
+                os.remove(os.path.join(self.path, key+ext))
+            except OSError:
+                pass
+
+    def evict(self):
+        entries = self.entries()
+        total   = sum(size for _, size, _ in entries)
+        # Always keep the most recently used entry
+        for _, size, key in entries[:-1]:
+            if total <= self.maxSize:
+                break
+            self.remove(key)
+            total -= size
+
+    def clear(self):
+        for _, _, key in self.entries():
+            self.remove(key)
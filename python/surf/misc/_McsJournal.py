@@ -0,0 +1,156 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM programming journal
+#-----------------------------------------------------------------------------
+# Description:
+# Small on-disk checkpoint of a PROM programming session, keyed by the image
+# hash and the device path. It records the erased address ranges and the
+# write/verify progress (watermarks) so that an interrupted LoadMcsFile can
+# be resumed (ResumeMcsFile) without starting from scratch. The journal is
+# flushed at most once per flushPeriod seconds and removed once the image
+# has been programmed and verified.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import time
+
+class McsJournal():
+
+    def __init__(self, path=None, flushPeriod=1.0, enable=True):
+        # Default location can be overridden with the SURF_MCS_JOURNAL environment variable
+        if path is None:
+            path = os.environ.get('SURF_MCS_JOURNAL', os.path.join(os.path.expanduser('~'), '.cache', 'surf', 'journal'))
+        self.path        = path
+        self.flushPeriod = flushPeriod
+        self.enable      = enable
+        self._file       = None
+        self._lastFlush  = 0.0
+        self._state      = self._empty('', '')
+
+    @staticmethod
+    def _empty(image, device):
+        return {'image': image, 'device': device, 'erased': [], 'written': None, 'verified': None}
+
+    def start(self, image, device, resume=False):
+        """
+        Start journaling the programming of image (hash) into device (path).
+        With resume=True the previous journal of the same image and device
+        is loaded. Returns True if a previous session was found.
+        """
+        if not self.enable:
+            self._state = self._empty(image, device)
+            return False
+        key        = hashlib.sha256(f'{image}:{device}'.encode()).hexdigest()[:32]
+        self._file = os.path.join(self.path, f'{key}.json')
+        found      = False
+        self._state = self._empty(image, device)
+        if resume:
+            try:
+                with open(self._file) as f:
+                    state = json.load(f)
+                if (state['image'] == image) and (state['device'] == device):
+                    self._state = state
+                    found = True
+            except (OSError, ValueError, KeyError):
+                pass
+        self.flush()
+        return found
+
+    def flush(self):
+        if self._file is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        tmp = f'{self._file}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self._file)
+        self._lastFlush = time.monotonic()
+
+    def _update(self, force=False):
+        if force or (time.monotonic() - self._lastFlush) >= self.flushPeriod:
+            self.flush()
+
+    def finish(self):
+        """Remove the journal once the image is fully programmed and verified"""
+        if self._file is not None:
+            try:
+                os.remove(self._file)
+            except OSError:
+                pass
+            self._file = None
+
+    #########################################
+    # Erase ranges
+    #########################################
+    def erased(self, start, stop):
+        """Record [start, stop) as erased (flushed right away)"""
+        ranges = sorted(self._state['erased'] + [[start, stop]])
+        merged = []
+        for lo, hi in ranges:
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        self._state['erased'] = merged
+        self._update(force=True)
+
+    def isErased(self, start, stop):
+        return any((lo <= start) and (stop <= hi) for lo, hi in self._state['erased'])
+
+    def remaining(self, start, stop):
+        """Return the parts of [start, stop) that have not been erased yet"""
+        ret = []
+        for lo, hi in self._state['erased']:
+            if (hi <= start) or (lo >= stop):
+                continue
+            if lo > start:
+                ret.append((start, lo))
+            start = max(start, hi)
+        if start < stop:
+            ret.append((start, stop))
+        return ret
+
+    #########################################
+    # Write and verify progress
+    #########################################
+    def written(self, addr, force=False):
+        """Everything below addr has been sent to the PROM"""
+        self._state['written'] = addr
+        self._update(force)
+
+    def verified(self, addr, force=False):
+        """Everything below addr has been verified"""
+        self._state['verified'] = addr
+        self._update(force)
+
+    def writeStart(self, start, stop, boundary):
+        """Address to resume writing [start, stop) from (start of the boundary region holding the watermark)"""
+        return self._resumeAddr(self._state['written'], start, stop, boundary)
+
+    def verifyStart(self, start, stop, boundary):
+        """Address to resume verifying [start, stop) from"""
+        return self._resumeAddr(self._state['verified'], start, stop, boundary)
+
+    @staticmethod
+    def _resumeAddr(mark, start, stop, boundary):
+        if mark is None:
+            return None
+        if mark >= stop:
+            return stop
+        return max(start, mark - (mark % boundary))
+
+    @staticmethod
+    def pages(pages, mark):
+        """Pass through a pages() iterator, calling mark(addr) before each page"""
+        for addr, page in pages:
+            mark(addr)
+            yield addr, page
@@ -0,0 +1,109 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM programming profiler
+#-----------------------------------------------------------------------------
+# Description:
+# Accumulates the wall time, transaction count, bytes moved and round trip
+# latency of each phase of a PROM programming session (parse, erase, write,
+# verify, poll, ...). Phases can be nested: the time spent in a nested phase
+# (e.g. the status polling inside the erase) is only counted once, in the
+# nested phase. Time and transactions outside of any phase go into 'other'.
+#
+#    profile = McsProfiler()
+#    with profile.phase('erase'):
+#        with profile.roundTrip(nbytes=4):
+#            var.get()
+#    profile.stop()
+#    print(profile.report())
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import contextlib
+import time
+
+class McsProfiler():
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.total  = 0.0
+        self._stack = []
+        self._start = time.perf_counter()
+        self._mark  = self._start
+
+    def _stats(self, name):
+        if name not in self.phases:
+            self.phases[name] = {'time': 0.0, 'transactions': 0, 'bytes': 0, 'roundTrips': 0, 'roundTripTime': 0.0}
+        return self.phases[name]
+
+    def _current(self):
+        return self._stats(self._stack[-1] if self._stack else 'other')
+
+    def _switch(self):
+        # Charge the time since the last phase change to the innermost phase
+        now = time.perf_counter()
+        if self._stack:
+            self._stats(self._stack[-1])['time'] += now - self._mark
+        self._mark = now
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def transaction(self, nbytes=4, count=1):
+        """Count posted transactions (no wait for the response)"""
+        stats = self._current()
+        stats['transactions'] += count
+        stats['bytes']        += nbytes
+
+    @contextlib.contextmanager
+    def roundTrip(self, nbytes=4, count=1):
+        """Count blocking transactions and time their round trips"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self._current()
+            stats['transactions']  += count
+            stats['bytes']         += nbytes
+            stats['roundTrips']    += count
+            stats['roundTripTime'] += time.perf_counter() - start
+
+    def stop(self):
+        """End of the session: the time outside of any phase goes into 'other'"""
+        self.total = time.perf_counter() - self._start
+        other = self._stats('other')
+        other['time'] = max(0.0, self.total - sum(s['time'] for n, s in self.phases.items() if n != 'other'))
+
+    def summary(self):
+        """{phase: {time, transactions, bytes, roundTrips, avgRoundTrip, bytesPerSec}}"""
+        ret = {}
+        for name, s in self.phases.items():
+            ret[name] = dict(s)
+            ret[name]['avgRoundTrip'] = s['roundTripTime']/s['roundTrips'] if s['roundTrips'] else 0.0
+            ret[name]['bytesPerSec']  = s['bytes']/s['time'] if s['time'] > 0 else 0.0
+        return ret
+
+    def report(self):
+        lines = ['{:<8} {:>10} {:>6} {:>12} {:>12} {:>12} {:>12}'.format(
+            'Phase', 'Time (s)', '%', 'Trans', 'Bytes', 'RTT (us)', 'kB/s')]
+        for name, s in self.summary().items():
+            lines.append('{:<8} {:>10.3f} {:>6.1f} {:>12} {:>12} {:>12.1f} {:>12.1f}'.format(
+                name, s['time'], 100.0*s['time']/self.total if self.total > 0 else 0.0,
+                s['transactions'], s['bytes'], s['avgRoundTrip']*1e6, s['bytesPerSec']/1e3))
+        lines.append(f'{"total":<8} {self.total:>10.3f}')
+        return '\n'.join(lines)
@@ -3,6 +3,12 @@
 #-----------------------------------------------------------------------------
 # Description:
 # PyRogue _proms Module
+#
+# Besides the Vivado .mcs files, open() and stream() also read Intel HEX
+# (*.hex), Motorola SREC (*.srec, *.s19, *.s28, *.s37, *.mot), raw binary
+# (*.bin, loaded at baseAddr) and Xilinx bitstream (*.bit, header stripped,
+# loaded at baseAddr with an optional bit swap of every byte) images. All of
+# them can be gzip compressed (*.gz).
 #-----------------------------------------------------------------------------
 # This file is part of 'SLAC Firmware Standard Library'.
 # It is subject to the license terms in the LICENSE.txt file found in the
@@ -14,149 +20,132 @@
 #-----------------------------------------------------------------------------
 
 import numpy as np
-import functools
 import click
 import gzip
-import subprocess
+import os
 import fnmatch
 
+from surf.misc._Progress import progressbar
+
+# Number of raw (uncompressed) file bytes decoded per chunk
+MCS_CHUNK_SIZE = 0x100000
+
+# Longest legal record: ':' + 2 hex chars x (count + addr[2] + type + 16 data bytes + checksum)
+MCS_MAX_LINE = 1 + 2*(5+16)
+
+# ASCII to nibble lookup table (0xFF = not a hex character)
+_HEX_LUT = np.full(256, 0xFF, dtype=np.uint8)
+_HEX_LUT[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_HEX_LUT[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10,16)
+_HEX_LUT[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10,16)
+
+# ASCII whitespace removed from both ends of a line (same as str.strip())
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[np.frombuffer(b' \t\r\n\x0b\x0c', dtype=np.uint8)] = True
+
+# Reverses the bit order of a byte (.bit images for the BPI PROMs)
+_BIT_SWAP = np.array([int(f'{i:08b}'[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+# File name pattern to image format (each one can also be gzip compressed)
+MCS_FORMATS = {
+    '*.mcs'  : 'mcs',
+    '*.hex'  : 'hex',
+    '*.ihex' : 'hex',
+    '*.srec' : 'srec',
+    '*.s19'  : 'srec',
+    '*.s28'  : 'srec',
+    '*.s37'  : 'srec',
+    '*.mot'  : 'srec',
+    '*.bin'  : 'bin',
+    '*.bit'  : 'bit',
+}
+
+# SREC data record type to address width (in bytes)
+_SREC_DATA = {ord('1'): 2, ord('2'): 3, ord('3'): 4}
+
 class McsException(Exception):
     pass
 
 class McsReader():
 
-    def __init__(self,name="McsReader"):
-        self.entry     = []
+    def __init__(self,name="McsReader",cache=None):
+        # Optional surf.misc.McsCache of previously parsed images
+        self.cache     = cache
+        # SHA-256 of the last opened file (only computed for the cache lookup)
+        self.fileHash  = None
+        # Contiguous image: data[i] is the byte at address (startAddr + i)
+        self.data      = np.empty(0, dtype=np.uint8)
         self.startAddr = 0
         self.endAddr   = 0
         self.size      = 0
         self.addrRange = 0
         self.lastAddr  = 0
 
-    def open(self, filename, dbg=False):
+    def open(self, filename, dbg=False, useCache=True, baseAddr=0, bitSwap=False):
+        # baseAddr is the address of the first byte of a .bin/.bit image
+        # bitSwap reverses the bit order of every byte of a .bit image
         self.startAddr = 0
         self.endAddr   = 0
         self.size      = 0
         self.addrRange = 0
         self.lastAddr  = 0
-        baseAddr       = 0
-        idx            = 0
-        firstAddr      = True
-
-        # Check for non-compressed .MCS file
-        if fnmatch.fnmatch(filename, '*.mcs'):
-            # Set the flag
-            gzipEn = False
-            # Find the length of the file
-            numLines = int(subprocess.check_output(f'wc -l {filename}', shell=True).split()[0])
-
-        # Check for Compressed .MCS file
-        elif fnmatch.fnmatch(filename, '*.mcs.gz'):
-            # Set the flag
-            gzipEn = True
-            # Find the length of the file
-            numLines = int(subprocess.check_output(f'zcat {filename} | wc -l', shell=True).split()[0])
+        self.fileHash  = None
 
-        else:
-            click.secho('\nUnsupported file extension detected', fg='red')
-            raise McsException('McsReader.open(): failed')
+        # Check the file extension
+        fmt, gzipEn = self._format(filename)
 
-        # Create an empty numpy array (up to 16B per line)
-        self.entry = np.empty([16*numLines,2],dtype=np.int32)
+        # Check for a previously parsed copy of the same file contents (and load options)
+        key = None
+        if (self.cache is not None) and useCache:
+            self.fileHash = self.cache.fileHash(filename)
+            key    = self.cache.key(self.fileHash, self._options(fmt, baseAddr, bitSwap))
+            cached = self.cache.load(key)
+            if cached is not None:
+                meta, self.data = cached
+                click.secho(f'Reading .MCS:   using cached image {key[:16]}', fg='green')
+                self._setImage(meta['startAddr'], meta['endAddr'], dbg)
+                return
 
-        # Setup the status bar
-        with click.progressbar(
-            length = numLines,
+        # Setup the status bar (in units of bytes read from the disk)
+        with progressbar(
+            length = os.path.getsize(filename),
             label  = click.style('Reading .MCS:  ', fg='green'),
         ) as bar:
-            # Open the file
-            with ( gzip.open(filename, "rb") if (gzipEn) else open(filename, 'r') ) as f:
-                for i, line in enumerate(f):
-                    # Readout a line
-                    line = line.strip()
-
-                    # Check if GZIP and convert to standard string
-                    if (gzipEn):
-                        line = str(line)[2:-1]
-
-                    # Throttle down printf rate
-                    if ( (i&0xFFF) == 0):
-                        bar.update(0xFFF)
-
-                    # Check for "start code"
-                    if line[0] != ':':
-                        click.secho( ('\nMissing start code. Line[%d]: {:%s}' % (i,line)), fg='red')
-                        raise McsException('McsReader.open(): failed')
-                    else:
-
-                        hexBytes = [int(line[j:j+2], 16) for j in range(1, len(line), 2)]
-
-                        s = functools.reduce(lambda x,y: x+y, hexBytes[:-1]) & 0xFF
-                        c = (hexBytes[-1]*-1) & 0xFF
-
-                        if s != c:
-                            click.secho('\nBad checksum on line: {:s}. Sum: {:x}, checksum: {:x}'.format(line, s, c), fg='red')
-                            raise McsException('McsReader.open(): failed')
-
-                        # Parse out the bytes
-                        byteCount = hexBytes[0]
-                        addr = int(hexBytes[1])<<8 | int(hexBytes[2])
-                        recordType = hexBytes[3]
-
-                        if byteCount > 16:
-                            click.secho('\nInvalid byte count: {:d}'.format(byteCount), fg='red')
-                            raise McsException('McsReader.open(): failed')
-
-                        elif recordType == 0: # Data RecordType
-
-                            if byteCount == 0:
-                                click.secho(f'\nInvalid byte count: {byteCount} for recordType: {recordType}', fg='red')
-                                raise McsException('McsReader.open(): failed')
-                            for j in range(byteCount):
-                                # Put the address and data into a list
-                                address = baseAddr + addr + j
-                                data = hexBytes[j+4]
-                                self.entry[idx] = [address, data]
-                                idx = idx + 1
-                                # Check if not the start address
-                                if (address != self.startAddr):
-                                    # Check for non-contiguous address
-                                    if ( address != (self.lastAddr+1) ) and firstAddr is False:
-                                        click.secho('\n non-contiguous address detected: PreviousAddress={:x}, CurrentAddress={:x}'.format(self.lastAddr,address), fg='red')
-                                        raise McsException('McsReader.open(): failed')
-                                    else:
-                                        self.lastAddr = address
-                                        firstAddr     = False
-                            # Save the last address
-                            self.endAddr = address
-
-                        elif recordType == 1: # End Of File RecordType
-                            break
-
-                        elif recordType == 4: #Extended Linear Address RecordType
-                            # Check for an invalid byte count
-                            if byteCount != 2:
-                                click.secho(f'\nMcsReader.open():Byte count: {byteCount} must be 2 for ELA records', fg='red')
-                                raise McsException('McsReader.open(): failed')
-                            # Check for an invalid address header
-                            elif addr != 0:
-                                click.secho('\nAddr: {:x} must be 0 for ELA records'.format(addr), fg='red')
-                                raise McsException('McsReader.open(): failed')
-                            # Update the base address
-                            baseAddr = int(line[9:11]+line[11:13], 16)* (2**16)
-                            # Check for first address index (which is always the first line)
-                            if (i==0):
-                                self.startAddr = baseAddr
-                                self.lastAddr  = baseAddr
-                        else: # Undefined RecordType
-                            click.secho('\nInvalid record type: {:d}'.format(recordType), fg='red')
-                            raise McsException('McsReader.open(): failed')
+            if fmt == 'mcs':
+                # Decode the file one chunk of records at a time
+                segments = [data for addr, data in self._parse(filename, gzipEn, bar)]
+            else:
+                # The other formats are decoded in one go
+                self._firstAddr, data = self._load(filename, fmt, gzipEn, bar, baseAddr, bitSwap)
+                self.endAddr = self._firstAddr + len(data) - 1 if len(data) > 0 else 0
+                segments = [data]
 
             # Close the status bar
-            bar.update(numLines)
+            bar.update(bar.length - bar.pos)
+
+        # Merge the contiguous data segments into a single image buffer
+        self.data = np.concatenate(segments) if segments else np.empty(0, dtype=np.uint8)
+
+        # The image starts at the first data record
+        if len(self.data) > 0:
+            self.startAddr = self._firstAddr
+
+        # Save the parsed image for the next time this file is opened
+        if key is not None:
+            try:
+                self.cache.store(key, self.data, startAddr=self.startAddr, endAddr=self.endAddr, source=os.path.abspath(filename))
+            except OSError as e:
+                click.secho(f'McsReader.open(): failed to cache the image: {e}', fg='yellow')
+
+        self._setImage(self.startAddr, self.endAddr, dbg)
+
+    def _setImage(self, startAddr, endAddr, dbg):
+        self.startAddr = startAddr
+        self.endAddr   = endAddr
+        self.lastAddr  = endAddr
 
-        # Set the size of the entry array
-        self.size = idx
+        # Set the size of the image (in units of bytes)
+        self.size = len(self.data)
 
         # Calculate the total size (in units of bytes)
         self.addrRange = (self.endAddr - self.startAddr) + 1
@@ -167,3 +156,383 @@ class McsReader():
             print("mcs.startAddr = {}".format(hex(self.startAddr)))
             print("mcs.endAddr   = {}".format(hex(self.endAddr)))
             print("mcs.addrRange = {}".format(hex(self.addrRange)))
+
+    def pages(self, pageSize, start=None, stop=None):
+        # Generator of (address, page) for every pageSize bytes of the image,
+        # optionally limited to the pages that start within [start, stop).
+        # Full pages are zero-copy views, the last page is padded with 0xFF (erased)
+        first = 0 if start is None else max(0, -((self.startAddr-start)//pageSize)*pageSize)
+        last  = self.size if stop is None else min(self.size, stop-self.startAddr)
+        for i in range(first, last, pageSize):
+            page = self.data[i:i+pageSize]
+            if len(page) < pageSize:
+                page = np.concatenate((page, np.full(pageSize-len(page), 0xFF, dtype=np.uint8)))
+            yield (self.startAddr+i), page
+
+    def stream(self, filename, pageSize, bar=None, baseAddr=0, bitSwap=False):
+        # Generator of (address, page) like pages(), decoded directly from the
+        # file without holding the whole image in memory. The optional status
+        # bar is updated in units of bytes read from the disk.
+        fmt, gzipEn = self._format(filename)
+        self.data    = np.empty(0, dtype=np.uint8)
+        self.endAddr = 0
+        buf  = np.empty(0, dtype=np.uint8)
+        addr = None
+
+        if fmt == 'mcs':
+            segments = self._parse(filename, gzipEn, bar)
+        else:
+            # Only the .mcs records are decoded on the fly, the other formats are loaded in one go
+            self._firstAddr, data = self._load(filename, fmt, gzipEn, bar, baseAddr, bitSwap)
+            self.endAddr = self._firstAddr + len(data) - 1 if len(data) > 0 else 0
+            segments = [(self._firstAddr, data)] if len(data) > 0 else []
+
+        for segAddr, seg in segments:
+            if addr is None:
+                addr = segAddr
+            buf = np.concatenate((buf, seg))
+            # Send out all the full pages
+            full = (len(buf)//pageSize)*pageSize
+            for i in range(0, full, pageSize):
+                yield (addr+i), buf[i:i+pageSize]
+            buf  = buf[full:]
+            addr += full
+
+        # Send out the last page padded with 0xFF (erased)
+        if len(buf) > 0:
+            yield addr, np.concatenate((buf, np.full(pageSize-len(buf), 0xFF, dtype=np.uint8)))
+
+        # Update the image metadata
+        self.startAddr = self._firstAddr
+        self.size      = (self.endAddr - self.startAddr) + 1 if addr is not None else 0
+        self.addrRange = self.size
+
+    def _format(self, filename):
+        # Return the (image format, gzip compressed) of the file extension
+        for pattern, fmt in MCS_FORMATS.items():
+            if fnmatch.fnmatch(filename, pattern):
+                return fmt, False
+            elif fnmatch.fnmatch(filename, pattern+'.gz'):
+                return fmt, True
+
+        click.secho('\nUnsupported file extension detected (expected {})'.format(', '.join(p[1:] for p in MCS_FORMATS)), fg='red')
+        raise McsException('McsReader.open(): failed')
+
+    @staticmethod
+    def _options(fmt, baseAddr, bitSwap):
+        # The load options change the image of the .bin/.bit files (cache key suffix)
+        if fmt == 'bin':
+            return f'-bin{baseAddr:x}'
+        elif fmt == 'bit':
+            return f'-bit{baseAddr:x}' + ('s' if bitSwap else '')
+        return ''
+
+    def _readRaw(self, filename, gzipEn, bar):
+        with open(filename, 'rb') as raw:
+            f = gzip.GzipFile(fileobj=raw, mode='rb') if gzipEn else raw
+            chunks = []
+            while True:
+                buf = f.read(MCS_CHUNK_SIZE)
+                if bar is not None:
+                    bar.update(raw.tell() - bar.pos)
+                if not buf:
+                    return b''.join(chunks)
+                chunks.append(buf)
+
+    def _load(self, filename, fmt, gzipEn, bar, baseAddr, bitSwap):
+        """Return (start address, uint8 image) of a .hex, .srec, .bin or .bit file"""
+        if fmt in ('bin', 'bit'):
+            raw = self._readRaw(filename, gzipEn, bar)
+            if fmt == 'bit':
+                raw = self._bitstream(raw)
+            data = np.frombuffer(raw, dtype=np.uint8)
+            if bitSwap and (fmt == 'bit'):
+                data = _BIT_SWAP[data]
+            return baseAddr, data
+
+        # Decode the records into (address, bytes)
+        records = []
+        decode  = self._hexRecords if fmt == 'hex' else self._srecRecords
+        lines   = (line for buf in self._readChunks(filename, gzipEn, bar) for line in buf.split(b'\n'))
+        for addr, data in decode(lines):
+            if len(data) > 0:
+                records.append((addr, data))
+        if not records:
+            return 0, np.empty(0, dtype=np.uint8)
+
+        # The records can be out of order and leave gaps between the segments
+        records.sort(key=lambda r: r[0])
+        start = records[0][0]
+        gaps  = 0
+        prev  = start
+        for addr, data in records:
+            if addr < prev:
+                click.secho('\n overlapping address detected: PreviousAddress={:x}, CurrentAddress={:x}'.format(prev-1,addr), fg='red')
+                raise McsException('McsReader.open(): failed')
+            gaps += (addr > prev)
+            prev  = addr + len(data)
+        if gaps == 0:
+            return start, np.frombuffer(b''.join(data for addr, data in records), dtype=np.uint8)
+
+        # Fill the gaps with the erased value
+        click.secho(f'McsReader.open(): filling {gaps} address gaps with 0xFF', fg='yellow')
+        image = np.full(prev-start, 0xFF, dtype=np.uint8)
+        for addr, data in records:
+            image[addr-start:addr-start+len(data)] = np.frombuffer(data, dtype=np.uint8)
+        return start, image
+
+    def _hexRecords(self, lines):
+        """Generator of (address, bytes) from Intel HEX records (any record length)"""
+        baseAddr = 0
+        for i, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+            text = line.decode(errors='replace')
+            if line[0] != ord(':'):
+                click.secho( ('\nMissing start code. Line[%d]: {:%s}' % (i,text)), fg='red')
+                raise McsException('McsReader.open(): failed')
+            try:
+                rec = bytes.fromhex(text[1:])
+            except ValueError:
+                rec = b''
+            if (len(rec) < 5) or (len(rec) != rec[0]+5):
+                click.secho( ('\nMalformed record. Line[%d]: {:%s}' % (i,text)), fg='red')
+                raise McsException('McsReader.open(): failed')
+            if (sum(rec) & 0xFF) != 0:
+                click.secho('\nBad checksum on line: {:s}'.format(text), fg='red')
+                raise McsException('McsReader.open(): failed')
+            recordType = rec[3]
+            payload    = rec[4:-1]
+            # Data
+            if recordType == 0:
+                yield baseAddr + ((rec[1] << 8) | rec[2]), payload
+            # End Of File
+            elif recordType == 1:
+                return
+            # Extended Segment Address
+            elif (recordType == 2) and (len(payload) == 2):
+                baseAddr = int.from_bytes(payload, 'big') << 4
+            # Extended Linear Address
+            elif (recordType == 4) and (len(payload) == 2):
+                baseAddr = int.from_bytes(payload, 'big') << 16
+            # Start Segment/Linear Address (execution start, not part of the image)
+            elif recordType not in (3, 5):
+                click.secho('\nInvalid record type: {:d}. Line[{:d}]: {:s}'.format(recordType, i, text), fg='red')
+                raise McsException('McsReader.open(): failed')
+
+    def _srecRecords(self, lines):
+        """Generator of (address, bytes) from Motorola SREC records"""
+        for i, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+            text = line.decode(errors='replace')
+            if (line[0] != ord('S')) or (len(line) < 4):
+                click.secho( ('\nMissing start code. Line[%d]: {:%s}' % (i,text)), fg='red')
+                raise McsException('McsReader.open(): failed')
+            try:
+                rec = bytes.fromhex(text[2:])
+            except ValueError:
+                rec = b''
+            if (len(rec) < 2) or (len(rec) != rec[0]+1):
+                click.secho( ('\nMalformed record. Line[%d]: {:%s}' % (i,text)), fg='red')
+                raise McsException('McsReader.open(): failed')
+            if (sum(rec) & 0xFF) != 0xFF:
+                click.secho('\nBad checksum on line: {:s}'.format(text), fg='red')
+                raise McsException('McsReader.open(): failed')
+            recordType = line[1]
+            # Data (S1/S2/S3: 16/24/32-bit address)
+            if recordType in _SREC_DATA:
+                n = _SREC_DATA[recordType]
+                yield int.from_bytes(rec[1:1+n], 'big'), rec[1+n:-1]
+            # Termination (S7/S8/S9)
+            elif recordType in b'789':
+                return
+            # Header (S0) and record count (S5/S6)
+            elif recordType not in b'056':
+                click.secho('\nInvalid record type: S{:s}. Line[{:d}]: {:s}'.format(chr(recordType), i, text), fg='red')
+                raise McsException('McsReader.open(): failed')
+
+    @staticmethod
+    def _bitstream(raw):
+        """Strip the header of a Xilinx .bit file and return the configuration data"""
+        # 0x0009 length + 9 byte magic + 0x0001 then the 'a' (design), 'b' (part),
+        # 'c' (date) and 'd' (time) fields followed by the 'e' (bitstream) field
+        i = 13
+        if raw[:2] != b'\x00\x09':
+            i = len(raw)
+        while i < len(raw):
+            key = raw[i]
+            if key == ord('e'):
+                size = int.from_bytes(raw[i+1:i+5], 'big')
+                data = raw[i+5:i+5+size]
+                if len(data) == size:
+                    return data
+                break
+            elif key in b'abcd':
+                i += 3 + int.from_bytes(raw[i+1:i+3], 'big')
+            else:
+                break
+        click.secho('\nInvalid .bit file header', fg='red')
+        raise McsException('McsReader.open(): failed')
+
+    def _readChunks(self, filename, gzipEn, bar):
+        # Open the raw file so that progress can be tracked in compressed bytes
+        with open(filename, 'rb') as raw:
+            f = gzip.GzipFile(fileobj=raw, mode='rb') if gzipEn else raw
+            carry = b''
+            while True:
+                buf = f.read(MCS_CHUNK_SIZE)
+                if bar is not None:
+                    bar.update(raw.tell() - bar.pos)
+                # Check for end of file
+                if not buf:
+                    if carry:
+                        yield carry
+                    return
+                # Only decode complete lines, keep the remainder for the next chunk
+                buf = carry + buf
+                eol = buf.rfind(b'\n') + 1
+                carry = buf[eol:]
+                if eol > 0:
+                    yield buf[:eol]
+
+    def _parse(self, filename, gzipEn, bar):
+        """Generator of (address, uint8 data) contiguous segments, one per chunk of records"""
+        baseAddr  = 0
+        lineIdx   = 0
+        nextAddr  = None
+        self._firstAddr = 0
+
+        for buf in self._readChunks(filename, gzipEn, bar):
+            raw = np.frombuffer(buf, dtype=np.uint8)
+
+            # Find the line boundaries
+            eol    = np.flatnonzero(raw == ord('\n'))
+            starts = np.concatenate(([0], eol+1))
+            ends   = np.concatenate((eol, [len(raw)]))
+
+            # Strip the whitespace from both ends of the lines
+            while True:
+                trim = (ends > starts) & _WHITESPACE[raw[np.maximum(ends-1,0)]]
+                if not trim.any():
+                    break
+                ends[trim] -= 1
+            while True:
+                trim = (ends > starts) & _WHITESPACE[raw[np.minimum(starts,len(raw)-1)]]
+                if not trim.any():
+                    break
+                starts[trim] += 1
+
+            # Skip empty lines
+            lineNum = lineIdx + np.arange(len(starts))
+            keep    = ends > starts
+            starts, ends, lineNum = starts[keep], ends[keep], lineNum[keep]
+            lineIdx += len(eol)
+            if len(starts) == 0:
+                continue
+            length = ends - starts
+
+            # Gather the lines into a fixed width character matrix (padded with '0')
+            col   = np.arange(MCS_MAX_LINE)
+            idx   = np.minimum(starts[:,None] + col, len(raw)-1)
+            chars = np.where(col < length[:,None], raw[idx], ord('0'))
+
+            # Hex decode all records at once
+            nibbles  = _HEX_LUT[chars[:,1:]]
+            hexBytes = (nibbles[:,0::2].astype(np.uint16) << 4) | nibbles[:,1::2]
+
+            byteCount  = hexBytes[:,0].astype(np.int64)
+            addr       = (hexBytes[:,1].astype(np.int64) << 8) | hexBytes[:,2]
+            recordType = hexBytes[:,3]
+
+            # Validate all records in the same order as the record-by-record parser
+            badStart = chars[:,0] != ord(':')
+            badHex   = (nibbles == 0xFF).any(axis=1) | (length < 11) | ((length-1) % 2 != 0)
+            badSum   = ((hexBytes.sum(axis=1) & 0xFF) != 0) & (length <= MCS_MAX_LINE)
+            badCount = (byteCount > 16) | (length > MCS_MAX_LINE)
+            badLen   = byteCount != ((length-1)//2 - 5)
+            badData  = (recordType == 0) & (byteCount == 0)
+            badEla   = (recordType == 4) & ((byteCount != 2) | (addr != 0))
+            badType  = (recordType != 0) & (recordType != 1) & (recordType != 4)
+
+            error = badStart | badHex | badSum | badCount | badLen | badData | badEla | badType
+            stop  = np.flatnonzero(error | (recordType == 1))
+
+            done = False
+            if len(stop) > 0:
+                i = stop[0]
+                if error[i]:
+                    self._error(buf[starts[i]:ends[i]].decode(errors='replace'), lineNum[i], hexBytes[i], badStart[i], badHex[i], badSum[i], badCount[i], badLen[i])
+                # End Of File RecordType: ignore everything after it
+                done = True
+                hexBytes, addr, recordType, byteCount, lineNum = hexBytes[:i], addr[:i], recordType[:i], byteCount[:i], lineNum[:i]
+
+            # Extended Linear Address RecordType: forward fill the base address
+            isEla = recordType == 4
+            elaIdx = np.maximum.accumulate(np.where(isEla, np.arange(len(isEla)), -1))
+            elaBase = ((hexBytes[:,4].astype(np.int64) << 8) | hexBytes[:,5]) << 16
+            recBase = np.where(elaIdx >= 0, elaBase[np.maximum(elaIdx,0)], baseAddr)
+            if isEla.any():
+                baseAddr = int(elaBase[np.flatnonzero(isEla)[-1]])
+
+            # Data RecordType
+            isData = recordType == 0
+            recAddr  = (recBase + addr)[isData]
+            recCount = byteCount[isData]
+            if len(recAddr) > 0:
+                # Check for non-contiguous address
+                expected = recAddr[:-1] + recCount[:-1]
+                if nextAddr is not None:
+                    expected = np.concatenate(([nextAddr], expected))
+                    actual   = recAddr
+                else:
+                    self._firstAddr = int(recAddr[0])
+                    actual   = recAddr[1:]
+                bad = np.flatnonzero(actual != expected)
+                if len(bad) > 0:
+                    click.secho('\n non-contiguous address detected: PreviousAddress={:x}, CurrentAddress={:x}'.format(int(expected[bad[0]])-1,int(actual[bad[0]])), fg='red')
+                    raise McsException('McsReader.open(): failed')
+
+                # Expand the data bytes of all records
+                dataBytes = hexBytes[isData,4:20]
+                data = dataBytes[np.arange(16) < recCount[:,None]].astype(np.uint8)
+
+                # Save the last address
+                nextAddr      = int(recAddr[-1] + recCount[-1])
+                self.endAddr  = nextAddr - 1
+                self.lastAddr = self.endAddr
+
+                yield int(recAddr[0]), data
+
+            if done:
+                return
+
+    def _error(self, line, i, hexBytes, badStart, badHex, badSum, badCount, badLen):
+        byteCount  = int(hexBytes[0])
+        recordType = int(hexBytes[3])
+
+        if badStart:
+            click.secho( ('\nMissing start code. Line[%d]: {:%s}' % (i,line)), fg='red')
+        elif badHex:
+            click.secho( ('\nMalformed record. Line[%d]: {:%s}' % (i,line)), fg='red')
+        elif badSum:
+            n = (len(line)-1)//2
+            s = int(hexBytes[:n-1].sum()) & 0xFF
+            c = (int(hexBytes[n-1])*-1) & 0xFF
+            click.secho('\nBad checksum on line: {:s}. Sum: {:x}, checksum: {:x}'.format(line, s, c), fg='red')
+        elif badCount:
+            click.secho('\nInvalid byte count: {:d}'.format(byteCount), fg='red')
+        elif badLen:
+            click.secho( ('\nByte count does not match the record length. Line[%d]: {:%s}' % (i,line)), fg='red')
+        elif recordType == 0:
+            click.secho(f'\nInvalid byte count: {byteCount} for recordType: {recordType}', fg='red')
+        elif recordType == 4 and byteCount != 2:
+            click.secho(f'\nMcsReader.open():Byte count: {byteCount} must be 2 for ELA records', fg='red')
+        elif recordType == 4:
+            click.secho('\nAddr: {:x} must be 0 for ELA records'.format((int(hexBytes[1])<<8)|int(hexBytes[2])), fg='red')
+        else:
+            click.secho('\nInvalid record type: {:d}'.format(recordType), fg='red')
+
+        raise McsException('McsReader.open(): failed')
@@ -0,0 +1,103 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue MCS/BIN image writer
+#-----------------------------------------------------------------------------
+# Description:
+# Streams PROM readback data into a .mcs (Intel HEX) or .bin file, with
+# optional gzip compression (*.mcs.gz, *.bin.gz), and keeps a running hash
+# of the raw bytes. With filename=None only the hash is computed.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import click
+import gzip
+import hashlib
+import fnmatch
+
+from surf.misc._McsReader import McsException
+
+class McsWriter():
+
+    def __init__(self, filename=None, hashName='sha256'):
+        self.filename = filename
+        self.hash     = hashlib.new(hashName)
+        self.size     = 0
+        self._file    = None
+        self._mcs     = False
+        self._upper   = None
+        self._next    = None
+
+        if filename is not None:
+            if fnmatch.fnmatch(filename, '*.mcs') or fnmatch.fnmatch(filename, '*.mcs.gz'):
+                self._mcs = True
+            elif not (fnmatch.fnmatch(filename, '*.bin') or fnmatch.fnmatch(filename, '*.bin.gz')):
+                click.secho(f'\nUnsupported file extension: {filename} (expected .mcs, .mcs.gz, .bin or .bin.gz)', fg='red')
+                raise McsException('McsWriter() Failed\n\n')
+            if filename.endswith('.gz'):
+                self._file = gzip.open(filename, 'wb')
+            else:
+                self._file = open(filename, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def digest(self):
+        return self.hash.hexdigest()
+
+    def write(self, addr, data):
+        """Append data (uint8 array) located at byte address addr"""
+        data = np.ascontiguousarray(data, dtype=np.uint8)
+        self.hash.update(data)
+        self.size += len(data)
+
+        if self._file is None:
+            return
+
+        if self._mcs:
+            self._file.write(self._records(addr, data))
+        else:
+            # A .bin file has no addresses, so it must be contiguous
+            if (self._next is not None) and (addr != self._next):
+                click.secho(f'\nMcsWriter: non-contiguous address 0x{addr:x} in {self.filename}', fg='red')
+                raise McsException('McsWriter.write() Failed\n\n')
+            self._file.write(data.tobytes())
+        self._next = addr + len(data)
+
+    def close(self):
+        if self._file is not None:
+            # End of file record
+            if self._mcs:
+                self._file.write(b':00000001FF\n')
+            self._file.close()
+            self._file = None
+
+    def _records(self, addr, data):
+        ret = []
+        i   = 0
+        while i < len(data):
+            # Extended linear address record for each 64kB segment
+            upper = (addr+i) >> 16
+            if upper != self._upper:
+                self._upper = upper
+                ret.append(self._record(0x04, 0x0000, upper.to_bytes(2, 'big')))
+            # Data records (up to 16 bytes) never cross a 64kB boundary
+            n = min(16, len(data)-i, 0x10000 - ((addr+i) & 0xFFFF))
+            ret.append(self._record(0x00, (addr+i) & 0xFFFF, data[i:i+n].tobytes()))
+            i += n
+        return b''.join(ret)
+
+    @staticmethod
+    def _record(recordType, addr, payload):
+        record = bytes([len(payload), addr >> 8, addr & 0xFF, recordType]) + payload
+        return b':' + (record + bytes([(-sum(record)) & 0xFF])).hex().upper().encode() + b'\n'
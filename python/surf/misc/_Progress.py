@@ -0,0 +1,110 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue progress bar helper
+#-----------------------------------------------------------------------------
+# Description:
+# Drop-in replacement for click.progressbar(). By default it returns the
+# regular click progress bar. A thread that runs under progressCallback()
+# gets a quiet bar instead that forwards its state to the callback, which
+# lets a caller (e.g. surf.misc.PromLoader) collect the progress of several
+# devices running in parallel without interleaving their terminal output.
+# SyncOutput serializes what these threads print: each thread's output is
+# written out one whole line at a time, prefixed with the thread's name.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import click
+import contextlib
+import sys
+import threading
+
+_local = threading.local()
+
+class ProgressReporter():
+    """Quiet progress bar that reports to callback(bar, done)"""
+
+    def __init__(self, callback, iterable=None, length=None, label=None, **kwargs):
+        if length is None:
+            length = len(iterable)
+        self.iterable  = iterable
+        self.length    = length
+        self.pos       = 0
+        self.label     = click.unstyle(label or '').strip()
+        self._callback = callback
+
+    def __enter__(self):
+        self._callback(self, False)
+        return self
+
+    def __exit__(self, *exc):
+        self._callback(self, True)
+
+    def __iter__(self):
+        for item in self.iterable:
+            yield item
+            self.update(1)
+
+    def update(self, n):
+        self.pos = min(self.pos + n, self.length)
+        self._callback(self, False)
+
+class SyncOutput():
+    """sys.stdout wrapper writing the lines of the progressCallback() threads under one lock"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock   = threading.Lock()
+
+    def write(self, text):
+        prefix = getattr(_local, 'prefix', None)
+        if prefix is None:
+            with self._lock:
+                return self._stream.write(text)
+        # Hold the partial line until it is complete
+        lines, sep, _local.buffer = (getattr(_local, 'buffer', '') + text).rpartition('\n')
+        if sep:
+            self._writeLines(prefix, lines)
+        return len(text)
+
+    def _writeLines(self, prefix, lines):
+        with self._lock:
+            self._stream.write(''.join(f'{prefix}{line}\n' for line in lines.split('\n')))
+
+    def flush(self):
+        with self._lock:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def progressbar(iterable=None, length=None, **kwargs):
+    callback = getattr(_local, 'callback', None)
+    if callback is None:
+        return click.progressbar(iterable=iterable, length=length, **kwargs)
+    return ProgressReporter(callback, iterable=iterable, length=length, **kwargs)
+
+@contextlib.contextmanager
+def progressCallback(callback, prefix=None):
+    """
+    Route the progressbar() calls made by this thread to callback(bar, done).
+    With a prefix, the lines this thread prints through a SyncOutput are
+    prefixed with it.
+    """
+    prev = (getattr(_local, 'callback', None), getattr(_local, 'prefix', None))
+    _local.callback = callback
+    _local.prefix   = prefix
+    _local.buffer   = ''
+    try:
+        yield
+    finally:
+        # Write out the last partial line
+        if prefix is not None and _local.buffer and isinstance(sys.stdout, SyncOutput):
+            sys.stdout._writeLines(prefix, _local.buffer)
+        _local.callback, _local.prefix = prev
+        _local.buffer = ''
@@ -0,0 +1,326 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue PROM device base class
+#-----------------------------------------------------------------------------
+# Description:
+# Common part of the PROM devices (AxiMicronN25Q, CypressS25Fl, AxiMicronP30
+# and AxiMicronMt28ew): the LoadMcsFile/ResumeMcsFile/StreamMcsFile and
+# DumpToFile/HashProm commands with their local variables, the journal resume
+# points and the per-phase profiling. The devices only implement the bus
+# specific hooks:
+#
+#    _initFlash()          Reset/configure the PROM before a load
+#    _printStatus()        Print the PROM status registers (LoadMcsFile)
+#    _prepareRead()        Setup the PROM for the DumpToFile readback
+#    _readBlock(addr)      Read PAGE_SIZE bytes (uint8 array) from addr
+#    eraseProm(), writeProm(start), verifyProm(start)
+#    streamWriteProm(filename), streamVerifyProm(filename)
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+import click
+import time
+import datetime
+
+from surf.misc._Progress    import progressbar
+from surf.misc._McsCache    import McsCache
+from surf.misc._McsReader   import McsReader, McsException
+from surf.misc._McsWriter   import McsWriter
+from surf.misc._McsProfiler import McsProfiler
+from surf.misc._McsJournal  import McsJournal
+
+class PromBase(pr.Device):
+    def __init__(self,
+            tryCount    = 5,
+            mcsCache    = False, # Cache the parsed .MCS images on disk (surf.misc.McsCache)
+            journal     = True,  # Journal the LoadMcsFile progress for ResumeMcsFile (surf.misc.McsJournal)
+            bitSwap     = False, # Default ImageBitSwap (set for the BPI configuration PROMs)
+            **kwargs):
+
+        super().__init__(**kwargs)
+
+        self._mcs      = McsReader(cache=McsCache() if mcsCache else None)
+        self._journal  = McsJournal(enable=journal)
+        self._profile  = McsProfiler()
+        self._progDone = False
+        self._tryCount = tryCount
+
+        # Bytes per read burst (DumpToFile) and PROM word width in bytes
+        self.PAGE_SIZE = 256
+        self.WORD_SIZE = 1
+
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFile',
+            function    = self._LoadMcsFile,
+            description = 'Load the .MCS (or .hex/.srec/.bin/.bit) into PROM',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'ResumeMcsFile',
+            function    = lambda arg: self._LoadMcsFile(arg, resume=True),
+            description = 'Resume an interrupted LoadMcsFile of the same .MCS, re-verifying only from the boundary region',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'StreamMcsFile',
+            function    = self._StreamMcsFile,
+            description = 'Load the .MCS into PROM while the file is being decoded (bounded memory)',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'ClearMcsCache',
+            function    = lambda: (self._mcs.cache or McsCache()).clear(),
+            description = 'Remove all the parsed .MCS images from the on-disk cache (surf.misc.McsCache)',
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'ImageBaseAddr',
+            description = 'PROM byte address of the first byte of a .bin/.bit image',
+            value       = 0x0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'ImageBitSwap',
+            description = 'Reverse the bit order of every byte of a .bit image (set for the BPI configuration PROMs)',
+            value       = bitSwap,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'LoadProfile',
+            description = 'Per-phase wall time, transactions, bytes, round trip latency and throughput of the last LoadMcsFile',
+            mode        = 'RO',
+            value       = '',
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpAddr',
+            description = 'Start byte address of DumpToFile/HashProm',
+            value       = 0x0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpSize',
+            description = 'Number of bytes read by DumpToFile/HashProm (0 = address range of the last loaded .MCS)',
+            value       = 0x0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'DumpDigest',
+            description = 'SHA-256 of the last DumpToFile/HashProm readback',
+            mode        = 'RO',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'DumpToFile',
+            function    = self._DumpToFile,
+            description = 'Read back the PROM into a .bin/.mcs file (optionally .gz)',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'HashProm',
+            function    = lambda: self._DumpToFile(None),
+            description = 'Read back the PROM and only compute its SHA-256 (DumpDigest)',
+        ))
+
+    ##############################
+    # Bus specific hooks
+    ##############################
+
+    def _initFlash(self):
+        pass
+
+    def _printStatus(self):
+        pass
+
+    def _prepareRead(self):
+        pass
+
+    def _resumeBoundary(self):
+        # Resume from the start of the 64kB regions holding the journal watermarks
+        return 0x10000
+
+    def _writeImage(self, start=None):
+        self.writeProm(start)
+
+    def _verifyImage(self, start=None):
+        self.verifyProm(start)
+
+    ##############################
+    # Commands
+    ##############################
+
+    def _LoadMcsFile(self,arg,diff=False,mcs=None,resume=False,imageHash=None):
+        # An already parsed image (PromLoader) is only used for this load:
+        # the device keeps its own McsReader (and cache setting)
+        if mcs is None:
+            self._loadImage(arg, diff, resume, imageHash)
+        else:
+            reader = self._mcs
+            self._mcs = mcs
+            try:
+                self._loadImage(arg, diff, resume, imageHash, parsed=True)
+            finally:
+                self._mcs = reader
+
+    def _loadImage(self,arg,diff,resume,imageHash,parsed=False):
+
+        click.secho(('%s.LoadMcsFile: %s' % (self.path,arg) ), fg='green')
+        self._progDone = False
+
+        # Start time measurement for profiling
+        start = time.time()
+        self._profile.reset()
+
+        # Reset/configure the PROM and print its status registers
+        self._initFlash()
+        self._printStatus()
+
+        # Open the MCS file (unless the image has already been parsed)
+        if not parsed:
+            with self._profile.phase('parse'):
+                self._mcs.open(arg, baseAddr=self.ImageBaseAddr.get(), bitSwap=self.ImageBitSwap.get())
+
+        # Journal the progress, or reload it when resuming (reuse the hash of the cache lookup)
+        if self._journal.enable and (imageHash is None):
+            imageHash = self._mcs.fileHash or McsCache.fileHash(arg)
+        resumed = self._journal.start(imageHash, self.path, resume)
+
+        # Check for differential programming
+        if diff:
+            # Only erase, write and verify the sectors that differ
+            with self._profile.phase('diff'):
+                self.diffProm()
+
+        else:
+            # Resume from the journal watermarks
+            writeStart, verifyStart = self._resumePoints(resumed)
+
+            # Erase the PROM (skips the ranges that were already erased)
+            with self._profile.phase('erase'):
+                self.eraseProm()
+
+            # Write to the PROM
+            with self._profile.phase('write'):
+                self._writeImage(writeStart)
+
+            # Verify the PROM
+            with self._profile.phase('verify'):
+                self._verifyImage(verifyStart)
+
+        # The image is programmed and verified
+        self._journal.finish()
+
+        self._loadDone('LoadMcsFile', start)
+
+    def _StreamMcsFile(self,arg):
+
+        click.secho(('%s.StreamMcsFile: %s' % (self.path,arg) ), fg='green')
+        self._progDone = False
+
+        # Start time measurement for profiling
+        start = time.time()
+        self._profile.reset()
+
+        # Reset/configure the PROM
+        self._initFlash()
+
+        # Erase and write to the PROM as the MCS file is decoded
+        with self._profile.phase('write'):
+            self.streamWriteProm(arg)
+
+        # Verify the PROM with a second pass through the MCS file
+        with self._profile.phase('verify'):
+            self.streamVerifyProm(arg)
+
+        self._loadDone('StreamMcsFile', start)
+
+    def _loadDone(self, name, start):
+        # Per-phase profiling report
+        self._profile.stop()
+        self.LoadProfile.set(self._profile.report())
+        click.secho(self.LoadProfile.value(), fg='green')
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+        click.secho('%s() took %s to program the PROM' % (name,datetime.timedelta(seconds=int(elapsed))), fg='green')
+
+        # Add a power cycle reminder
+        self._progDone = True
+        click.secho(
+            "\n\n\
+            ***************************************************\n\
+            ***************************************************\n\
+            The MCS data has been written into the PROM.       \n\
+            To reprogram the FPGA with the new PROM data,      \n\
+            a IPROG CMD or power cycle is be required.\n\
+            ***************************************************\n\
+            ***************************************************\n\n"
+            , bg='green',
+        )
+
+    def _resumePoints(self, resumed):
+        if not resumed:
+            return None, None
+        boundary    = self._resumeBoundary()
+        stop        = self._mcs.endAddr+1
+        writeStart  = self._journal.writeStart(self._mcs.startAddr, stop, boundary)
+        verifyStart = self._journal.verifyStart(self._mcs.startAddr, stop, boundary)
+        # Only the boundary region and the new writes need verifying
+        if verifyStart is None:
+            verifyStart = writeStart
+        click.secho(f'ResumeMcsFile: resuming the write at 0x{writeStart or self._mcs.startAddr:x} and the verify at 0x{verifyStart or self._mcs.startAddr:x}', fg='green')
+        return writeStart, verifyStart
+
+    def _DumpToFile(self,arg):
+        start, size = self._dumpRange()
+
+        click.secho(('%s.DumpToFile: %s (0x%x:0x%x)' % (self.path,arg,start,start+size-1) ), fg='green')
+
+        # Start time measurement for the throughput report
+        t0 = time.time()
+
+        # Setup the PROM for the readback
+        self._prepareRead()
+
+        # Stream the read bursts into the file (or just the hash)
+        with McsWriter(arg) as out:
+            with progressbar(
+                length   = size,
+                label    = click.style('Reading PROM:  ', fg='green'),
+            ) as bar:
+                for addr in range(start, start+size, self.PAGE_SIZE):
+                    n = min(self.PAGE_SIZE, start+size-addr)
+                    out.write(addr, self._readBlock(addr)[:n])
+                    bar.update(n)
+
+        elapsed = max(time.time() - t0, 1e-6)
+        self.DumpDigest.set(out.digest)
+        click.secho(f'DumpToFile(): {size} bytes at {size/elapsed/1e3:.1f} kB/s, sha256 = {out.digest}', fg='green')
+
+    def _dumpRange(self):
+        start = self.DumpAddr.get()
+        size  = self.DumpSize.get()
+        # Default to the address range of the last loaded .MCS file
+        if size == 0:
+            if self._mcs.size == 0:
+                click.secho('\nDumpSize is 0 and no .MCS file has been loaded', fg='red')
+                raise McsException('DumpToFile() Failed\n\n')
+            start, size = self._mcs.startAddr, self._mcs.size
+        # PROM word addressing
+        if (start % self.WORD_SIZE) != 0:
+            click.secho(f'\nDumpAddr = 0x{start:x} is not {8*self.WORD_SIZE}-bit aligned', fg='red')
+            raise McsException('DumpToFile() Failed\n\n')
+        return start, size
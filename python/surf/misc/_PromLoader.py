@@ -0,0 +1,197 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue multi-device PROM loader
+#-----------------------------------------------------------------------------
+# Description:
+# Programs the same .MCS image into several PROM devices in parallel
+# (any of the surf.devices.micron/cypress PROM classes). The image is parsed
+# once (per bit order) and shared by all the workers. Each device runs in its
+# own worker thread so a failure on one card does not abort the others, and
+# the lines printed by the workers are serialized and prefixed with the PROM.
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import pyrogue as pr
+import click
+import contextlib
+import copy
+import sys
+import time
+import datetime
+import threading
+import concurrent.futures
+
+from surf.misc._Progress   import progressCallback, SyncOutput
+from surf.misc._McsCache   import McsCache
+from surf.misc._McsReader  import McsReader, McsException
+
+class PromLoader(pr.Device):
+    def __init__(self,
+            description = "Programs one .MCS image into several PROM devices in parallel",
+            proms       = None, # List of PROM devices (AxiMicronN25Q, CypressS25Fl, AxiMicronP30, AxiMicronMt28ew)
+            maxWorkers  = None, # Default: one worker per PROM
+            mcsCache    = False, # Cache the parsed .MCS images on disk (surf.misc.McsCache)
+            **kwargs):
+
+        super().__init__(description=description, **kwargs)
+
+        self._proms      = list(proms) if proms is not None else []
+        self._maxWorkers = maxWorkers
+        self._cache      = McsCache() if mcsCache else None
+        self._lock       = threading.Lock()
+        self._status     = {}
+
+        self.add(pr.LocalCommand(
+            name        = 'LoadMcsFile',
+            function    = self._LoadMcsFile,
+            description = 'Load the .MCS into all the PROMs in parallel',
+            value       = '',
+        ))
+
+        self.add(pr.LocalCommand(
+            name        = 'ClearMcsCache',
+            function    = lambda: (self._cache or McsCache()).clear(),
+            description = 'Remove all the parsed .MCS images from the on-disk cache (surf.misc.McsCache)',
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'ImageBaseAddr',
+            description = 'PROM byte address of the first byte of a .bin/.bit image',
+            value       = 0x0,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'ImageBitSwap',
+            description = 'Reverse the bit order of every byte of a .bit image (Default: the ImageBitSwap of each PROM)',
+            enum        = {-1: 'Default', 0: 'False', 1: 'True'},
+            value       = -1,
+        ))
+
+        self.add(pr.LocalVariable(
+            name        = 'Summary',
+            description = 'Result of the last LoadMcsFile per PROM',
+            mode        = 'RO',
+            value       = '',
+        ))
+
+    def addProm(self, prom):
+        self._proms.append(prom)
+
+    def _LoadMcsFile(self,arg):
+
+        click.secho(('%s.LoadMcsFile: %s (%d PROMs)' % (self.path,arg,len(self._proms)) ), fg='green')
+
+        # Start time measurement for profiling
+        start = time.time()
+
+        # Parse the MCS file once for all the PROMs with the same bit order
+        images = {}
+        for prom in self._proms:
+            bitSwap = self._bitSwap(prom)
+            if bitSwap not in images:
+                images[bitSwap] = McsReader(cache=self._cache)
+                images[bitSwap].open(arg, baseAddr=self.ImageBaseAddr.get(), bitSwap=bitSwap)
+
+        # Hash the file once for the PROM journals (reuse the hash of the cache lookup)
+        imageHash = None
+        if any(prom._journal.enable for prom in self._proms):
+            imageHash = next(iter(images.values())).fileHash or McsCache.fileHash(arg)
+
+        # Per-PROM progress: [label, pos, length, phases done, state]
+        self._status = {prom.path: ['Waiting', 0, 1, 0, 'Running'] for prom in self._proms}
+        errors       = {}
+
+        # Serialize the lines printed by the workers
+        with contextlib.redirect_stdout(SyncOutput(sys.stdout)), \
+             concurrent.futures.ThreadPoolExecutor(max_workers=self._maxWorkers or max(len(self._proms),1)) as pool:
+            futures = {pool.submit(self._loadProm, prom, arg, images[self._bitSwap(prom)], imageHash): prom for prom in self._proms}
+
+            # Aggregate progress in units of PROM phases (erase, write and verify)
+            with click.progressbar(
+                length          = 3*len(self._proms),
+                label           = click.style('Loading PROMs: ', fg='green'),
+                item_show_func  = lambda _: self._progressString(),
+            ) as bar:
+                pending = set(futures)
+                while pending:
+                    done, pending = concurrent.futures.wait(pending, timeout=1.0)
+                    bar.update(max(0, int(self._progress()) - bar.pos), '')
+
+            # Collect the results without letting one failure abort the other PROMs
+            for fut, prom in futures.items():
+                try:
+                    fut.result()
+                except Exception as e:
+                    errors[prom.path] = e
+
+        # End time measurement for profiling
+        end = time.time()
+        elapsed = end - start
+
+        # Print the summary
+        summary = []
+        click.secho('\nPromLoader summary:', fg='green')
+        for prom in self._proms:
+            if prom.path in errors:
+                msg = f'{prom.path}: FAILED ({errors[prom.path]})'.strip()
+                click.secho(f'    {msg}', fg='red')
+            else:
+                msg = f'{prom.path}: OK'
+                click.secho(f'    {msg}', fg='green')
+            summary.append(msg)
+        self.Summary.set('\n'.join(summary))
+        click.secho('LoadMcsFile() took %s to program %d PROMs' % (datetime.timedelta(seconds=int(elapsed)),len(self._proms)), fg='green')
+
+        if errors:
+            raise McsException(f'PromLoader.LoadMcsFile(): {len(errors)} of {len(self._proms)} PROMs failed')
+
+    def _bitSwap(self, prom):
+        # Default to the bit order of the PROM driver (set for the BPI PROMs)
+        if self.ImageBitSwap.value() < 0:
+            return bool(prom.ImageBitSwap.get())
+        return bool(self.ImageBitSwap.value())
+
+    def _loadProm(self, prom, arg, mcs, imageHash):
+        # Report the device progress bars to this loader instead of the terminal
+        def callback(bar, done):
+            with self._lock:
+                status = self._status[prom.path]
+                status[0:3] = [bar.label, bar.pos, max(bar.length, 1)]
+                if done:
+                    status[3] += 1
+                    status[1:3] = [0, 1]
+        try:
+            with progressCallback(callback, prefix=f'{prom.path}: '):
+                # Each PROM gets its own view of the shared (read-only) image
+                prom._LoadMcsFile(arg, mcs=copy.copy(mcs), imageHash=imageHash)
+            state = 'Done'
+        except Exception:
+            state = 'Failed'
+            raise
+        finally:
+            with self._lock:
+                self._status[prom.path][4] = state
+
+    def _progress(self):
+        with self._lock:
+            total = 0.0
+            for label, pos, length, phases, state in self._status.values():
+                total += 3 if state != 'Running' else min(3, phases + pos/length)
+            return total
+
+    def _progressString(self):
+        with self._lock:
+            ret = []
+            for path, (label, pos, length, phases, state) in self._status.items():
+                name = path.split('.')[-1]
+                if state == 'Running':
+                    ret.append(f'{name}: {label.rstrip(":")} {100*pos//length}%')
+                else:
+                    ret.append(f'{name}: {state}')
+            return ', '.join(ret)
@@ -0,0 +1,91 @@
+#-----------------------------------------------------------------------------
+# Title      : PyRogue wait for condition
+#-----------------------------------------------------------------------------
+# Description:
+# Polls a ready condition (e.g. a lock or status register) with exponential
+# backoff until it is true or a deadline expires, so that a bring-up sequence
+# returns as soon as the hardware reports ready instead of sleeping for a
+# fixed worst case delay. Every wait is timed: waitStats accumulates the
+# number of waits, polls, timeouts and the total/max wait time per name.
+#
+#    surf.misc.waitFor(lambda: dev.Locked.get() == 1, timeout=1.0, name=dev.path)
+#    print(surf.misc.waitStats.report())
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import click
+import threading
+import time
+
+class WaitStats():
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.waits = {}
+
+    def record(self, name, elapsed, polls, ready):
+        with self._lock:
+            if name not in self.waits:
+                self.waits[name] = {'count': 0, 'polls': 0, 'timeouts': 0, 'time': 0.0, 'max': 0.0}
+            s = self.waits[name]
+            s['count']    += 1
+            s['polls']    += polls
+            s['timeouts'] += 0 if ready else 1
+            s['time']     += elapsed
+            s['max']       = max(s['max'], elapsed)
+
+    def summary(self):
+        """{name: {count, polls, timeouts, time, max, avg}}"""
+        with self._lock:
+            return {name: dict(s, avg=s['time']/s['count']) for name, s in self.waits.items()}
+
+    def report(self):
+        lines = ['{:<40} {:>6} {:>8} {:>8} {:>10} {:>10}'.format(
+            'Wait', 'Count', 'Polls', 'Timeout', 'Total (s)', 'Max (ms)')]
+        for name, s in sorted(self.summary().items(), key=lambda x: -x[1]['time']):
+            lines.append('{:<40} {:>6} {:>8} {:>8} {:>10.3f} {:>10.1f}'.format(
+                name[-40:], s['count'], s['polls'], s['timeouts'], s['time'], s['max']*1e3))
+        return '\n'.join(lines)
+
+# Global telemetry of all the waits
+waitStats = WaitStats()
+
+def waitFor(condition=None, timeout=1.0, period=0.001, maxPeriod=0.05, minTime=0.0, name='waitFor', fatal=True):
+    """
+    Wait until condition() is true, polling it every period seconds (doubled
+    after each poll up to maxPeriod) for at most timeout seconds. minTime is
+    a settling time always waited before the first poll; without a condition
+    only minTime is waited. Returns True once ready. On timeout raises
+    TimeoutError if fatal, else prints a warning and returns False.
+    """
+    start    = time.perf_counter()
+    deadline = start + timeout
+    polls    = 0
+    if minTime > 0:
+        time.sleep(minTime)
+    while True:
+        ready = (condition is None) or bool(condition())
+        polls += 0 if condition is None else 1
+        now    = time.perf_counter()
+        if ready or (now >= deadline):
+            break
+        time.sleep(min(period, deadline-now))
+        period = min(2*period, maxPeriod)
+    waitStats.record(name, now-start, polls, ready)
+    if not ready:
+        msg = f'{name}: not ready after {timeout:.3f} s ({polls} polls)'
+        if fatal:
+            raise TimeoutError(msg)
+        click.secho(msg, fg='yellow')
+    return ready
@@ -7,4 +7,13 @@
 ## may be copied, modified, propagated, or distributed except according to
 ## the terms contained in the LICENSE.txt file.
 ##############################################################################
+from surf.misc._Progress import *
+from surf.misc._WaitFor import *
+from surf.misc._McsCache import *
+from surf.misc._ErasePlanner import *
 from surf.misc._McsReader import *
+from surf.misc._McsWriter import *
+from surf.misc._McsProfiler import *
+from surf.misc._McsJournal import *
+from surf.misc._PromBase import *
+from surf.misc._PromLoader import *
@@ -9,6 +9,7 @@
 #-----------------------------------------------------------------------------
 
 import pyrogue as pr
+import surf.misc
 import time
 
 class Bootstrap(pr.Device):
@@ -631,10 +632,26 @@ class Bootstrap(pr.Device):
 
         @self.command(description='Initialize the device discovery',)
         def DeviceDiscovery():
-            # Switch to 20.83 Mb/s mode without tags and give device 1 second to downgrade speed
-            self.CoaXPressAxiL.TxLsRate.set(0)
-            self.CoaXPressAxiL.ConfigPktTag.set(0)
-            time.sleep(1.0)
+            # Switch to 20.83 Mb/s mode without tags and give device up to 1 second to downgrade speed:
+            # the device has downgraded once the RX link went down (RxLinkUp dropped or RxLinkUpCnt
+            # moved on after the rate change) and is up again. Without a transition the whole second is waited.
+            axil      = self.CoaXPressAxiL
+            linkUpCnt = axil.RxLinkUpCnt[0].get()
+            dropped   = [False]
+            def relocked():
+                up = axil.RxLinkUp.get() & 0x1
+                dropped[0] = dropped[0] or (not up) or (axil.RxLinkUpCnt[0].get() != linkUpCnt)
+                return dropped[0] and up
+            axil.TxLsRate.set(0)
+            axil.ConfigPktTag.set(0)
+            surf.misc.waitFor(
+                relocked,
+                timeout   = 1.0,
+                period    = 0.010,
+                maxPeriod = 0.100,
+                name      = f'{self.path}.DeviceDiscovery',
+                fatal     = False,
+            )
 
             # Execute a connection reset
             self.ConnectionReset()
@@ -15,7 +15,7 @@
 
 import pyrogue as pr
 import surf.xilinx as xil
-import time
+import surf.misc
 
 class RfDataConverter(pr.Device):
     def __init__(
@@ -161,24 +161,55 @@ class RfDataConverter(pr.Device):
         # Disable the FIFOs
         self.MtsFifoCtrl[1].set(0x3)
 
+    def _resetCounts(self, rfTile):
+        # Snapshot of the tile reset counters, taken before restarting the tiles
+        return [tile.ResetCount.get() for tile in rfTile]
+
+    def _waitForTiles(self, rfTile, resetCount, timeout=1.0):
+        # Wait for the power-on state machine of every tile to restart: its state leaves
+        # the end state (or its reset counter moves on), so that the end state still
+        # read before the restart is not mistaken for Done
+        started = [False]*len(rfTile)
+        def restarted():
+            for i, (tile, count) in enumerate(zip(rfTile, resetCount)):
+                started[i] = started[i] or (tile.CurrentState.get() != tile.RestartStateEnd.value()) or (tile.ResetCount.get() != count)
+            return all(started)
+        surf.misc.waitFor(
+            restarted,
+            timeout = timeout,
+            name    = f'{self.path}.Init',
+            fatal   = False,
+        )
+
+        # Then wait for every tile to reach its end state (Done)
+        surf.misc.waitFor(
+            lambda: all(tile.CurrentState.get() == tile.RestartStateEnd.value() for tile in rfTile),
+            timeout = timeout,
+            minTime = 0.001,
+            name    = f'{self.path}.Init',
+            fatal   = False,
+        )
+
     def Init(self, dynamicNco=False):
 
         # Useful pointers
         rfTile = self.find(typ=xil.RfTile)
 
         # Reset the RF Data Converter
+        resetCount = self._resetCounts(rfTile)
         for tile in rfTile:
             tile.RestartStateStart.set(0)
             tile.RestartStateEnd.set(15)
             tile.RestartSM.set(0x1)
         self.Reset.set(0x1)
-        time.sleep(0.2)
+        self._waitForTiles(rfTile, resetCount)
+        resetCount = self._resetCounts(rfTile)
         for tile in rfTile:
             tile.RestartSM.set(0x1)
-            while tile.RestartStateEnd.get() != 15:
-                time.sleep(0.1)
+        self._waitForTiles(rfTile, resetCount)
+        resetCount = self._resetCounts(rfTile)
         self.Reset.set(0x1)
-        time.sleep(0.2)
+        self._waitForTiles(rfTile, resetCount)
 
         # Check for dynamic NCO
         if dynamicNco:
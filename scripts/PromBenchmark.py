@@ -0,0 +1,143 @@
+#-----------------------------------------------------------------------------
+# This script benchmarks the PROM drivers (LoadMcsFile) against the
+# emulated memory slaves in surf.devices.micron and checks that the
+# emulated FLASH contents match the image afterwards
+#-----------------------------------------------------------------------------
+# This file is part of 'SLAC Firmware Standard Library'.
+# It is subject to the license terms in the LICENSE.txt file found in the
+# top-level directory of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of 'SLAC Firmware Standard Library', including this file,
+# may be copied, modified, propagated, or distributed except according to
+# the terms contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pyrogue as pr
+
+import surf.misc
+import surf.devices.micron
+import surf.devices.cypress
+
+#################################################################
+
+PROMS = {
+    'N25Q'   : (surf.devices.micron.AxiMicronN25Q,   surf.devices.micron.AxiMicronN25QEmulator),
+    'S25FL'  : (surf.devices.cypress.CypressS25Fl,   surf.devices.micron.AxiMicronN25QEmulator),
+    'P30'    : (surf.devices.micron.AxiMicronP30,    surf.devices.micron.AxiMicronP30Emulator),
+    'Mt28ew' : (surf.devices.micron.AxiMicronMt28ew, surf.devices.micron.AxiMicronMt28ewEmulator),
+}
+
+# Set the argument parser
+parser = argparse.ArgumentParser()
+
+# Add arguments
+parser.add_argument(
+    "--prom",
+    type     = str,
+    nargs    = '+',
+    choices  = list(PROMS),
+    default  = list(PROMS),
+    help     = "PROM drivers to benchmark",
+)
+
+parser.add_argument(
+    "--size",
+    type     = int,
+    default  = (1<<20),
+    help     = "image size in bytes",
+)
+
+parser.add_argument(
+    "--blank",
+    type     = float,
+    default  = 0.25,
+    help     = "fraction of the image that is left blank (0xFF)",
+)
+
+parser.add_argument(
+    "--latency",
+    type     = float,
+    default  = 100e-6,
+    help     = "injected latency per transaction in seconds",
+)
+
+parser.add_argument(
+    "--timeScale",
+    type     = float,
+    default  = 1.0,
+    help     = "scale factor applied to the FLASH erase/program busy times",
+)
+
+parser.add_argument(
+    "--mcsFile",
+    type     = str,
+    default  = None,
+    help     = "use this .mcs file instead of a random image",
+)
+
+# Get the arguments
+args = parser.parse_args()
+
+#################################################################
+
+def randomImage(size, blank):
+    rng  = np.random.default_rng(0)
+    data = rng.integers(0, 256, size, dtype=np.uint8)
+    # Blank out whole 4kB regions to exercise the blank page elision
+    for region in range(0, size, 0x1000):
+        if rng.random() < blank:
+            data[region:region+0x1000] = 0xFF
+    return data
+
+class BenchRoot(pr.Root):
+    def __init__(self, promClass, emu, **kwargs):
+        super().__init__(name='BenchRoot', pollEn=False, **kwargs)
+        self.add(promClass(
+            name     = 'Prom',
+            memBase  = emu,
+            offset   = 0x0,
+            mcsCache = False,
+        ))
+
+#################################################################
+
+with tempfile.TemporaryDirectory() as tmp:
+
+    # Generate the image
+    if args.mcsFile is None:
+        image   = randomImage(args.size, args.blank)
+        mcsFile = os.path.join(tmp, 'bench.mcs')
+        with surf.misc.McsWriter(mcsFile) as out:
+            out.write(0, image)
+    else:
+        mcsFile = args.mcsFile
+
+    results = []
+    for name in args.prom:
+        promClass, emuClass = PROMS[name]
+        emu = emuClass(latency=args.latency, timeScale=args.timeScale)
+
+        with BenchRoot(promClass, emu) as root:
+            emu.resetCounters()
+            start = time.time()
+            root.Prom.LoadMcsFile(mcsFile)
+            elapsed = time.time() - start
+
+            # Regression check of the emulated FLASH contents
+            mcs = root.Prom._mcs
+            ok  = np.array_equal(emu.image()[mcs.startAddr:mcs.endAddr+1], mcs.data)
+
+        results.append((name, elapsed, mcs.size/elapsed, emu.counters, ok))
+
+print('\nPROM benchmark: latency = {:g} us, timeScale = {:g}'.format(args.latency*1e6, args.timeScale))
+print('{:<8} {:>10} {:>12} {:>10} {:>10} {:>10} {:>8} {:>6}'.format(
+    'PROM', 'Time (s)', 'kB/s', 'Writes', 'Reads', 'FlashCmds', 'Ignored', 'Check'))
+for name, elapsed, rate, cnt, ok in results:
+    print('{:<8} {:>10.2f} {:>12.1f} {:>10} {:>10} {:>10} {:>8} {:>6}'.format(
+        name, elapsed, rate/1e3, cnt['write'], cnt['read'], cnt['flashCmds'], cnt['ignoredCmds'], 'OK' if ok else 'FAIL'))
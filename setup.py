@@ -30,6 +30,7 @@ setup (
              'surf/protocols',
              'surf/xilinx',
              'surf/devices/analog_devices',
+             'surf/devices/clocktree',
              'surf/devices/cypress',
              'surf/devices/intel',
              'surf/devices/linear',
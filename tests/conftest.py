@@ -0,0 +1,34 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+# The python software tests (test_Mcs*.py, test_ErasePlanner.py, ...) import
+# the pure python modules of the python/ directory (e.g. surf.misc._McsReader).
+# The package __init__ files import pyrogue, so without pyrogue the packages
+# are registered empty and only the modules under test are imported.
+
+import importlib.util
+import os
+import sys
+import types
+
+PYTHON_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+
+if importlib.util.find_spec('pyrogue') is None:
+    for name in ['surf', 'surf.misc', 'surf.devices', 'surf.devices.silabs', 'surf.devices.ti', 'surf.devices.clocktree']:
+        if name not in sys.modules:
+            pkg = types.ModuleType(name)
+            pkg.__path__ = [os.path.join(PYTHON_DIR, *name.split('.'))]
+            sys.modules[name] = pkg
+            if '.' in name:
+                parent, child = name.rsplit('.', 1)
+                setattr(sys.modules[parent], child, pkg)
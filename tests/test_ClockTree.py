@@ -0,0 +1,167 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('click')
+
+import surf.misc  # noqa: E402
+import surf.misc._WaitFor as WaitForModule  # noqa: E402
+from surf.devices.clocktree._ClockTree import ClockTree  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def waitFor(monkeypatch):
+    # Without pyrogue surf.misc is registered empty by conftest.py
+    monkeypatch.setattr(surf.misc, 'waitFor', WaitForModule.waitFor, raising=False)
+
+class FakeClock():
+    """Load/locked callables of a clock device that locks lockTime seconds after its load"""
+
+    def __init__(self, log, name, loadTime=0.0, lockTime=0.0, error=None):
+        self.log      = log
+        self.name     = name
+        self.loadTime = loadTime
+        self.lockTime = lockTime
+        self.error    = error
+        self.loadedAt = None
+
+    def load(self):
+        self.log.append(('load', self.name))
+        time.sleep(self.loadTime)
+        if self.error is not None:
+            raise self.error
+        self.loadedAt = time.monotonic()
+
+    def locked(self):
+        ready = (self.loadedAt is not None) and (time.monotonic() - self.loadedAt >= self.lockTime)
+        if ready and (('locked', self.name) not in self.log):
+            self.log.append(('locked', self.name))
+        return ready
+
+def build(tree, log, spec):
+    # spec: name -> (after, FakeClock kwargs)
+    clocks = {}
+    for name, (after, kwargs) in spec.items():
+        clocks[name] = FakeClock(log, name, **kwargs)
+        tree.add(name, load=clocks[name].load, locked=clocks[name].locked, after=after)
+    return clocks
+
+CHAINS = {
+    'Si5345[0]'  : ([],             {'lockTime': 0.02}),
+    'Lmk[0]'     : (['Si5345[0]'],  {'lockTime': 0.01}),
+    'Lmx2594[0]' : (['Lmk[0]'],     {}),
+    'Si5345[1]'  : ([],             {'lockTime': 0.05}),
+    'Lmk[1]'     : (['Si5345[1]'],  {'lockTime': 0.01}),
+    'Lmx2594[1]' : (['Lmk[1]'],     {}),
+}
+
+def test_order():
+    tree = ClockTree()
+    build(tree, [], {'c': (['b'], {}), 'b': (['a'], {}), 'a': ([], {}), 'd': (['a', 'c'], {})})
+    assert tree.order() == ['a', 'b', 'c', 'd']
+
+def test_run_order():
+    log  = []
+    tree = ClockTree()
+    build(tree, log, CHAINS)
+    results = tree.run()
+    assert set(results) == set(CHAINS)
+    # Each device is only loaded once all its dependencies report lock
+    for name, (after, _) in CHAINS.items():
+        for dep in after:
+            assert log.index(('locked', dep)) < log.index(('load', name))
+            assert results[dep]['end'] <= results[name]['start']
+    # The two chains run concurrently
+    assert results['Si5345[1]']['start'] < results['Lmx2594[0]']['start']
+    assert all(r['load'] >= 0 and r['lock'] >= 0 for r in results.values())
+
+def test_critical_path():
+    tree = ClockTree()
+    build(tree, [], CHAINS)
+    assert tree.criticalPath() == ([], 0.0)
+    tree.run()
+    path, t = tree.criticalPath()
+    # The slowest Si5345 lock sets the critical path
+    assert path == ['Si5345[1]', 'Lmk[1]', 'Lmx2594[1]']
+    assert t == tree.results['Lmx2594[1]']['end']
+    assert t <= tree.total
+    report = tree.report()
+    assert 'Critical path: Si5345[1] -> Lmk[1] -> Lmx2594[1]' in report
+    assert all(name in report for name in CHAINS)
+
+def test_cycle():
+    tree = ClockTree()
+    build(tree, [], {'a': (['c'], {}), 'b': (['a'], {}), 'c': (['b'], {})})
+    with pytest.raises(ValueError, match='dependency cycle a -> c -> b -> a'):
+        tree.order()
+    with pytest.raises(ValueError, match='cycle'):
+        tree.run()
+
+def test_unknown_dependency():
+    log  = []
+    tree = ClockTree()
+    build(tree, log, {'a': ([], {}), 'b': (['x'], {})})
+    with pytest.raises(ValueError, match='b depends on unknown device x'):
+        tree.run()
+    # The graph is checked before any load
+    assert log == []
+
+def test_add_errors():
+    tree = ClockTree()
+    tree.add('a', load=lambda: None)
+    with pytest.raises(ValueError, match='already added'):
+        tree.add('a', load=lambda: None)
+    with pytest.raises(ValueError, match='needs a device'):
+        tree.add('b')
+
+def test_load_error():
+    log  = []
+    tree = ClockTree()
+    spec = dict(CHAINS)
+    spec['Lmk[0]'] = (['Si5345[0]'], {'error': IOError('Lmk[0] load failed')})
+    build(tree, log, spec)
+    with pytest.raises(IOError, match='Lmk\\[0\\] load failed'):
+        tree.run()
+    loaded = [name for event, name in log if event == 'load']
+    # Nothing downstream of the failure is loaded, and no new load starts after it
+    assert 'Lmx2594[0]' not in loaded
+    assert 'Lmk[1]' not in loaded
+    # The loads already running are completed
+    assert 'Lmk[0]' not in tree.results
+    assert 'Si5345[1]' in tree.results
+
+def test_lock_timeout():
+    log  = []
+    tree = ClockTree(lockTimeout=0.02)
+    build(tree, log, {'a': ([], {'lockTime': 10.0}), 'b': (['a'], {})})
+    with pytest.raises(TimeoutError, match='ClockTree.a'):
+        tree.run()
+    assert log == [('load', 'a')]
+
+def test_first_error_raised():
+    log     = []
+    tree    = ClockTree()
+    started = threading.Event()
+    def slowFail():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError('second')
+    def fastFail():
+        started.wait(1.0)
+        raise RuntimeError('first')
+    tree.add('slow', load=slowFail)
+    tree.add('fast', load=fastFail)
+    tree.add('next', load=lambda: log.append('next'), after=['fast'])
+    with pytest.raises(RuntimeError, match='first'):
+        tree.run()
+    assert log == []
@@ -0,0 +1,84 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import pytest
+
+from surf.devices.ti._CodeLoader import readCodeLoaderHexFile, codeLoaderOrder, writeCodeLoaderRegisters
+
+# TICS Pro CodeLoader export: dumped from the highest register down to R0
+REGS = [(112, 0x0000), (111, 0x0000), (110, 0x0000), (75, 0x0800), (74, 0x0000),
+        (44, 0x1FA3), (1, 0x080C), (0, 0x251C)]
+
+class DataBlock():
+    def __init__(self):
+        self.shadow = {}
+
+    def set(self, value, index, write=True):
+        self.shadow[index] = value
+
+class Device():
+    """Device recording the raw transactions (duck-types Lmx2594/Lmx2615)"""
+
+    def __init__(self, error=''):
+        self.path      = 'Lmx'
+        self.log       = []
+        self.error     = error
+        self.DataBlock = DataBlock()
+
+    def _rawTxnChunker(self, offset, data):
+        self.log.append(('post', offset>>2, list(data)))
+
+    def _waitTransaction(self, id):
+        self.log.append(('wait',))
+
+    def _getError(self):
+        return self.error
+
+    def _rawWrite(self, offset, data):
+        self.log.append(('write', offset>>2, list(data)))
+
+def test_readCodeLoaderHexFile(tmp_path):
+    path = tmp_path / 'regs.txt'
+    # "R0 0x0000XXXX" and "R0 0x00 0x0000XXXX" lines
+    path.write_text('R112\t0x00700000\n'
+                    'R1 0x01 0x0001080C\n'
+                    '\n'
+                    'R0\t0x0000251C\n')
+    assert readCodeLoaderHexFile(path) == [(112, 0x0000), (1, 0x080C), (0, 0x251C)]
+
+@pytest.mark.parametrize('regs, last, expected', [
+    ([],                       0, []),
+    ([(0, 1)],                 0, [(0, 1)]),
+    # From the highest register to the lowest, R0 last
+    (REGS,                     0, REGS),
+    # The file order does not matter
+    (REGS[::-1],               0, REGS),
+    # Duplicate addresses: the last value wins
+    ([(3, 1), (2, 2), (3, 4)], 0, [(3, 4), (2, 2)]),
+    # Another last register
+    ([(3, 1), (2, 2), (1, 3)], 2, [(3, 1), (1, 3), (2, 2)]),
+])
+def test_codeLoaderOrder(regs, last, expected):
+    assert codeLoaderOrder(regs, last) == expected
+
+def test_writeCodeLoaderRegisters():
+    dev   = Device()
+    count = writeCodeLoaderRegisters(dev, REGS[::-1])
+    # All the registers but R0 posted from the highest to the lowest, one wait, then R0
+    assert count == 2
+    assert dev.log == [('post', addr, [data]) for addr, data in REGS[:-1]] + [('wait',), ('write', 0, [0x251C])]
+    assert dev.DataBlock.shadow == dict(REGS)
+
+def test_writeCodeLoaderRegisters_error():
+    dev = Device(error='timeout')
+    with pytest.raises(IOError):
+        writeCodeLoaderRegisters(dev, REGS)
+    # R0 (VCO calibration) is not written after a failed write
+    assert ('write', 0, [0x251C]) not in dev.log
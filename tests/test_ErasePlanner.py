@@ -0,0 +1,90 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('click')
+
+from surf.misc._ErasePlanner import planErase, blocksInRange  # noqa: E402
+from surf.misc._McsReader import McsException  # noqa: E402
+
+# N25Q geometry: 4kB subsectors (0.25 s) and 64kB sectors (0.7 s)
+N25Q = [('subsector', 0x1000, 0.25), ('sector', 0x10000, 0.7)]
+
+# P30 style map: 4 x 32kB parameter blocks followed by 128kB main blocks
+P30 = [(4, 0x8000), (8, 0x20000)]
+
+@pytest.mark.parametrize('ranges, expected', [
+    # Nothing to erase
+    ([],                              []),
+    ([(0x1000, 0x1000)],              []),
+    # A few subsectors are cheaper than the whole sector
+    ([(0x0, 0x2000)],                 [('subsector', 0x0), ('subsector', 0x1000)]),
+    ([(0x10800, 0x11001)],            [('subsector', 0x10000), ('subsector', 0x11000)]),
+    # Three or more subsectors cost more than the sector
+    ([(0x0, 0x3000)],                 [('sector', 0x0)]),
+    ([(0x0, 0x30000)],                [('sector', 0x0), ('sector', 0x10000), ('sector', 0x20000)]),
+    # Unaligned image spanning two sectors
+    ([(0xF000, 0x20001)],             [('subsector', 0xF000), ('sector', 0x10000), ('subsector', 0x20000)]),
+    # Several ranges (e.g. the journal remaining ranges)
+    ([(0x30000, 0x31000), (0x0, 0x1000)], [('subsector', 0x0), ('subsector', 0x30000)]),
+])
+def test_planErase(ranges, expected):
+    plan, seconds = planErase(ranges, N25Q)
+    assert plan == expected
+    assert seconds == pytest.approx(sum(0.25 if name == 'subsector' else 0.7 for name, addr in plan))
+
+@pytest.mark.parametrize('start, stop', [
+    (0x0, 0x1), (0x0, 0x28000), (0x1234, 0x56789), (0xFFFF, 0x10001), (0x0, 0x50000),
+])
+def test_planErase_coverage(start, stop):
+    # Every byte of the image is erased exactly once
+    plan, seconds = planErase([(start, stop)], N25Q)
+    sizes  = dict((name, size) for name, size, t in N25Q)
+    blocks = sorted((addr, addr+sizes[name]) for name, addr in plan)
+    for (lo0, hi0), (lo1, hi1) in zip(blocks, blocks[1:]):
+        assert hi0 <= lo1
+    for addr in range(start, stop, 0x800):
+        assert any(lo <= addr < hi for lo, hi in blocks)
+    assert any(lo <= stop-1 < hi for lo, hi in blocks)
+
+@pytest.mark.parametrize('start, stop, expected', [
+    # Parameter blocks
+    (0x0,     0x1,     [(0x0, 0x8000)]),
+    (0x7FFF,  0x8001,  [(0x0, 0x8000), (0x8000, 0x8000)]),
+    # Across the parameter/main block boundary
+    (0x18000, 0x20001, [(0x18000, 0x8000), (0x20000, 0x20000)]),
+    # Main blocks only
+    (0x40000, 0x80000, [(0x40000, 0x20000), (0x60000, 0x20000)]),
+    # Up to the last byte of the map
+    (0x100000, 0x120000, [(0x100000, 0x20000)]),
+    # Empty range
+    (0x10, 0x10,       []),
+])
+def test_blocksInRange(start, stop, expected):
+    blocks = list(blocksInRange(P30, start, stop))
+    assert blocks == expected
+    # The blocks cover [start, stop)
+    if blocks:
+        assert blocks[0][0] <= start
+        assert blocks[-1][0] + blocks[-1][1] >= stop
+        for (a0, s0), (a1, s1) in zip(blocks, blocks[1:]):
+            assert a0 + s0 == a1
+
+@pytest.mark.parametrize('start, stop', [
+    # The map ends at 0x120000
+    (0x110000, 0x120001),
+    (0x120000, 0x120200),
+    (0x0,      0x200000),
+])
+def test_blocksInRange_past_end(start, stop):
+    with pytest.raises(McsException):
+        list(blocksInRange(P30, start, stop))
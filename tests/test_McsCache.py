@@ -0,0 +1,98 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('click')
+
+from surf.misc._McsCache import McsCache, MCS_CACHE_VERSION  # noqa: E402
+from surf.misc._McsReader import McsReader  # noqa: E402
+
+def touch(cache, key, mtime):
+    os.utime(os.path.join(cache.path, f'{key}.json'), (mtime, mtime))
+
+def test_defaults(monkeypatch, tmp_path):
+    monkeypatch.setenv('SURF_MCS_CACHE', str(tmp_path))
+    cache = McsCache()
+    assert cache.path == str(tmp_path)
+    assert cache.maxSize == (256<<20)
+
+def test_key(tmp_path):
+    path = tmp_path / 'image.bin'
+    path.write_bytes(b'\x01\x02')
+    cache = McsCache(path=str(tmp_path / 'cache'))
+    fileHash = McsCache.fileHash(str(path))
+    assert cache.key(fileHash, '-bin0') == f'{fileHash}-bin0-v{MCS_CACHE_VERSION}'
+
+def test_miss_and_hit(tmp_path):
+    cache = McsCache(path=str(tmp_path))
+    assert cache.load('missing') is None
+    # Empty directory and partial entries are misses
+    cache.store('a', np.arange(16, dtype=np.uint8), startAddr=0x100, endAddr=0x10F)
+    os.remove(os.path.join(str(tmp_path), 'a.bin'))
+    assert cache.load('a') is None
+    cache.store('a', np.arange(16, dtype=np.uint8), startAddr=0x100, endAddr=0x10F)
+    meta, data = cache.load('a')
+    assert (meta['startAddr'], meta['endAddr'], meta['size']) == (0x100, 0x10F, 16)
+    assert data.tolist() == list(range(16))
+    # Empty images are cached too
+    cache.store('b', np.empty(0, dtype=np.uint8), startAddr=0, endAddr=0)
+    assert len(cache.load('b')[1]) == 0
+
+def test_eviction(tmp_path):
+    cache = McsCache(path=str(tmp_path), maxSize=250)
+    for i, key in enumerate('abc'):
+        cache.store(key, np.full(100, i, dtype=np.uint8))
+        touch(cache, key, 1000+i)
+    # 'a' (least recently used) was evicted when 'c' was stored
+    assert [key for _, _, key in cache.entries()] == ['b', 'c']
+    # A hit marks the entry as most recently used
+    assert cache.load('b') is not None
+    cache.store('d', np.full(100, 3, dtype=np.uint8))
+    assert sorted(key for _, _, key in cache.entries()) == ['b', 'd']
+    # The most recently used entry is always kept
+    cache.store('e', np.full(1000, 4, dtype=np.uint8))
+    assert [key for _, _, key in cache.entries()] == ['e']
+    cache.clear()
+    assert cache.entries() == []
+    assert os.listdir(str(tmp_path)) == []
+
+def test_reader(tmp_path, capsys):
+    path  = tmp_path / 'image.bin'
+    path.write_bytes(bytes(range(256)))
+    cache = McsCache(path=str(tmp_path / 'cache'))
+    mcs   = McsReader(cache=cache)
+    assert mcs.fileHash is None
+    mcs.open(str(path), baseAddr=0x1000)
+    assert len(cache.entries()) == 1
+    # The hash of the cache lookup is kept for the PROM journal
+    assert mcs.fileHash == McsCache.fileHash(str(path))
+    capsys.readouterr()
+    # Hit
+    mcs.open(str(path), baseAddr=0x1000)
+    assert 'using cached image' in capsys.readouterr().out
+    assert (mcs.startAddr, mcs.endAddr, mcs.data.tobytes()) == (0x1000, 0x10FF, bytes(range(256)))
+    # The load options are part of the key
+    mcs.open(str(path), baseAddr=0x2000)
+    assert 'using cached image' not in capsys.readouterr().out
+    assert (mcs.startAddr, len(cache.entries())) == (0x2000, 2)
+    # Changed contents miss
+    path.write_bytes(bytes(range(128)))
+    mcs.open(str(path), baseAddr=0x1000)
+    assert 'using cached image' not in capsys.readouterr().out
+    assert mcs.data.tobytes() == bytes(range(128))
+    assert mcs.fileHash == McsCache.fileHash(str(path))
+    # No cache, no hash
+    mcs = McsReader()
+    mcs.open(str(path))
+    assert mcs.fileHash is None
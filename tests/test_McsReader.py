@@ -0,0 +1,264 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('click')
+
+import surf.misc._McsReader as McsModule  # noqa: E402
+from surf.misc._McsReader import McsReader, McsException  # noqa: E402
+
+def record(recordType, addr, payload, lower=False):
+    rec  = bytes([len(payload), addr >> 8, addr & 0xFF, recordType]) + bytes(payload)
+    line = ':' + (rec + bytes([(-sum(rec)) & 0xFF])).hex().upper()
+    return line.lower() if lower else line
+
+def mcsLines(startAddr, data, seed=0):
+    # Intel HEX records of data at startAddr with random record sizes (1 to 16 bytes),
+    # an ELA record at every 64kB segment and records that do not cross a segment
+    rnd   = random.Random(seed)
+    lines = []
+    upper = None
+    i     = 0
+    while i < len(data):
+        addr = startAddr + i
+        if (addr >> 16) != upper:
+            upper = addr >> 16
+            lines.append(record(0x04, 0x0000, upper.to_bytes(2, 'big')))
+        n = min(rnd.randint(1, 16), len(data)-i, 0x10000 - (addr & 0xFFFF))
+        lines.append(record(0x00, addr & 0xFFFF, data[i:i+n], lower=rnd.random() < 0.1))
+        i += n
+    return lines
+
+def referenceParse(text):
+    # Record by record parse: (startAddr, endAddr, data)
+    base, first, nextAddr, out = 0, None, None, bytearray()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        rec = bytes.fromhex(line[1:])
+        assert line[0] == ':' and (sum(rec) & 0xFF) == 0 and rec[0] == len(rec)-5
+        count, addr, recordType = rec[0], (rec[1] << 8) | rec[2], rec[3]
+        if recordType == 1:
+            break
+        if recordType == 4:
+            base = ((rec[4] << 8) | rec[5]) << 16
+            continue
+        assert (first is None) or (base+addr == nextAddr)
+        first    = base+addr if first is None else first
+        out     += rec[4:4+count]
+        nextAddr = base+addr+count
+    return first, nextAddr-1, bytes(out)
+
+def writeMcs(tmp_path, lines, name='image.mcs', eol='\n', eof=True):
+    path = tmp_path / name
+    path.write_bytes((eol.join(lines + ([':00000001FF'] if eof else [])) + eol).encode())
+    return str(path)
+
+@pytest.fixture(autouse=True)
+def smallChunks(monkeypatch):
+    # Small chunks so that records and line ends straddle the chunk boundaries
+    monkeypatch.setattr(McsModule, 'MCS_CHUNK_SIZE', 173)
+
+@pytest.mark.parametrize('startAddr, size, seed', [
+    (0x0,      1,       0),
+    (0x0,      0x100,   1),
+    # Odd tail, unaligned start
+    (0x1233,   0x3FF,   2),
+    # Several 64kB segments (ELA records)
+    (0xFFF0,   0x20021, 3),
+    (0x3FFFF1, 0x1007,  4),
+])
+def test_parse_matches_reference(tmp_path, startAddr, size, seed):
+    data = np.random.RandomState(seed).randint(0, 256, size, dtype=np.uint8).tobytes()
+    path = writeMcs(tmp_path, mcsLines(startAddr, data, seed))
+    mcs  = McsReader()
+    mcs.open(path)
+    with open(path) as f:
+        first, last, ref = referenceParse(f.read())
+    assert (mcs.startAddr, mcs.endAddr, mcs.size) == (first, last, len(ref)) == (startAddr, startAddr+size-1, size)
+    assert mcs.data.tobytes() == ref
+
+def test_parse_whitespace(tmp_path):
+    data  = bytes(range(256))
+    lines = mcsLines(0x100, data)
+    # CRLF line ends, blank lines and indented records
+    lines = [('  ' + line + ' \t') if i % 3 == 0 else line for i, line in enumerate(lines)]
+    lines.insert(4, '')
+    path  = writeMcs(tmp_path, lines, eol='\r\n')
+    mcs   = McsReader()
+    mcs.open(path)
+    assert mcs.data.tobytes() == data
+    assert (mcs.startAddr, mcs.endAddr) == (0x100, 0x1FF)
+
+def test_parse_after_eof(tmp_path):
+    # Everything after the End Of File record is ignored (even a malformed record)
+    lines = mcsLines(0x0, bytes(32)) + [':00000001FF', record(0x00, 0x20, b'\x01\x02'), 'garbage']
+    path  = writeMcs(tmp_path, lines, eof=False)
+    mcs   = McsReader()
+    mcs.open(path)
+    assert mcs.size == 32
+
+@pytest.mark.parametrize('line', [
+    # Missing start code
+    record(0x00, 0x10, b'\x01\x02')[1:],
+    # Not a hex character
+    record(0x00, 0x10, b'\x01\x02')[:-2] + 'G0',
+    # Odd number of hex characters
+    record(0x00, 0x10, b'\x01\x02') + '0',
+    # Bad checksum
+    record(0x00, 0x10, b'\x01\x02')[:-2] + '00',
+    # Byte count does not match the record length
+    ':03' + record(0x00, 0x10, b'\x01\x02')[3:],
+    # More than 16 data bytes
+    record(0x00, 0x10, bytes(17)),
+    # Empty data record
+    record(0x00, 0x10, b''),
+    # ELA byte count and address
+    record(0x04, 0x0000, b'\x00'),
+    record(0x04, 0x0010, b'\x00\x01'),
+    # Unsupported record type
+    record(0x02, 0x0000, b'\x10\x00'),
+    # Non-contiguous address
+    record(0x00, 0x11, b'\x01\x02'),
+])
+def test_parse_errors(tmp_path, line):
+    path = writeMcs(tmp_path, mcsLines(0x0, bytes(range(16))) + [line])
+    with pytest.raises(McsException):
+        McsReader().open(path)
+
+def test_stream_matches_pages(tmp_path):
+    data = np.random.RandomState(5).randint(0, 256, 0x1235, dtype=np.uint8).tobytes()
+    path = writeMcs(tmp_path, mcsLines(0x10007, data))
+    mcs  = McsReader()
+    mcs.open(path)
+    ref  = [(addr, page.tobytes()) for addr, page in mcs.pages(256)]
+    assert [(addr, page.tobytes()) for addr, page in McsReader().stream(path, 256)] == ref
+
+def test_pages(tmp_path):
+    data = np.arange(600, dtype=np.uint16).astype(np.uint8).tobytes()
+    path = writeMcs(tmp_path, mcsLines(0x1000, data))
+    mcs  = McsReader()
+    mcs.open(path)
+    pages = list(mcs.pages(256))
+    assert [addr for addr, page in pages] == [0x1000, 0x1100, 0x1200]
+    assert all(len(page) == 256 for addr, page in pages)
+    # The last page is padded with 0xFF (erased)
+    assert pages[-1][1][:600-512].tobytes() == data[512:]
+    assert (pages[-1][1][600-512:] == 0xFF).all()
+    assert b''.join(page.tobytes() for addr, page in pages)[:600] == data
+    # Only the pages that start within [start, stop)
+    assert [addr for addr, page in mcs.pages(256, start=0x1001, stop=0x1200)] == [0x1100]
+    assert [addr for addr, page in mcs.pages(256, start=0x1100)] == [0x1100, 0x1200]
+    assert [addr for addr, page in mcs.pages(256, start=0x0, stop=0x1001)] == [0x1000]
+    assert list(mcs.pages(256, start=0x1300)) == []
+
+def srecord(recordType, addr, payload, addrSize):
+    rec = bytes([addrSize+len(payload)+1]) + addr.to_bytes(addrSize, 'big') + bytes(payload)
+    return f'S{recordType}' + (rec + bytes([(~sum(rec)) & 0xFF])).hex().upper()
+
+def image(size, seed):
+    return np.random.RandomState(seed).randint(0, 256, size, dtype=np.uint8).tobytes()
+
+def bitFile(data):
+    # Xilinx .bit header: magic, then the a (design), b (part), c (date), d (time) and e (bitstream) fields
+    header = b'\x00\x09\x0f\xf0\x0f\xf0\x0f\xf0\x0f\xf0\x00\x00\x01'
+    for key, value in [(b'a', b'top;UserID=0XFFFFFFFF\x00'), (b'b', b'7k325tffg900\x00'), (b'c', b'2024/01/01\x00'), (b'd', b'12:00:00\x00')]:
+        header += key + len(value).to_bytes(2, 'big') + value
+    return header + b'e' + len(data).to_bytes(4, 'big') + data
+
+@pytest.mark.parametrize('name', ['image.mcs', 'image.mcs.gz', 'image.bin', 'image.bin.gz'])
+def test_McsWriter_roundtrip(tmp_path, name):
+    from surf.misc._McsWriter import McsWriter
+    data = image(0x10123, 6)
+    path = str(tmp_path / name)
+    with McsWriter(path) as out:
+        out.write(0x3FFF0, np.frombuffer(data[:0x1000], dtype=np.uint8))
+        out.write(0x40FF0, np.frombuffer(data[0x1000:], dtype=np.uint8))
+    mcs = McsReader()
+    mcs.open(path, baseAddr=0x3FFF0)
+    assert (mcs.startAddr, mcs.endAddr) == (0x3FFF0, 0x3FFF0+len(data)-1)
+    assert mcs.data.tobytes() == data
+
+def test_hex_roundtrip(tmp_path):
+    data  = image(0x300, 7)
+    # Records longer than 16 bytes, out of order, with ESA/ELA and start address records
+    lines = [record(0x02, 0, (0x1000).to_bytes(2, 'big')),                 # segment base 0x10000
+             record(0x00, 0x0100, data[0x100:0x140]),
+             record(0x04, 0, (0x1).to_bytes(2, 'big')),                    # linear base 0x10000
+             record(0x00, 0x0000, data[0x000:0x080]),
+             record(0x00, 0x0080, data[0x080:0x100]),
+             record(0x00, 0x0140, data[0x140:0x200]),
+             record(0x00, 0x0200, data[0x200:0x2C0]),
+             record(0x00, 0x02C0, data[0x2C0:0x300]),
+             record(0x05, 0, b'\x00\x01\x00\x00'),
+             ':00000001FF']
+    path  = tmp_path / 'image.hex'
+    path.write_text('\n'.join(lines) + '\n')
+    mcs   = McsReader()
+    mcs.open(str(path))
+    assert (mcs.startAddr, mcs.endAddr) == (0x10000, 0x102FF)
+    assert mcs.data.tobytes() == data
+
+def test_hex_gaps_and_overlap(tmp_path):
+    path = tmp_path / 'image.hex'
+    path.write_text('\n'.join([record(0x00, 0x0000, b'\x01\x02'), record(0x00, 0x0004, b'\x03')]) + '\n')
+    mcs  = McsReader()
+    mcs.open(str(path))
+    # Gaps are filled with the erased value
+    assert mcs.data.tobytes() == b'\x01\x02\xff\xff\x03'
+    path.write_text('\n'.join([record(0x00, 0x0000, b'\x01\x02'), record(0x00, 0x0001, b'\x03')]) + '\n')
+    with pytest.raises(McsException):
+        mcs.open(str(path))
+
+@pytest.mark.parametrize('recordType, addrSize, termType', [(1, 2, 9), (2, 3, 8), (3, 4, 7)])
+def test_srec_roundtrip(tmp_path, recordType, addrSize, termType):
+    data  = image(0x123, recordType)
+    start = 0x1230 if addrSize == 2 else 0x123450
+    lines = [srecord(0, 0, b'image', 2)]
+    lines += [srecord(recordType, start+i, data[i:i+32], addrSize) for i in range(0, len(data), 32)]
+    lines += [srecord(5, len(lines)-1, b'', 2), srecord(termType, 0, b'', addrSize)]
+    path  = tmp_path / 'image.srec'
+    path.write_text('\r\n'.join(lines) + '\r\n')
+    mcs   = McsReader()
+    mcs.open(str(path))
+    assert (mcs.startAddr, mcs.endAddr) == (start, start+len(data)-1)
+    assert mcs.data.tobytes() == data
+    # Bad checksum
+    path.write_text('\n'.join(lines[:2] + [lines[2][:-2] + '00']) + '\n')
+    with pytest.raises(McsException):
+        mcs.open(str(path))
+
+@pytest.mark.parametrize('bitSwap', [False, True])
+def test_bit_roundtrip(tmp_path, bitSwap):
+    data = image(0x1001, 8)
+    path = tmp_path / 'image.bit'
+    path.write_bytes(bitFile(data))
+    mcs  = McsReader()
+    mcs.open(str(path), baseAddr=0x20000, bitSwap=bitSwap)
+    assert (mcs.startAddr, mcs.size) == (0x20000, len(data))
+    expected = bytes(int(f'{b:08b}'[::-1], 2) for b in data) if bitSwap else data
+    assert mcs.data.tobytes() == expected
+    # Truncated bitstream
+    path.write_bytes(bitFile(data)[:-1])
+    with pytest.raises(McsException):
+        mcs.open(str(path))
+
+def test_bin_stream(tmp_path):
+    data = image(0x345, 9)
+    path = tmp_path / 'image.bin'
+    path.write_bytes(data)
+    pages = list(McsReader().stream(str(path), 256, baseAddr=0x100))
+    assert [addr for addr, page in pages] == [0x100, 0x200, 0x300, 0x400]
+    assert b''.join(page.tobytes() for addr, page in pages)[:len(data)] == data
@@ -0,0 +1,119 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('click')
+
+from surf.devices.silabs._Si532xConfig import readTxtFile, Si532xConfig  # noqa: E402
+
+# DSPLLsim register map: ICAL (register 136) is the last write
+REGS = [(0, 0x14), (1, 0xE4), (2, 0x42), (3, 0x15), (10, 0x00), (11, 0x40),
+        (129, 0x00), (130, 0x00), (131, 0x1F), (132, 0x02), (136, 0x40)]
+
+TXT = ('# Si5324 register map\n'
+       '#REGISTER_MAP\n' +
+       ''.join(f'{addr}, {value:02X}h\n' for addr, value in REGS) +
+       '#END_REGISTER_MAP\n')
+
+class Variable():
+    def __init__(self, name, offset, bitSize, bitOffset, mode):
+        self.name      = name
+        self.offset    = offset << 2
+        self.bitSize   = bitSize
+        self.bitOffset = bitOffset
+        self.mode      = mode
+
+class DataBlock():
+    def __init__(self):
+        self.name   = 'DataBlock'
+        self.mode   = 'RW'
+        self.offset = 0
+        self.shadow = {}
+
+    def set(self, value, index, write=True):
+        self.shadow[index] = value
+
+class Device():
+    """Si5324 subset recording the raw transactions (duck-types Si5324/Si5326)"""
+
+    def __init__(self):
+        self.log       = []
+        self.mem       = [0]*0x100
+        self.DataBlock = DataBlock()
+        self.variables = {var.name: var for var in [
+            self.DataBlock,
+            Variable('BWSEL_REG',  2,   4, 4, 'RW'),
+            Variable('LOS2_INT',   129, 1, 2, 'RO'),
+            Variable('LOL_INT',    130, 1, 0, 'RO'),
+            Variable('LOS2_FLG',   131, 1, 2, 'RW'),
+            Variable('LOS1_FLG',   131, 1, 1, 'RW'),
+            Variable('LOSX_FLG',   131, 1, 0, 'RW'),
+            Variable('LOL_FLG',    132, 1, 2, 'RW'),
+            Variable('FOS1_FLG',   132, 1, 1, 'RW'),
+            Variable('RST_REG',    136, 1, 7, 'RW'),
+            Variable('ICAL',       136, 1, 6, 'RW'),
+        ]}
+
+    def _rawWrite(self, offset, data):
+        self.log.append(('write', offset>>2, list(data)))
+        for i, value in enumerate(data):
+            self.mem[(offset>>2)+i] = value
+
+    def _rawRead(self, offset, numWords):
+        self.log.append(('read', offset>>2, numWords))
+        data = self.mem[(offset>>2):(offset>>2)+numWords]
+        return data[0] if numWords == 1 else data
+
+def test_readTxtFile(tmp_path):
+    path = tmp_path / 'regs.txt'
+    path.write_text(TXT)
+    assert readTxtFile(path) == REGS
+
+def test_runs_and_write():
+    config = Si532xConfig(REGS)
+    assert config.runs == [(0, [0x14, 0xE4, 0x42, 0x15]), (10, [0x00, 0x40]), (129, [0x00, 0x00, 0x1F, 0x02]), (136, [0x40])]
+    dev = Device()
+    assert config.write(dev) == len(config.runs)
+    # Same writes as one write per register in file order
+    assert [(index+i, value) for op, index, data in dev.log for i, value in enumerate(data)] == REGS
+    assert dev.DataBlock.shadow == dict(REGS)
+
+def test_verify_ignores_status_and_flags():
+    config = Si532xConfig(REGS)
+    dev    = Device()
+    config.write(dev)
+    assert config.verify(dev) == []
+    # Status, sticky flags and ICAL (self-clearing) do not read back the written value
+    dev.mem[129] = 0x04
+    dev.mem[130] = 0x01
+    dev.mem[131] = 0x18
+    dev.mem[132] = 0x04
+    dev.mem[136] = 0x00
+    assert config.verify(dev) == []
+    # The other bits of these registers are still checked
+    dev.mem[131] = 0x10
+    dev.mem[2]   = 0x52
+    assert [addr for addr, value, data in config.verify(dev)] == [2, 131]
+    assert dev.DataBlock.shadow[2] == 0x52
+
+def test_ignoredBits():
+    assert Si532xConfig(REGS).ignoredBits(Device()) == {129: 0x04, 130: 0x01, 131: 0x07, 132: 0x06, 136: 0xC0}
+
+def test_fromTxtFile_cache(tmp_path):
+    path = tmp_path / 'regs.txt'
+    path.write_text(TXT)
+    config = Si532xConfig.fromTxtFile(str(path))
+    assert config.regs == REGS
+    assert Si532xConfig.fromTxtFile(str(path)) is config
+    # New contents are parsed again
+    path.write_text(TXT.replace('40h', '41h'))
+    assert Si532xConfig.fromTxtFile(str(path)).regs[-1] == (136, 0x41)
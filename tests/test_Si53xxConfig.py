@@ -0,0 +1,153 @@
+##############################################################################
+## This file is part of 'SLAC Firmware Standard Library'.
+## It is subject to the license terms in the LICENSE.txt file found in the
+## top-level directory of this distribution and at:
+##    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+## No part of 'SLAC Firmware Standard Library', including this file,
+## may be copied, modified, propagated, or distributed except according to
+## the terms contained in the LICENSE.txt file.
+##############################################################################
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('click')
+
+from surf.devices.silabs._Si53xxConfig import (  # noqa: E402
+    readCsvFile, registerRuns, writeRegisters, readRegisters, diffRegisters, verifyRegisters, splitAmble, Si53xxConfig)
+
+# CBPro style register map: the preamble/postamble write 0x0B24/0x0B25 twice
+CSV = [
+    (0x0B24, 0xC0), (0x0B25, 0x00), (0x0540, 0x01),
+    (0x0006, 0x00), (0x0007, 0x00), (0x0008, 0x00), (0x000B, 0x68),
+    (0x0016, 0x02), (0x0017, 0xDC), (0x0018, 0xFF),
+    (0x00FF, 0x11), (0x0100, 0x22),
+    (0x0514, 0x01), (0x001C, 0x01), (0x0540, 0x00),
+    (0x0B24, 0xC3), (0x0B25, 0x02),
+]
+
+PREAMBLE  = CSV[:3]
+POSTAMBLE = CSV[-5:]
+
+# WO bits: SOFT_RST_ALL/SOFT_RST (0x001C) and BW_UPDATE_PLL (0x0514) clear themselves
+IGNORED = {0x00: {0x1C: 0x05}, 0x05: {0x14: 0x01}}
+
+class DataBlock():
+    def __init__(self):
+        self.shadow = {}
+
+    def set(self, value, index, write=True):
+        self.shadow[index] = value
+
+class Page():
+    """Register page recording the raw transactions (duck-types Si5345PageBase)"""
+
+    def __init__(self, page, log):
+        self.page        = page
+        self.log         = log
+        self.mem         = [0]*0x100
+        self.DataBlock   = DataBlock()
+        self.ignoredBits = IGNORED.get(page, {})
+
+    def _rawWrite(self, offset, data):
+        self.log.append(('write', self.page, offset>>2, list(data)))
+        for i, value in enumerate(data):
+            # The self-clearing bits always read back 0
+            self.mem[(offset>>2)+i] = value & ~self.ignoredBits.get((offset>>2)+i, 0)
+
+    def _rawRead(self, offset, numWords):
+        self.log.append(('read', self.page, offset>>2, numWords))
+        data = self.mem[(offset>>2):(offset>>2)+numWords]
+        return data[0] if numWords == 1 else data
+
+def pages():
+    log = []
+    return {p: Page(p, log) for p in range(0x10)}, log
+
+def writeOrder(log):
+    # Register writes in transaction order
+    return [((page<<8)|(index+i), value) for op, page, index, data in log if op == 'write' for i, value in enumerate(data)]
+
+def test_readCsvFile(tmp_path):
+    path = tmp_path / 'regs.csv'
+    path.write_text('Address,Data\n' + ''.join(f'0x{addr:04X},0x{value:02X}\n' for addr, value in CSV))
+    assert readCsvFile(path) == CSV
+
+@pytest.mark.parametrize('regs, expected', [
+    ([],                                           []),
+    ([(0x0006, 1)],                                [(0x00, 0x06, [1])]),
+    # Contiguous addresses in file order
+    ([(0x0006, 1), (0x0007, 2), (0x0008, 3)],      [(0x00, 0x06, [1, 2, 3])]),
+    # Descending addresses are not merged (write order preserved)
+    ([(0x0008, 3), (0x0007, 2), (0x0006, 1)],      [(0x00, 0x08, [3]), (0x00, 0x07, [2]), (0x00, 0x06, [1])]),
+    # A run stops at the end of a page
+    ([(0x00FF, 1), (0x0100, 2)],                   [(0x00, 0xFF, [1]), (0x01, 0x00, [2])]),
+    # Duplicate addresses are written again in order
+    ([(0x0B24, 0xC0), (0x0B25, 0), (0x0B24, 0xC3)], [(0x0B, 0x24, [0xC0, 0]), (0x0B, 0x24, [0xC3])]),
+    # Non adjacent entries are never merged, even if contiguous
+    ([(0x0010, 1), (0x0020, 2), (0x0011, 3)],      [(0x00, 0x10, [1]), (0x00, 0x20, [2]), (0x00, 0x11, [3])]),
+])
+def test_registerRuns(regs, expected):
+    assert list(registerRuns(regs)) == expected
+
+def test_writeRegisters_order():
+    config = Si53xxConfig(CSV)
+    p, log = pages()
+    count  = writeRegisters(p, config)
+    # Same writes as one write per register in file order, with fewer transactions
+    assert writeOrder(log) == CSV
+    assert count == len(config.runs) < len(CSV)
+    # The device ends with the last value of every address
+    assert p[0x0B].mem[0x24] == 0xC3
+    assert p[0x05].mem[0x40] == 0x00
+    assert p[0x0B].DataBlock.shadow[0x25] == 0x02
+
+def test_config_image():
+    config = Si53xxConfig(CSV)
+    assert len(config) == len(CSV)
+    assert config.pages == [0x00, 0x01, 0x05, 0x0B]
+    assert config.image[0x0B, 0x24] == 0xC3
+    assert config.mask.sum() == len(dict(CSV))
+
+def test_readRegisters():
+    p, log = pages()
+    writeRegisters(p, CSV)
+    del log[:]
+    assert readRegisters(p, CSV) == {**dict(CSV), 0x001C: 0x00, 0x0514: 0x00}
+    # Each address is read once
+    assert sum(n for op, page, index, n in log) == len(dict(CSV))
+
+def test_splitAmble():
+    assert splitAmble(CSV) == (PREAMBLE, CSV[3:-5], POSTAMBLE)
+    assert splitAmble(CSV[3:-5]) == ([], CSV[3:-5], [])
+
+def test_diff_and_verify():
+    p, log = pages()
+    writeRegisters(p, CSV)
+    # The self-clearing registers read back 0
+    assert (p[0x00].mem[0x1C], p[0x05].mem[0x14]) == (0, 0)
+    assert diffRegisters(p, CSV) == []
+    assert verifyRegisters(p, CSV) == []
+    # Only the registers that differ, always between the preamble and the postamble
+    p[0x00].mem[0x17] = 0x00
+    p[0x01].mem[0x00] = 0x00
+    assert diffRegisters(p, CSV) == PREAMBLE + [(0x0017, 0xDC), (0x0100, 0x22)] + POSTAMBLE
+    assert [addr for addr, value, data in verifyRegisters(p, CSV)] == [0x0017, 0x0100]
+    # A pre/postamble register that differs only reloads the pre/postamble
+    writeRegisters(p, CSV)
+    p[0x0B].mem[0x24] = 0xC0
+    assert diffRegisters(p, CSV) == PREAMBLE + POSTAMBLE
+    # The other bits of a register with self-clearing bits are still checked
+    p[0x0B].mem[0x24] = 0xC3
+    p[0x00].mem[0x1C] = 0x02
+    assert diffRegisters(p, CSV) == PREAMBLE + POSTAMBLE
+
+def test_fromCsvFile_cache(tmp_path):
+    path = tmp_path / 'regs.csv'
+    path.write_text('Address,Data\n' + ''.join(f'0x{addr:04X},0x{value:02X}\n' for addr, value in CSV))
+    config = Si53xxConfig.fromCsvFile(str(path))
+    assert config.regs == CSV
+    assert Si53xxConfig.fromCsvFile(str(path)) is config
+    # New contents are parsed again
+    path.write_text(path.read_text().replace('0x0B25,0x02', '0x0B25,0x03'))
+    assert Si53xxConfig.fromCsvFile(str(path)).regs[-1] == (0x0B25, 0x03)